@@ -1,13 +1,26 @@
+import os
+
 from flask import Flask
 from flask_socketio import SocketIO
 
+from app.identificacao_online import identificacao_online
+from app.inicializacao import namespace_inicializacao
+from app.rastreamento import PerfiladorAmostragem, rastreador
 from app.routes import bp
-from config import STATIC_FOLDER, TEMPLATE_FOLDER, Config
+from app.sintonia_ao_vivo import sintonia_ao_vivo
+from app.tempo_real import tempo_real
+from config import (
+    CACHE_FOLDER,
+    PERFIL_LENTO_MS,
+    STATIC_FOLDER,
+    TEMPLATE_FOLDER,
+    Config,
+)
 
 socketio = SocketIO()
 
 
-def create_app(config_class=Config, testing=False):
+def create_app(config_class=Config, testing=False, message_queue=None):
     app = Flask(__name__, template_folder=TEMPLATE_FOLDER, static_folder=STATIC_FOLDER)
     app.config.from_object(config_class)
 
@@ -15,9 +28,20 @@ def create_app(config_class=Config, testing=False):
         app.config["TESTING"] = True
         app.config["DEBUG"] = False
 
-    # Initialize SocketIO
-    socketio.init_app(app, async_mode="threading")
+    # Initialize SocketIO (a fila de mensagens liga os workers do modo --headless)
+    socketio.init_app(app, async_mode="threading", message_queue=message_queue)
+    socketio.on_namespace(sintonia_ao_vivo)
+    socketio.on_namespace(identificacao_online)
+    socketio.on_namespace(namespace_inicializacao)
+    socketio.on_namespace(tempo_real)
 
     app.register_blueprint(bp)
 
+    # Server-Timing e histogramas de /metrics; perfilador de requisições lentas, se pedido
+    rastreador.instrumentar(app)
+    if PERFIL_LENTO_MS > 0 and rastreador.perfilador is None:
+        rastreador.perfilador = PerfiladorAmostragem(
+            PERFIL_LENTO_MS / 1000, os.path.join(CACHE_FOLDER, "perfis")
+        )
+
     return app
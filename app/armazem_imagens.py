@@ -0,0 +1,186 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CACHE_FOLDER
+
+# Bytes de imagens mantidos em memória (PNG e variantes)
+CAPACIDADE_MEMORIA = 64 * 1024 * 1024
+
+# Imagens mantidas em disco; as mais antigas são removidas
+CAPACIDADE_DISCO = 512
+
+# A variante WebP sem perdas tem ~40% menos bytes que o PNG do Matplotlib, mas leva ~0,15 s
+# para codificar: é gerada em segundo plano e só é guardada se for menor que o PNG
+METODO_WEBP = 2
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+class ArmazemImagens:
+    """
+    Armazém de imagens endereçado pelo conteúdo (SHA-256 dos bytes PNG).
+
+    As imagens ficam em uma LRU em memória limitada a `capacidade_memoria` bytes e em arquivos
+    `<digest>.png` em `pasta`, limitados a `capacidade_disco`. Como o endereço é o hash do conteúdo,
+    uma imagem nunca muda: o navegador pode guardá-la indefinidamente, e a mesma imagem gerada
+    duas vezes ocupa uma só entrada.
+
+    Com `variantes`, cada imagem nova também é codificada em WebP sem perdas em uma thread de
+    fundo; a variante fica em `<digest>.webp`, ao lado do PNG.
+    """
+
+    def __init__(
+        self,
+        pasta=os.path.join(CACHE_FOLDER, "imagens"),
+        capacidade_memoria=CAPACIDADE_MEMORIA,
+        capacidade_disco=CAPACIDADE_DISCO,
+        variantes=True,
+    ):
+        self.pasta = pasta
+        self.capacidade_memoria = capacidade_memoria
+        self.capacidade_disco = capacidade_disco
+        self.variantes = variantes
+        self._memoria = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._codificador = None
+
+        self.acertos = 0
+        self.faltas = 0
+
+    def guardar(self, dados):
+        """Guarda os bytes PNG `dados` e retorna o digest que os endereça."""
+        digest = hashlib.sha256(dados).hexdigest()
+        if self.contem(digest):
+            return digest
+
+        self._guardar_memoria((digest, "png"), dados)
+        self._gravar_disco(f"{digest}.png", dados)
+        if self.variantes:
+            self._codificar_em_segundo_plano(digest, dados)
+        return digest
+
+    def obter(self, digest, formato="png"):
+        """Retorna os bytes de `digest` no `formato` ("png" ou "webp"), ou None."""
+        if not _DIGEST.fullmatch(digest or ""):
+            return None
+
+        with self._lock:
+            dados = self._memoria.get((digest, formato))
+            if dados is not None:
+                self._memoria.move_to_end((digest, formato))
+                self.acertos += 1
+                return dados
+
+        dados = self._ler_disco(f"{digest}.{formato}")
+        with self._lock:
+            if dados is None:
+                # A falta de uma variante não conta: o PNG é servido no lugar dela
+                self.faltas += formato == "png"
+                return None
+            self.acertos += 1
+        self._guardar_memoria((digest, formato), dados)
+        return dados
+
+    def contem(self, digest):
+        if not _DIGEST.fullmatch(digest or ""):
+            return False
+        with self._lock:
+            if (digest, "png") in self._memoria:
+                return True
+        return bool(self.pasta) and os.path.exists(
+            os.path.join(self.pasta, f"{digest}.png")
+        )
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._memoria),
+                "bytes_memoria": self._bytes,
+                "capacidade_memoria": self.capacidade_memoria,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+            }
+
+    def _guardar_memoria(self, chave, dados):
+        with self._lock:
+            anterior = self._memoria.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._memoria[chave] = dados
+            self._bytes += len(dados)
+            while self._bytes > self.capacidade_memoria and len(self._memoria) > 1:
+                _, removido = self._memoria.popitem(last=False)
+                self._bytes -= len(removido)
+
+    def _ler_disco(self, nome):
+        if not self.pasta:
+            return None
+        try:
+            with open(os.path.join(self.pasta, nome), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _gravar_disco(self, nome, dados):
+        if not self.pasta:
+            return
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.pasta, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(tmp_path, os.path.join(self.pasta, nome))
+            if nome.endswith(".png"):
+                self._podar_disco()
+        except OSError:
+            # O disco é apenas uma segunda camada; a imagem continua em memória
+            pass
+
+    def _podar_disco(self):
+        arquivos = [
+            os.path.join(self.pasta, nome)
+            for nome in os.listdir(self.pasta)
+            if nome.endswith(".png")
+        ]
+        if len(arquivos) <= self.capacidade_disco:
+            return
+        arquivos.sort(key=os.path.getmtime)
+        for path in arquivos[: len(arquivos) - self.capacidade_disco]:
+            for caminho in (path, path[: -len(".png")] + ".webp"):
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def _codificar_em_segundo_plano(self, digest, dados):
+        with self._lock:
+            if self._codificador is None:
+                self._codificador = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="armazem-imagens"
+                )
+        self._codificador.submit(self._codificar_webp, digest, dados)
+
+    def _codificar_webp(self, digest, dados):
+        from PIL import Image
+
+        saida = io.BytesIO()
+        try:
+            with Image.open(io.BytesIO(dados)) as imagem:
+                imagem.save(saida, "WEBP", lossless=True, method=METODO_WEBP)
+        except (OSError, ValueError, KeyError):
+            # Pillow sem suporte a WebP: o PNG continua sendo servido
+            return
+        webp = saida.getvalue()
+        if len(webp) < len(dados):
+            self._guardar_memoria((digest, "webp"), webp)
+            self._gravar_disco(f"{digest}.webp", webp)
+
+
+armazem_imagens = ArmazemImagens()
@@ -0,0 +1,469 @@
+import argparse
+import csv
+import glob
+import os
+import re
+import signal
+import sys
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Extensões de experimento que `abrir_experimento` sabe converter
+EXTENSOES = (".mat", ".csv")
+
+SINTONIAS = ("zn", "chr")
+METRICAS_SINTONIA = ("overshoot", "t_acomodacao_2", "t_subida", "itae", "erro_regime")
+
+# Pontos das curvas devolvidas pelos workers para as figuras (reduzidas por LTTB)
+PONTOS_FIGURA = 1000
+
+
+def _coluna(nome):
+    # "Mínimos quadrados FOPDT" -> "minimos_quadrados_fopdt"
+    texto = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return re.sub(r"[^0-9a-z]+", "_", texto.lower()).strip("_")
+
+
+def colunas_resumo(metodos):
+    """Colunas do resumo: uma linha por experimento, com o EQM de cada método e as sintonias."""
+    colunas = [
+        "arquivo",
+        "assinatura",
+        "amostras",
+        "amostras_reduzidas",
+        "theta_detectado",
+        "melhor_metodo",
+        "k",
+        "tau",
+        "theta",
+        "eqm",
+    ]
+    colunas += [f"eqm_{_coluna(metodo)}" for metodo in metodos]
+    for sintonia in SINTONIAS:
+        colunas += [f"{campo}_{sintonia}" for campo in ("kp", "ti", "td")]
+        colunas += [f"{metrica}_{sintonia}" for metrica in METRICAS_SINTONIA]
+    return colunas + ["duracao_s", "erro"]
+
+
+def encontrar_experimentos(entradas):
+    """
+    Lista os arquivos de experimento de `entradas`: pastas (arquivos .mat e .csv diretamente
+    dentro delas) ou padrões glob ("**" percorre subpastas), sem repetições e em ordem.
+    """
+    arquivos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = (os.path.join(entrada, nome) for nome in os.listdir(entrada))
+        else:
+            candidatos = glob.glob(entrada, recursive=True)
+        arquivos.update(
+            os.path.abspath(caminho)
+            for caminho in candidatos
+            if caminho.lower().endswith(EXTENSOES) and os.path.isfile(caminho)
+        )
+    return sorted(arquivos)
+
+
+def assinatura(file_path):
+    """Tamanho e mtime do arquivo: um experimento alterado depois de processado é refeito."""
+    info = os.stat(file_path)
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+
+def processar_experimento(file_path, metodos, com_figuras=False):
+    """
+    Carga → pré-processamento → torneio de identificação → sintonias ZN e CHR → métricas, para
+    um arquivo. Roda nos processos do pool.
+
+    Returns:
+    - tuple: (linha, curvas). `linha` tem as colunas de `colunas_resumo`; `curvas` tem as
+      séries reduzidas para as figuras (ou None sem `com_figuras` ou em caso de erro).
+    """
+    from app.identification import torneio_identificacao
+    from app.metricas import metricas_resposta
+    from app.preprocessamento import preprocessar
+    from app.series import lttb
+    from app.tuning import sintonia_pid
+    from app.utils import (
+        carregar_dataset,
+        horizonte_simulacao,
+        simular_fopdt,
+        simular_malha_fechada_pid,
+    )
+
+    inicio = time.perf_counter()
+    linha = {"arquivo": file_path, "assinatura": assinatura(file_path)}
+    try:
+        # Cada arquivo é lido uma vez: sem sidecar, que só ocuparia o cache
+        time_dataset, step, output = carregar_dataset(file_path, sidecar=False)
+        linha["amostras"] = len(time_dataset)
+        time_dataset, output, relatorio = preprocessar(time_dataset, output)
+        linha["amostras_reduzidas"] = len(time_dataset)
+        linha["theta_detectado"] = relatorio["theta"]
+
+        # Um processo por experimento: o torneio não abre threads próprias
+        ranking = torneio_identificacao(
+            step, time_dataset, output, metodos, max_workers=1
+        )
+        for resultado in ranking:
+            linha[f"eqm_{_coluna(resultado['metodo'])}"] = resultado.get("eqm")
+        fopdt = [
+            resultado
+            for resultado in ranking
+            if resultado["modelo"] == "FOPDT" and "parametros" in resultado
+        ]
+        if not fopdt:
+            raise ValueError("Nenhum método FOPDT identificou o experimento.")
+        melhor = fopdt[0]
+        k, tau, theta = melhor["parametros"]
+        linha.update(
+            melhor_metodo=melhor["metodo"], k=k, tau=tau, theta=theta, eqm=melhor["eqm"]
+        )
+
+        t = horizonte_simulacao(tau, theta)
+        respostas = {}
+        for sintonia in SINTONIAS:
+            kp, ti, td = sintonia_pid(k, tau, theta, sintonia)
+            y = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)[0]
+            metricas = metricas_resposta(t, y)
+            linha.update(
+                {f"kp_{sintonia}": kp, f"ti_{sintonia}": ti, f"td_{sintonia}": td}
+            )
+            for metrica in METRICAS_SINTONIA:
+                linha[f"{metrica}_{sintonia}"] = float(metricas[metrica][0])
+            respostas[sintonia] = y
+    except Exception as erro:
+        # Cada leitor (SciPy, h5py, CSV) levanta exceções próprias para arquivos defeituosos:
+        # o experimento vira uma linha com erro e o lote continua
+        linha["erro"] = f"{type(erro).__name__}: {erro}"
+        linha["duracao_s"] = time.perf_counter() - inicio
+        return linha, None
+
+    curvas = None
+    if com_figuras:
+        indices = lttb(time_dataset, output, PONTOS_FIGURA)
+        t_medido = time_dataset[indices]
+        curvas = {
+            "t_medido": t_medido,
+            "y_medido": output[indices] - output[0],
+            "y_modelo": simular_fopdt((k, tau, theta), t_medido, step)[0],
+            "metodo": melhor["metodo"],
+            "t": t,
+            **{
+                sintonia: (y, linha[f"overshoot_{sintonia}"])
+                for sintonia, y in respostas.items()
+            },
+        }
+    linha["duracao_s"] = time.perf_counter() - inicio
+    return linha, curvas
+
+
+def _ignorar_interrupcao():
+    # Só o processo principal trata o Ctrl+C; os workers terminam quando o pool é encerrado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def salvar_figuras(pasta, file_path, curvas):
+    """Renderiza a identificação e as sintonias de um experimento em `pasta` (fora do pool)."""
+    from app.rendering import renderizar_comparacao, renderizar_pid
+
+    nome = os.path.splitext(os.path.basename(file_path))[0]
+    figuras = {
+        "identificacao": renderizar_comparacao(
+            curvas["t_medido"],
+            curvas["y_medido"],
+            curvas["y_modelo"],
+            f"{nome} - {curvas['metodo']}",
+            curvas["metodo"],
+        )
+    }
+    for sintonia in SINTONIAS:
+        y, overshoot = curvas[sintonia]
+        figuras[sintonia] = renderizar_pid(
+            curvas["t"], y, f"{nome} - {sintonia.upper()}", overshoot
+        )
+
+    os.makedirs(pasta, exist_ok=True)
+    for sufixo, png in figuras.items():
+        fd, tmp_path = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, os.path.join(pasta, f"{nome}_{sufixo}.png"))
+
+
+class ResumoCSV:
+    """
+    Resumo em CSV gravado linha a linha (com flush), que serve de diário para retomar um lote
+    interrompido.
+
+    Ao abrir, as linhas já gravadas são lidas: as completas, sem erro, marcam os experimentos
+    concluídos (por arquivo e assinatura); uma última linha truncada por uma interrupção é
+    descartada, e o arquivo é regravado só com as linhas válidas antes de continuar.
+    """
+
+    def __init__(self, caminho, colunas, retomar=True):
+        self.caminho = caminho
+        self.colunas = colunas
+        self.concluidos = set()
+
+        linhas = self._ler() if retomar else []
+        self.concluidos = {
+            (linha["arquivo"], linha["assinatura"])
+            for linha in linhas
+            if not linha.get("erro")
+        }
+        # Linhas com erro são refeitas: a nova tentativa substitui a anterior
+        linhas = [linha for linha in linhas if not linha.get("erro")]
+
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pasta, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.DictWriter(f, colunas)
+            escritor.writeheader()
+            escritor.writerows(linhas)
+        os.replace(tmp_path, caminho)
+
+        self._arquivo = open(caminho, "a", newline="", encoding="utf-8")
+        self._escritor = csv.DictWriter(self._arquivo, colunas, extrasaction="ignore")
+
+    def _ler(self):
+        try:
+            with open(self.caminho, newline="", encoding="utf-8") as f:
+                leitor = csv.DictReader(f)
+                if leitor.fieldnames != self.colunas:
+                    # Outras colunas (outros métodos): recomeça em vez de misturar formatos
+                    return []
+                return [
+                    linha
+                    for linha in leitor
+                    if None not in linha and None not in linha.values()
+                ]
+        except OSError:
+            return []
+
+    def gravar(self, linha):
+        self._escritor.writerow(
+            {coluna: "" if valor is None else valor for coluna, valor in linha.items()}
+        )
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def converter_parquet(caminho_csv, caminho_parquet):
+    """
+    Converte o resumo CSV para Parquet.
+
+    Exceções:
+    - Levanta `ImportError` se o pacote pyarrow não estiver instalado.
+    """
+    try:
+        from pyarrow import csv as pa_csv
+        from pyarrow import parquet
+    except ImportError as erro:
+        raise ImportError(
+            "O resumo em Parquet requer o pacote pyarrow (pip install pyarrow); o resumo "
+            f"em CSV está em {caminho_csv}."
+        ) from erro
+
+    parquet.write_table(pa_csv.read_csv(caminho_csv), caminho_parquet)
+
+
+def executar_lote(
+    arquivos,
+    saida,
+    workers=None,
+    pasta_figuras=None,
+    metodos=None,
+    retomar=True,
+    log=print,
+):
+    """
+    Processa `arquivos` em um pool de `workers` processos e grava o resumo em `saida` (.csv ou
+    .parquet) à medida que cada experimento termina.
+
+    Com `saida` em Parquet, as linhas vão para um diário `<saida>.csv`, convertido ao final. Com
+    `retomar`, os experimentos já presentes no resumo (mesmo arquivo e assinatura, sem erro)
+    são pulados. As figuras, se pedidas, são renderizadas em um processo à parte, sem atrasar o
+    pool de identificação.
+
+    Returns:
+    - dict: "processados", "erros", "pulados", "duracao_s" e "experimentos_por_s".
+    """
+    from app.identification import METODOS_IDENTIFICACAO
+
+    metodos = list(METODOS_IDENTIFICACAO if metodos is None else metodos)
+    parquet = saida.lower().endswith(".parquet")
+    caminho_csv = f"{saida}.csv" if parquet else saida
+    resumo = ResumoCSV(caminho_csv, colunas_resumo(metodos), retomar)
+
+    pendentes = [
+        arquivo
+        for arquivo in arquivos
+        if (arquivo, assinatura(arquivo)) not in resumo.concluidos
+    ]
+    pulados = len(arquivos) - len(pendentes)
+    if pulados:
+        log(f"{pulados} experimento(s) já processado(s) em {caminho_csv}")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pendentes) or 1))
+    processados = erros = 0
+    inicio = time.perf_counter()
+
+    figuras = (
+        ProcessPoolExecutor(max_workers=1, initializer=_ignorar_interrupcao)
+        if pasta_figuras
+        else None
+    )
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_ignorar_interrupcao)
+    try:
+        # Mantém no máximo 2 tarefas por worker em voo: o resumo avança na ordem em que os
+        # experimentos terminam, e uma interrupção perde pouco trabalho
+        fila = iter(pendentes)
+        em_voo = {}
+
+        def submeter():
+            for arquivo in fila:
+                futuro = pool.submit(
+                    processar_experimento, arquivo, metodos, figuras is not None
+                )
+                em_voo[futuro] = arquivo
+                if len(em_voo) >= 2 * workers:
+                    return
+
+        submeter()
+        tarefas_figuras = []
+        while em_voo:
+            prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                arquivo = em_voo.pop(futuro)
+                linha, curvas = futuro.result()
+                resumo.gravar(linha)
+                processados += 1
+                if linha.get("erro"):
+                    erros += 1
+                if curvas is not None:
+                    tarefas_figuras.append(
+                        figuras.submit(salvar_figuras, pasta_figuras, arquivo, curvas)
+                    )
+
+                decorrido = time.perf_counter() - inicio
+                log(
+                    f"[{processados}/{len(pendentes)}] {os.path.basename(arquivo)}: "
+                    + (
+                        linha["erro"]
+                        if linha.get("erro")
+                        else f"{linha['melhor_metodo']} em {linha['duracao_s']:.2f} s"
+                    )
+                    + f" ({processados / decorrido:.2f} exp/s)"
+                )
+            submeter()
+
+        duracao = time.perf_counter() - inicio
+        for tarefa in tarefas_figuras:
+            tarefa.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if figuras is not None:
+            figuras.shutdown(cancel_futures=True)
+        resumo.fechar()
+
+    if parquet:
+        converter_parquet(caminho_csv, saida)
+
+    return {
+        "processados": processados,
+        "erros": erros,
+        "pulados": pulados,
+        "duracao_s": duracao,
+        "experimentos_por_s": processados / duracao if duracao > 0 else 0.0,
+    }
+
+
+def ler_argumentos(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch",
+        description="Identificação e sintonia (ZN e CHR) em lote de experimentos .mat/.csv",
+    )
+    parser.add_argument(
+        "entradas", nargs="+", help="pastas ou padrões glob (ex.: 'ensaios/**/*.mat')"
+    )
+    parser.add_argument(
+        "--saida",
+        default="resumo.csv",
+        help="resumo em .csv ou .parquet (requer pyarrow)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="processos (padrão: um por núcleo)"
+    )
+    parser.add_argument(
+        "--figuras", default=None, help="pasta para os gráficos PNG de cada experimento"
+    )
+    parser.add_argument(
+        "--metodos",
+        default=None,
+        help="métodos de identificação separados por vírgula (padrão: todos)",
+    )
+    parser.add_argument(
+        "--recomecar",
+        action="store_true",
+        help="ignora o resumo existente e processa tudo de novo",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argumentos = ler_argumentos(argv)
+
+    # Paralelismo por processo: cada um usa uma thread de BLAS (lido ao importar o NumPy)
+    for variavel in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variavel, "1")
+
+    from app.identification import METODOS_IDENTIFICACAO
+
+    metodos = None
+    if argumentos.metodos:
+        metodos = [m.strip() for m in argumentos.metodos.split(",") if m.strip()]
+        desconhecidos = [m for m in metodos if m not in METODOS_IDENTIFICACAO]
+        if desconhecidos:
+            print(f"Métodos desconhecidos: {desconhecidos}", file=sys.stderr)
+            return 2
+
+    arquivos = encontrar_experimentos(argumentos.entradas)
+    if not arquivos:
+        print("Nenhum experimento (.mat ou .csv) encontrado.", file=sys.stderr)
+        return 1
+
+    try:
+        resultado = executar_lote(
+            arquivos,
+            argumentos.saida,
+            argumentos.workers,
+            argumentos.figuras,
+            metodos,
+            retomar=not argumentos.recomecar,
+        )
+    except ImportError as erro:
+        print(erro, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print(
+            "Interrompido; rode o mesmo comando para continuar de onde parou.",
+            file=sys.stderr,
+        )
+        return 130
+
+    print(
+        f"{resultado['processados']} experimento(s) em {resultado['duracao_s']:.1f} s "
+        f"({resultado['experimentos_por_s']:.2f} exp/s), {resultado['erros']} com erro, "
+        f"{resultado['pulados']} pulado(s); resumo em {argumentos.saida}"
+    )
+    return 1 if resultado["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
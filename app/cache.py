@@ -0,0 +1,203 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import CACHE_FOLDER
+
+_hashes_arquivos = {}
+_hashes_lock = threading.Lock()
+
+
+def hash_arquivo(file_path):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo.
+
+    O resultado é memorizado por (caminho, tamanho, mtime), de modo que o arquivo só é relido
+    quando muda no disco. Isso permite usar o hash como parte da chave de cache a cada requisição
+    sem custo de I/O.
+
+    Args:
+    - file_path (str): Caminho do arquivo.
+
+    Returns:
+    - str: Hash hexadecimal do conteúdo.
+    """
+    info = os.stat(file_path)
+    assinatura = (os.path.abspath(file_path), info.st_size, info.st_mtime_ns)
+
+    with _hashes_lock:
+        if assinatura in _hashes_arquivos:
+            return _hashes_arquivos[assinatura]
+
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    digest = sha.hexdigest()
+
+    with _hashes_lock:
+        # Descarta hashes antigos do mesmo arquivo
+        for chave in [c for c in _hashes_arquivos if c[0] == assinatura[0]]:
+            del _hashes_arquivos[chave]
+        _hashes_arquivos[assinatura] = digest
+
+    return digest
+
+
+def montar_chave(*partes):
+    """Gera uma chave estável (hex) a partir de valores simples (str, números, tuplas)."""
+    return hashlib.sha256(repr(partes).encode("utf-8")).hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache de resultados com duas camadas: LRU em memória e arquivos pickle em disco.
+
+    A camada em memória guarda até `capacidade` entradas, descartando a usada há mais tempo.
+    A camada em disco sobrevive a reinícios da aplicação e é limitada a `capacidade_disco`
+    arquivos (os mais antigos são removidos). As chaves devem ser strings seguras para nome de
+    arquivo, como as geradas por `montar_chave`. Com `pasta=None` o cache fica só em memória.
+
+    `obter_ou_calcular` acrescenta coalescência (single-flight): requisições simultâneas pela
+    mesma chave esperam um único cálculo em vez de repeti-lo.
+    """
+
+    def __init__(self, nome, capacidade=8, capacidade_disco=32, pasta=CACHE_FOLDER):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.capacidade_disco = capacidade_disco
+        self.pasta = os.path.join(pasta, nome) if pasta else None
+        self._memoria = OrderedDict()
+        self._em_calculo = {}
+        self._lock = threading.Lock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.coalescidos = 0
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, f"{chave}.pkl")
+
+    def obter(self, chave):
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                return self._memoria[chave]
+
+        valor = self._ler_disco(chave)
+        if valor is not None:
+            self._guardar_memoria(chave, valor)
+        return valor
+
+    def obter_ou_calcular(self, chave, calcular):
+        """
+        Retorna o valor em cache para `chave` ou o calcula com `calcular()` e o guarda.
+
+        Se outra thread já está calculando a mesma chave, espera o resultado dela (uma exceção no
+        cálculo é propagada para todas as threads que esperavam).
+        """
+        valor = self.obter(chave)
+        if valor is not None:
+            with self._lock:
+                self.acertos += 1
+            return valor
+
+        with self._lock:
+            futuro = self._em_calculo.get(chave)
+            if futuro is not None:
+                self.coalescidos += 1
+                dono = False
+            else:
+                futuro = self._em_calculo[chave] = Future()
+                self.faltas += 1
+                dono = True
+
+        if not dono:
+            return futuro.result()
+
+        try:
+            valor = calcular()
+            self.guardar(chave, valor)
+            futuro.set_result(valor)
+            return valor
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        finally:
+            with self._lock:
+                del self._em_calculo[chave]
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas + self.coalescidos
+            return {
+                "entradas": len(self._memoria),
+                "capacidade": self.capacidade,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "coalescidos": self.coalescidos,
+                "taxa_acerto": (
+                    (self.acertos + self.coalescidos) / consultas if consultas else None
+                ),
+            }
+
+    def guardar(self, chave, valor):
+        self._guardar_memoria(chave, valor)
+        self._gravar_disco(chave, valor)
+
+    def limpar(self):
+        with self._lock:
+            self._memoria.clear()
+        if self.pasta and os.path.isdir(self.pasta):
+            for nome in os.listdir(self.pasta):
+                if nome.endswith(".pkl"):
+                    os.remove(os.path.join(self.pasta, nome))
+
+    def _guardar_memoria(self, chave, valor):
+        with self._lock:
+            self._memoria[chave] = valor
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.capacidade:
+                self._memoria.popitem(last=False)
+
+    def _ler_disco(self, chave):
+        if not self.pasta:
+            return None
+        try:
+            with open(self._caminho(chave), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _gravar_disco(self, chave, valor):
+        if not self.pasta:
+            return
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.pasta, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._caminho(chave))
+            self._podar_disco()
+        except OSError:
+            # O cache em disco é apenas uma otimização
+            pass
+
+    def _podar_disco(self):
+        arquivos = [
+            os.path.join(self.pasta, nome)
+            for nome in os.listdir(self.pasta)
+            if nome.endswith(".pkl")
+        ]
+        if len(arquivos) <= self.capacidade_disco:
+            return
+        arquivos.sort(key=os.path.getmtime)
+        for path in arquivos[: len(arquivos) - self.capacidade_disco]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
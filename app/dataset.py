@@ -0,0 +1,415 @@
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.cache import hash_arquivo, montar_chave
+from app.rastreamento import etapa
+from config import CACHE_FOLDER
+
+PASTA_SIDECAR = os.path.join(CACHE_FOLDER, "datasets")
+CAMPOS = ("sampleTime", "dataInput", "dataOutput")
+VERSAO_SIDECAR = 1
+
+# Linhas lidas por vez ao converter arquivos CSV
+LINHAS_POR_BLOCO = 1 << 18
+
+# Espaço máximo (bytes) ocupado pelos sidecars; ao passar disso, os menos usados são removidos
+CAPACIDADE_SIDECARS = 2 * 1024**3
+
+# Pastas temporárias de conversões interrompidas são removidas depois deste tempo (s)
+IDADE_MAXIMA_TEMPORARIOS = 3600
+
+# Tentativas de publicar uma conversão quando outro processo troca a mesma pasta ao mesmo tempo
+TENTATIVAS_PUBLICACAO = 5
+
+_conversao_lock = threading.Lock()
+
+
+@dataclass
+class Experimento:
+    """
+    Experimento de resposta ao degrau aberto a partir do sidecar.
+
+    Os vetores são visões `np.memmap` somente leitura dos arquivos `.npy`, então abrir um
+    experimento não copia os dados para a memória.
+    """
+
+    sample_time: np.ndarray
+    data_input: np.ndarray
+    data_output: np.ndarray
+    metadados: dict = field(default_factory=dict)
+
+
+def abrir_experimento(file_path):
+    """
+    Abre um experimento (.mat v5, .mat v7.3/HDF5 ou .csv) como visões memory-mapped.
+
+    Na primeira abertura o arquivo é convertido para um sidecar de arquivos `.npy` e metadados
+    (`meta.json`) em `PASTA_SIDECAR`. Nas seguintes, o sidecar é validado pelo tamanho e mtime do
+    arquivo de origem; se estes mudaram, o hash do conteúdo decide se o sidecar ainda vale ou se
+    o arquivo precisa ser convertido novamente.
+
+    Vários processos podem abrir o mesmo arquivo ao mesmo tempo: cada conversão é feita numa
+    pasta temporária própria e publicada com uma troca atômica; quem perde a corrida usa o
+    sidecar publicado pelo outro. O uso de cada sidecar é registrado no mtime do `meta.json`,
+    e os menos usados são removidos quando o total passa de `CAPACIDADE_SIDECARS`.
+
+    Exceções:
+    - Levanta `FileNotFoundError` se o arquivo não existir.
+    - Levanta `ValueError` se o formato não for suportado.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Arquivo {file_path} não encontrado.")
+
+    pasta = os.path.join(PASTA_SIDECAR, montar_chave(os.path.abspath(file_path)))
+
+    for tentativa in range(TENTATIVAS_PUBLICACAO):
+        with _conversao_lock:
+            metadados = _validar_sidecar(file_path, pasta)
+            if metadados is None:
+                metadados = _converter(file_path, pasta)
+                _podar_sidecars(manter=pasta)
+            else:
+                _registrar_uso(pasta)
+        try:
+            vetores = [
+                np.load(os.path.join(pasta, f"{campo}.npy"), mmap_mode="r")
+                for campo in CAMPOS
+            ]
+        except FileNotFoundError:
+            # Outro processo trocou ou removeu a pasta entre a validação e a leitura
+            if tentativa == TENTATIVAS_PUBLICACAO - 1:
+                raise
+            continue
+        return Experimento(*vetores, metadados=metadados)
+
+
+def ler_experimento(file_path):
+    """
+    Lê um experimento para a memória sem deixar sidecar: a conversão é feita em uma pasta
+    temporária, removida ao final. Serve às leituras únicas, como as do processamento em lote,
+    em que um sidecar por arquivo só ocuparia o cache.
+
+    Exceções:
+    - Levanta `FileNotFoundError` se o arquivo não existir.
+    - Levanta `ValueError` se o formato não for suportado.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Arquivo {file_path} não encontrado.")
+    _verificar_formato(file_path)
+
+    with tempfile.TemporaryDirectory(prefix="c213_experimento_") as pasta:
+        extras = _converter_formato(file_path, pasta)
+        vetores = [np.load(os.path.join(pasta, f"{campo}.npy")) for campo in CAMPOS]
+    metadados = {
+        "origem": os.path.abspath(file_path),
+        "n_amostras": int(vetores[0].size),
+        **extras,
+    }
+    return Experimento(*vetores, metadados=metadados)
+
+
+def _verificar_formato(file_path):
+    extensao = os.path.splitext(file_path)[1].lower()
+    if extensao not in (".mat", ".csv"):
+        raise ValueError(f"Formato de experimento não suportado: {extensao}")
+
+
+def _converter_formato(file_path, pasta):
+    # Grava os campos em `pasta` e devolve os metadados extras do formato
+    if file_path.lower().endswith(".mat"):
+        return _converter_mat(file_path, pasta)
+    return _converter_csv(file_path, pasta)
+
+
+def _validar_sidecar(file_path, pasta):
+    caminho_meta = os.path.join(pasta, "meta.json")
+    try:
+        with open(caminho_meta, encoding="utf-8") as f:
+            metadados = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if metadados.get("versao") != VERSAO_SIDECAR:
+        return None
+
+    info = os.stat(file_path)
+    if (
+        metadados["tamanho"] == info.st_size
+        and metadados["mtime_ns"] == info.st_mtime_ns
+    ):
+        return metadados
+
+    # O arquivo foi tocado: só reconverte se o conteúdo mudou de fato
+    if metadados["hash"] != hash_arquivo(file_path):
+        return None
+
+    metadados["tamanho"] = info.st_size
+    metadados["mtime_ns"] = info.st_mtime_ns
+    _gravar_meta(pasta, metadados)
+    return metadados
+
+
+@etapa("conversao_dataset")
+def _converter(file_path, pasta):
+    _verificar_formato(file_path)
+
+    # Pasta temporária exclusiva deste processo, no mesmo sistema de arquivos do destino
+    os.makedirs(PASTA_SIDECAR, exist_ok=True)
+    tmp = tempfile.mkdtemp(
+        dir=PASTA_SIDECAR, prefix=f"{os.path.basename(pasta)}.", suffix=".tmp"
+    )
+    try:
+        extras = _converter_formato(file_path, tmp)
+        info = os.stat(file_path)
+        metadados = {
+            "versao": VERSAO_SIDECAR,
+            "origem": os.path.abspath(file_path),
+            "hash": hash_arquivo(file_path),
+            "tamanho": info.st_size,
+            "mtime_ns": info.st_mtime_ns,
+            "n_amostras": int(
+                np.load(os.path.join(tmp, "sampleTime.npy"), mmap_mode="r").size
+            ),
+            **extras,
+        }
+        _gravar_meta(tmp, metadados)
+        return _publicar(file_path, tmp, pasta, metadados)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _publicar(file_path, tmp, pasta, metadados):
+    """
+    Troca `pasta` pela conversão em `tmp`. O rename de diretório é atômico, mas falha se o
+    destino existir e não estiver vazio: nesse caso, se o sidecar publicado (por outro processo)
+    já vale para o arquivo atual, ele é usado; senão, é movido para o lado e a troca é repetida.
+    """
+    for _ in range(TENTATIVAS_PUBLICACAO):
+        try:
+            os.replace(tmp, pasta)
+            return metadados
+        except OSError:
+            if not os.path.isdir(pasta):
+                raise
+
+        publicado = _validar_sidecar(file_path, pasta)
+        if publicado is not None:
+            return publicado
+
+        antigo = f"{pasta}.{uuid.uuid4().hex}.old"
+        try:
+            os.replace(pasta, antigo)
+        except FileNotFoundError:
+            # Outro processo já tirou o sidecar antigo do caminho
+            continue
+        shutil.rmtree(antigo, ignore_errors=True)
+
+    raise OSError(f"Não foi possível publicar o sidecar de {file_path} em {pasta}.")
+
+
+def _gravar_meta(pasta, metadados):
+    descritor, tmp = tempfile.mkstemp(dir=pasta, prefix="meta.", suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "w", encoding="utf-8") as f:
+            json.dump(metadados, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(pasta, "meta.json"))
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _registrar_uso(pasta):
+    try:
+        os.utime(os.path.join(pasta, "meta.json"))
+    except OSError:
+        pass
+
+
+def _tamanho_pasta(pasta):
+    total = 0
+    for nome in os.listdir(pasta):
+        try:
+            total += os.path.getsize(os.path.join(pasta, nome))
+        except OSError:
+            pass
+    return total
+
+
+def _podar_sidecars(manter=None, capacidade=CAPACIDADE_SIDECARS):
+    """
+    Remove os sidecars usados há mais tempo até o total caber em `capacidade` bytes (nunca
+    `manter`, o que acabou de ser convertido) e as pastas temporárias de conversões
+    interrompidas há mais de `IDADE_MAXIMA_TEMPORARIOS` segundos.
+    """
+    sidecars = []
+    agora = time.time()
+    try:
+        nomes = os.listdir(PASTA_SIDECAR)
+    except OSError:
+        return
+    for nome in nomes:
+        caminho = os.path.join(PASTA_SIDECAR, nome)
+        try:
+            if nome.endswith((".tmp", ".old")):
+                if agora - os.path.getmtime(caminho) > IDADE_MAXIMA_TEMPORARIOS:
+                    shutil.rmtree(caminho, ignore_errors=True)
+                continue
+            uso = os.path.getmtime(os.path.join(caminho, "meta.json"))
+            sidecars.append((uso, caminho, _tamanho_pasta(caminho)))
+        except OSError:
+            continue
+
+    total = sum(tamanho for _, _, tamanho in sidecars)
+    for _, caminho, tamanho in sorted(sidecars):
+        if total <= capacidade:
+            break
+        if manter is not None and os.path.abspath(caminho) == os.path.abspath(manter):
+            continue
+        shutil.rmtree(caminho, ignore_errors=True)
+        total -= tamanho
+
+
+def _salvar_campos(pasta, *vetores):
+    for campo, vetor in zip(CAMPOS, vetores):
+        np.save(os.path.join(pasta, f"{campo}.npy"), np.ravel(vetor).astype(np.float64))
+
+
+def _texto_matlab(valor):
+    """Converte um cell array de strings do MATLAB (carregado pelo scipy) em lista de str."""
+    return [str(np.ravel(item)[0]) for item in np.ravel(valor)]
+
+
+def _converter_mat(file_path, pasta):
+    from scipy.io import loadmat
+
+    try:
+        data = loadmat(file_path)
+    except (NotImplementedError, ValueError):
+        # Arquivos MATLAB v7.3 são HDF5 e não são lidos pelo loadmat
+        return _converter_mat_hdf5(file_path, pasta)
+
+    # A estrutura está encapsulada — precisamos acessar o primeiro item [0][0]
+    reaction_data = data["reactionExperiment"][0, 0]
+    _salvar_campos(
+        pasta,
+        reaction_data["sampleTime"],
+        reaction_data["dataInput"],
+        reaction_data["dataOutput"],
+    )
+
+    extras = {}
+    for campo in ("physicalQuantity", "units"):
+        if campo in reaction_data.dtype.names:
+            extras[campo] = _texto_matlab(reaction_data[campo])
+    return extras
+
+
+def _converter_mat_hdf5(file_path, pasta):
+    try:
+        import h5py
+    except ImportError as erro:
+        raise ImportError(
+            "Leitura de arquivos .mat v7.3 requer o pacote h5py (pip install h5py)."
+        ) from erro
+
+    with h5py.File(file_path, "r") as arquivo:
+        grupo = arquivo["reactionExperiment"]
+
+        # Copia cada campo em blocos, sem carregar o vetor inteiro na memória
+        for campo in CAMPOS:
+            origem = grupo[campo]
+            destino = np.lib.format.open_memmap(
+                os.path.join(pasta, f"{campo}.npy"),
+                mode="w+",
+                dtype=np.float64,
+                shape=(origem.size,),
+            )
+            # O MATLAB grava vetores-linha transpostos: (N, 1) no HDF5
+            for inicio in range(0, origem.size, LINHAS_POR_BLOCO):
+                fim = inicio + LINHAS_POR_BLOCO
+                if origem.ndim == 1:
+                    bloco = origem[inicio:fim]
+                elif origem.shape[1] == 1:
+                    bloco = origem[inicio:fim, 0]
+                else:
+                    bloco = origem[0, inicio:fim]
+                destino[inicio : inicio + len(bloco)] = bloco
+            destino.flush()
+            del destino
+
+        extras = {}
+        for campo in ("physicalQuantity", "units"):
+            if campo in grupo:
+                extras[campo] = [
+                    "".join(chr(c) for c in np.ravel(arquivo[ref][()]))
+                    for ref in np.ravel(grupo[campo][()])
+                ]
+    return extras
+
+
+def _converter_csv(file_path, pasta):
+    """
+    Converte um CSV com colunas tempo, entrada e saída (cabeçalho opcional) em blocos de
+    `LINHAS_POR_BLOCO` linhas, com memória limitada independentemente do tamanho do arquivo.
+    """
+    with open(file_path, encoding="utf-8") as f:
+        primeira = f.readline()
+        cabecalho = not linha_numerica(primeira)
+        n_linhas = sum(1 for linha in f if linha.strip()) + (0 if cabecalho else 1)
+
+    destinos = [
+        np.lib.format.open_memmap(
+            os.path.join(pasta, f"{campo}.npy"),
+            mode="w+",
+            dtype=np.float64,
+            shape=(n_linhas,),
+        )
+        for campo in CAMPOS
+    ]
+
+    with open(file_path, encoding="utf-8") as f:
+        if cabecalho:
+            f.readline()
+        linhas = (linha for linha in f if linha.strip())
+        inicio = 0
+        while inicio < n_linhas:
+            bloco = np.loadtxt(
+                itertools.islice(linhas, LINHAS_POR_BLOCO),
+                delimiter=",",
+                ndmin=2,
+                usecols=(0, 1, 2),
+            )
+            if bloco.size == 0:
+                break
+            for destino, coluna in zip(destinos, bloco.T):
+                destino[inicio : inicio + len(coluna)] = coluna
+            inicio += len(bloco)
+
+    for destino in destinos:
+        destino.flush()
+
+    extras = {}
+    if cabecalho:
+        extras["physicalQuantity"] = [c.strip() for c in primeira.split(",")[:3]]
+    return extras
+
+
+def linha_numerica(linha):
+    """Indica se a linha CSV começa com três campos numéricos (ou seja, não é cabeçalho)."""
+    try:
+        [float(v) for v in linha.split(",")[:3]]
+        return True
+    except ValueError:
+        return False
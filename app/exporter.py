@@ -0,0 +1,130 @@
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import config
+from app.rastreamento import etapa
+
+
+class ExportadorImagens:
+    """
+    Fila de gravação em segundo plano para imagens já renderizadas.
+
+    O caminho da requisição apenas enfileira os bytes (`enviar`) e segue; uma thread de trabalho
+    grava cada arquivo de forma atômica (arquivo temporário + `os.replace`), então um diretório
+    lento ou em rede não afeta a latência da interface. Envios repetidos são coalescidos: se um
+    arquivo ainda está na fila, só a versão mais recente é gravada, e conteúdo idêntico ao último
+    gravado não é regravado.
+    """
+
+    def __init__(self, pasta=None):
+        # Sem pasta, usa a pasta de músicas do usuário, resolvida só na primeira gravação
+        self.pasta = pasta
+        self._fila = queue.Queue()
+        self._pendentes = {}
+        self._ultimo_hash = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._latencias = deque(maxlen=512)
+        self._gravados = 0
+        self._coalescidos = 0
+        self._erros = 0
+
+    def enviar(self, nome, dados):
+        """Enfileira `dados` (bytes) para gravação em `pasta/nome` e retorna imediatamente."""
+        digest = hashlib.sha256(dados).hexdigest()
+
+        with self._lock:
+            if nome in self._pendentes:
+                # Ainda não gravado: substitui pelo conteúdo mais recente
+                self._pendentes[nome] = (dados, digest, self._pendentes[nome][2])
+                self._coalescidos += 1
+                return
+            if self._ultimo_hash.get(nome) == digest:
+                self._coalescidos += 1
+                return
+
+            self._pendentes[nome] = (dados, digest, time.perf_counter())
+            self._iniciar()
+
+        self._fila.put(nome)
+
+    def aguardar(self):
+        """Bloqueia até que todos os arquivos enfileirados tenham sido gravados."""
+        self._fila.join()
+
+    def estatisticas(self):
+        with self._lock:
+            latencias = np.array(self._latencias)
+            resumo = {
+                "profundidade_fila": len(self._pendentes),
+                "gravados": self._gravados,
+                "coalescidos": self._coalescidos,
+                "erros": self._erros,
+            }
+
+        if latencias.size:
+            p50, p95 = np.percentile(latencias, [50, 95])
+            resumo["latencia_ms"] = {
+                "p50": p50 * 1000,
+                "p95": p95 * 1000,
+                "max": latencias.max() * 1000,
+            }
+        return resumo
+
+    def _iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._trabalhar, name="exportador-imagens", daemon=True
+            )
+            self._thread.start()
+
+    def _trabalhar(self):
+        while True:
+            nome = self._fila.get()
+            try:
+                with self._lock:
+                    dados, digest, enfileirado = self._pendentes.pop(nome)
+
+                try:
+                    with etapa("gravacao"):
+                        self._gravar_atomico(nome, dados)
+                except OSError:
+                    with self._lock:
+                        self._erros += 1
+                    continue
+
+                with self._lock:
+                    self._ultimo_hash[nome] = digest
+                    self._gravados += 1
+                    self._latencias.append(time.perf_counter() - enfileirado)
+            finally:
+                self._fila.task_done()
+
+    def _gravar_atomico(self, nome, dados):
+        if self.pasta is None:
+            self.pasta = config.DESKTOP_FOLDER
+        os.makedirs(self.pasta, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.pasta, prefix=f".{nome}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            # mkstemp cria o arquivo com permissão 0600; as imagens devem ser legíveis
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(self.pasta, nome))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+exportador = ExportadorImagens()
@@ -0,0 +1,252 @@
+import numpy as np
+
+# Pontos da grade logarítmica de frequências. A grade só localiza os cruzamentos (que depois
+# são refinados), mas deve ser densa o bastante para a fase não variar mais de 2π entre dois
+# pontos vizinhos no fim da faixa, onde o atraso domina: ~40 pontos por década bastam.
+N_FREQUENCIAS = 320
+
+# Sintonias avaliadas por vez (limita a memória das matrizes sintonias × frequências)
+BLOCO_SINTONIAS = 2048
+
+# Mínimos locais de |1 + L| refinados na busca do pico de sensibilidade
+CANDIDATOS_MS = 8
+
+# Iterações de bisseção no refinamento das frequências de cruzamento
+ITERACOES_REFINO = 30
+
+
+def grade_frequencias(tau, theta, n_pontos=N_FREQUENCIAS):
+    """
+    Grade logarítmica de frequências (rad/s) que cobre de 1000x abaixo da constante de tempo
+    até 100x acima da frequência associada ao atraso, onde ficam os cruzamentos de interesse.
+    """
+    omega_min = 1e-3 / (tau + theta)
+    omega_max = 1e2 / max(min(tau, theta) if theta > 0 else tau, 1e-12)
+    return np.logspace(np.log10(omega_min), np.log10(omega_max), n_pontos)
+
+
+def modulo_fase(k, tau, theta, kp, ti, td, omega):
+    """
+    Módulo e fase (rad, contínua) de L(jω) = C(jω)·K·e^(−jωθ)/(τjω + 1), com o PID ideal
+    C(jω) = Kp·(1 + 1/(jωTi) + jωTd), avaliados sem aproximar o atraso.
+
+    Os parâmetros podem ser escalares ou vetores-coluna (uma sintonia por linha); `omega` é um
+    vetor de frequências. Como cada fator é tratado analiticamente, a fase já sai desenrolada.
+    Ti <= 0 significa sem ação integral, como no simulador.
+    """
+    # Com Ti = inf (sem ação integral) o termo 1/(ωTi) se anula naturalmente
+    ti = np.where(np.asarray(ti) > 0, ti, np.inf)
+    parte_c = omega * td - 1.0 / (omega * ti)
+
+    ganho = np.abs(k * kp)
+    modulo = ganho * np.sqrt(1.0 + parte_c**2) / np.sqrt(1.0 + (omega * tau) ** 2)
+    fase = np.arctan(parte_c) - omega * theta - np.arctan(omega * tau)
+    fase = fase - np.pi * (k * kp < 0)
+    return modulo, fase
+
+
+def _refinar(funcao, esquerda, direita, iteracoes=ITERACOES_REFINO):
+    """
+    Bisseção vetorizada em log(ω): `funcao(omega)` retorna um valor por linha e troca de sinal
+    entre `esquerda` e `direita` (um par de extremos por linha).
+    """
+    a, b = np.log(esquerda), np.log(direita)
+    f_a = funcao(esquerda)
+    for _ in range(iteracoes):
+        meio = 0.5 * (a + b)
+        f_meio = funcao(np.exp(meio))
+        mesmo_lado = np.sign(f_meio) == np.sign(f_a)
+        a = np.where(mesmo_lado, meio, a)
+        f_a = np.where(mesmo_lado, f_meio, f_a)
+        b = np.where(mesmo_lado, b, meio)
+    return np.exp(0.5 * (a + b))
+
+
+def _minimizar(funcao, esquerda, direita, iteracoes=ITERACOES_REFINO):
+    """Seção áurea vetorizada em log(ω): mínimo de `funcao` em [esquerda, direita] por linha."""
+    razao = (np.sqrt(5) - 1) / 2
+    a, b = np.log(esquerda), np.log(direita)
+    c, d = b - razao * (b - a), a + razao * (b - a)
+    f_c, f_d = funcao(np.exp(c)), funcao(np.exp(d))
+    for _ in range(iteracoes):
+        esquerda_menor = f_c < f_d
+        b = np.where(esquerda_menor, d, b)
+        a = np.where(esquerda_menor, a, c)
+        c, d = b - razao * (b - a), a + razao * (b - a)
+        f_c, f_d = funcao(np.exp(c)), funcao(np.exp(d))
+    return np.exp(0.5 * (a + b))
+
+
+def _distancia_menos_um(modulo, fase):
+    """|1 + L(jω)|², o quadrado da distância do diagrama de Nyquist ao ponto −1."""
+    return 1.0 + modulo * (2.0 * np.cos(fase) + modulo)
+
+
+def _margem_fase(fase):
+    """Margem de fase (graus) para a fase contínua de L, reduzida ao intervalo [−180°, 180°)."""
+    return np.rad2deg(np.mod(fase, 2 * np.pi)) - 180.0
+
+
+def _cruzamentos(valores):
+    """Máscara (linhas × intervalos) dos intervalos da grade em que `valores` troca de sinal."""
+    return np.signbit(valores[:, :-1]) != np.signbit(valores[:, 1:])
+
+
+def _margens_bloco(k, tau, theta, kp, ti, td, omega):
+    n = kp.shape[0]
+    linhas = np.arange(n)
+    modulo, fase = modulo_fase(k, tau, theta, kp, ti, td, omega)
+
+    # Cruzamento de ganho (|L| = 1): o de menor margem de fase, se houver mais de um
+    cruza_ganho = _cruzamentos(modulo - 1.0)
+    margem_intervalo = np.where(cruza_ganho, _margem_fase(fase[:, :-1]), np.inf)
+    i_ganho = np.argmin(margem_intervalo, axis=1)
+    tem_ganho = cruza_ganho.any(axis=1)
+
+    # Cruzamentos de fase (∠L = −180° − k·360°): o de maior |L| define a margem de ganho.
+    # `nivel` conta quantos desses níveis a fase (contínua) já atravessou em cada frequência.
+    nivel = np.floor((-np.pi - fase) / (2 * np.pi)) + 1
+    cruza_fase = nivel[:, 1:] != nivel[:, :-1]
+    modulo_intervalo = np.where(cruza_fase, modulo[:, :-1], -np.inf)
+    i_fase = np.argmax(modulo_intervalo, axis=1)
+    tem_fase = cruza_fase.any(axis=1)
+
+    def parametros(linhas_sel):
+        # Um valor por linha selecionada, avaliado em uma frequência por linha
+        return tuple(v[linhas_sel, 0] for v in (k, tau, theta, kp, ti, td))
+
+    omega_cg = np.full(n, np.nan)
+    margem_fase = np.full(n, np.inf)
+    if tem_ganho.any():
+        sel = linhas[tem_ganho]
+        p = parametros(sel)
+        omega_cg[sel] = _refinar(
+            lambda w: modulo_fase(*p, w)[0] - 1.0,
+            omega[i_ganho[sel]],
+            omega[i_ganho[sel] + 1],
+        )
+        margem_fase[sel] = _margem_fase(modulo_fase(*p, omega_cg[sel])[1])
+
+    omega_cf = np.full(n, np.nan)
+    margem_ganho = np.full(n, np.inf)
+    if tem_fase.any():
+        sel = linhas[tem_fase]
+        p = parametros(sel)
+        alvo = -np.pi - 2 * np.pi * np.minimum(
+            nivel[sel, i_fase[sel]], nivel[sel, i_fase[sel] + 1]
+        )
+        omega_cf[sel] = _refinar(
+            lambda w: modulo_fase(*p, w)[1] - alvo,
+            omega[i_fase[sel]],
+            omega[i_fase[sel] + 1],
+        )
+        margem_ganho[sel] = 1.0 / modulo_fase(*p, omega_cf[sel])[0]
+
+    # Pico de sensibilidade Ms = max |1 / (1 + L(jω))|. Cada volta da fase produz uma
+    # aproximação do ponto −1, e as mais próximas podem ser estreitas demais para a grade: os
+    # `CANDIDATOS_MS` menores mínimos locais da grade são refinados por seção áurea
+    distancia = _distancia_menos_um(modulo, fase)
+    interior = distancia[:, 1:-1]
+    minimos = (interior <= distancia[:, :-2]) & (interior <= distancia[:, 2:])
+    valores = np.where(minimos, interior, np.inf)
+    n_candidatos = min(CANDIDATOS_MS, valores.shape[1])
+    candidatos = (
+        np.argpartition(valores, n_candidatos - 1, axis=1)[:, :n_candidatos] + 1
+    )
+
+    p = tuple(np.repeat(v, n_candidatos) for v in parametros(linhas))
+    candidatos = candidatos.ravel()
+    omega_candidatos = _minimizar(
+        lambda w: _distancia_menos_um(*modulo_fase(*p, w)),
+        omega[candidatos - 1],
+        omega[candidatos + 1],
+    )
+    distancia_candidatos = np.minimum(
+        _distancia_menos_um(*modulo_fase(*p, omega_candidatos)),
+        distancia[np.repeat(linhas, n_candidatos), candidatos],
+    ).reshape(n, n_candidatos)
+    melhor = np.argmin(distancia_candidatos, axis=1)
+    omega_ms = omega_candidatos.reshape(n, n_candidatos)[linhas, melhor]
+    with np.errstate(divide="ignore"):
+        ms = 1.0 / np.sqrt(distancia_candidatos[linhas, melhor])
+
+    # Com derivativa ideal, |L| tende a c = |K·Kp·Td/τ| quando ω → ∞ enquanto a fase gira sem
+    # parar, acima de qualquer grade finita: a margem de ganho é no máximo 1/c e o Ms é no
+    # mínimo 1/|1 − c|
+    c = np.abs(k * kp * td / tau)[:, 0]
+    with np.errstate(divide="ignore"):
+        margem_ganho = np.minimum(margem_ganho, 1.0 / c)
+        ms = np.where(c > 0, np.maximum(ms, 1.0 / np.abs(1.0 - c)), ms)
+
+    # Estabilidade pelo critério de Nyquist (L sem polos no semiplano direito): a malha fechada
+    # é estável se o diagrama não envolve −1. Cada passagem pelo semieixo real à esquerda de −1
+    # conta +1 no sentido horário (fase decrescente) e −1 no anti-horário, e ω < 0 repete as
+    # de ω > 0. Em ω = 0 o diagrama atravessa esse semieixo quando K·Kp < 0 e há integrador
+    # (arco no infinito) ou K·Kp < −1. Com c >= 1 ele gira sem fim em volta de −1.
+    passagem = np.abs(np.diff(nivel, axis=1)) > 0
+    alvo = -np.pi - 2 * np.pi * np.minimum(nivel[:, :-1], nivel[:, 1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peso = (alvo - fase[:, :-1]) / (fase[:, 1:] - fase[:, :-1])
+        log_modulo = (1 - peso) * np.log(modulo[:, :-1]) + peso * np.log(modulo[:, 1:])
+    horarias = np.sum(np.diff(nivel, axis=1) * (passagem & (log_modulo > 0)), axis=1)
+    ganho = (k * kp)[:, 0]
+    integrador = (np.isfinite(ti) & (ti > 0))[:, 0]
+    origem = (ganho < 0) & (integrador | (ganho < -1))
+    estavel = (2 * horarias + origem == 0) & (c < 1)
+    ms = np.where(estavel, ms, np.inf)
+
+    return {
+        "margem_ganho": margem_ganho,
+        "margem_fase": margem_fase,
+        "omega_cg": omega_cg,
+        "omega_cf": omega_cf,
+        "ms": ms,
+        "omega_ms": omega_ms,
+        "estavel": estavel,
+    }
+
+
+def margens_estabilidade(k, tau, theta, kp, ti, td, omega=None):
+    """
+    Calcula margens de ganho e fase, frequências de cruzamento e o pico de sensibilidade Ms
+    para um lote de sintonias (e, se desejado, de plantas), com o atraso exato.
+
+    Os cruzamentos são localizados por troca de sinal na grade de frequências, para todas as
+    sintonias de uma vez, e refinados por bisseção vetorizada. Quando há vários cruzamentos
+    (o atraso produz infinitos cruzamentos de fase), vale o pior: maior |L| em −180° e menor
+    margem de fase em |L| = 1. Sem cruzamento na grade, a margem correspondente é infinita e a
+    frequência, NaN. A estabilidade da malha fechada sai do critério de Nyquist, pelas passagens
+    do diagrama à esquerda de −1; para malhas instáveis o Ms é infinito.
+
+    Args:
+    - k, tau, theta, kp, ti, td (float ou numpy.ndarray): Escalares ou um valor por sintonia.
+      Use `ti=np.inf` (ou `ti<=0`) para remover a ação integral e `td=0` para a derivativa.
+    - omega (numpy.ndarray, opcional): Grade de frequências; por padrão `grade_frequencias`.
+
+    Returns:
+    - dict: Vetores "margem_ganho" (linear), "margem_fase" (graus), "omega_cg", "omega_cf",
+      "ms", "omega_ms" (rad/s) e "estavel" (bool), um valor por sintonia.
+    """
+    k, tau, theta, kp, ti, td = (
+        np.ravel(v).astype(np.float64)[:, None]
+        for v in np.broadcast_arrays(k, tau, theta, kp, ti, td)
+    )
+    if omega is None:
+        omega = grade_frequencias(float(tau.max()), float(theta.max()))
+
+    blocos = [
+        _margens_bloco(
+            *(v[i : i + BLOCO_SINTONIAS] for v in (k, tau, theta, kp, ti, td)), omega
+        )
+        for i in range(0, kp.shape[0], BLOCO_SINTONIAS)
+    ]
+    return {nome: np.concatenate([b[nome] for b in blocos]) for nome in blocos[0]}
+
+
+def diagrama_bode(k, tau, theta, kp, ti, td, n_pontos=N_FREQUENCIAS):
+    """
+    Diagrama de Bode de uma sintonia: frequências (rad/s), módulo (dB) e fase (graus) de L(jω).
+    """
+    omega = grade_frequencias(tau, theta, n_pontos)
+    modulo, fase = modulo_fase(k, tau, theta, kp, ti, td, omega)
+    return omega, 20 * np.log10(modulo), np.rad2deg(fase)
@@ -0,0 +1,322 @@
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from app.series import lttb
+from config import HISTORICO_DB
+
+# Execuções gravadas por transação, no máximo, e espera (s) para juntar um lote
+LOTE_MAXIMO = 512
+INTERVALO_LOTE = 0.05
+
+# Pontos guardados de cada resposta (reduzida por LTTB, como nos gráficos)
+PONTOS_HISTORICO = 2000
+
+# Nomes dos parâmetros de cada tipo de modelo identificado
+NOMES_PARAMETROS = {
+    "FOPDT": ("k", "tau", "theta"),
+    "SOPDT": ("k", "tau1", "tau2", "theta"),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY,
+    instante REAL NOT NULL,
+    tipo TEXT NOT NULL,
+    dataset TEXT,
+    metodo TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    metricas TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS respostas (
+    execucao INTEGER PRIMARY KEY REFERENCES execucoes(id) ON DELETE CASCADE,
+    pontos INTEGER NOT NULL,
+    t BLOB NOT NULL,
+    y BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_execucoes_dataset_instante ON execucoes(dataset, instante);
+CREATE INDEX IF NOT EXISTS ix_execucoes_dataset_metodo_instante
+    ON execucoes(dataset, metodo, instante);
+CREATE INDEX IF NOT EXISTS ix_execucoes_metodo_instante ON execucoes(metodo, instante);
+CREATE INDEX IF NOT EXISTS ix_execucoes_tipo_instante ON execucoes(tipo, instante);
+CREATE INDEX IF NOT EXISTS ix_execucoes_instante ON execucoes(instante);
+"""
+
+_COLUNAS = "id, instante, tipo, dataset, metodo, parametros, metricas"
+
+
+class HistoricoExecucoes:
+    """
+    Histórico das identificações e sintonias, em SQLite.
+
+    `registrar` só enfileira a execução: uma thread de fundo junta as que chegam em até
+    `INTERVALO_LOTE` segundos (no máximo `LOTE_MAXIMO`) e as grava em uma só transação, com o
+    banco em modo WAL, então as consultas não esperam pela gravação nem a gravação pelas
+    consultas. As respostas são reduzidas a `PONTOS_HISTORICO` pontos e guardadas como float32
+    comprimido, em uma tabela separada que a listagem não lê.
+
+    A paginação é por chave, na ordem (instante, id) — os relógios de processos diferentes não
+    garantem que o instante cresça com o id. `antes` é o cursor "instante:id" da última
+    execução da página anterior; os índices terminam em instante (e, implicitamente, no rowid),
+    então cada página é uma leitura de `limite` entradas do índice, sem ordenação nem OFFSET,
+    qualquer que seja o tamanho do histórico.
+    """
+
+    def __init__(
+        self, caminho=HISTORICO_DB, lote=LOTE_MAXIMO, intervalo=INTERVALO_LOTE
+    ):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._locais = threading.local()
+        self._esquema_criado = False
+
+        self._gravadas = 0
+        self._lotes = 0
+        self._erros = 0
+
+    def registrar(
+        self, tipo, metodo, parametros, metricas, dataset=None, t=None, y=None
+    ):
+        """
+        Enfileira uma execução ("identificacao" ou "sintonia") e retorna imediatamente.
+
+        `parametros` e `metricas` são dicts simples (valores não finitos viram None); `t` e `y`,
+        se informados, são a resposta simulada.
+        """
+        if not self.caminho:
+            return
+        self._fila.put((time.time(), tipo, dataset, metodo, parametros, metricas, t, y))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._gravar, name="historico", daemon=True
+                )
+                self._thread.start()
+
+    def aguardar(self):
+        """Bloqueia até que todas as execuções enfileiradas tenham sido gravadas."""
+        self._fila.join()
+
+    def listar(
+        self,
+        dataset=None,
+        metodo=None,
+        tipo=None,
+        antes=None,
+        desde=None,
+        ate=None,
+        limite=50,
+    ):
+        """
+        Lista execuções da mais recente para a mais antiga (por instante e id), sem as
+        respostas, com `desde` <= instante < `ate`.
+
+        Returns:
+        - tuple: (execucoes, proximo). `proximo` é o cursor `antes` da página seguinte, ou None
+          na última página.
+
+        Exceções:
+        - Levanta `ValueError` se `antes` não for um cursor "instante:id".
+        """
+        condicoes, valores = [], []
+        for condicao, valor in (
+            ("dataset = ?", dataset),
+            ("metodo = ?", metodo),
+            ("tipo = ?", tipo),
+            ("instante >= ?", desde),
+            ("instante < ?", ate),
+        ):
+            if valor is not None:
+                condicoes.append(condicao)
+                valores.append(valor)
+        if antes is not None:
+            condicoes.append("(instante, id) < (?, ?)")
+            valores.extend(ler_cursor(antes))
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+        conexao = self._leitura()
+        linhas = conexao.execute(
+            f"SELECT {_COLUNAS} FROM execucoes {onde} "
+            "ORDER BY instante DESC, id DESC LIMIT ?",
+            (*valores, limite),
+        ).fetchall()
+        execucoes = [_linha_para_dict(linha) for linha in linhas]
+        proximo = None
+        if len(execucoes) == limite:
+            proximo = f"{execucoes[-1]['instante']!r}:{execucoes[-1]['id']}"
+        return execucoes, proximo
+
+    def obter(self, ids, com_respostas=True):
+        """
+        Retorna as execuções `ids` (na ordem pedida; as inexistentes são omitidas), com "t" e
+        "y" em float32 se `com_respostas`.
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        marcadores = ",".join("?" * len(ids))
+        conexao = self._leitura()
+        execucoes = {
+            linha[0]: _linha_para_dict(linha)
+            for linha in conexao.execute(
+                f"SELECT {_COLUNAS} FROM execucoes WHERE id IN ({marcadores})", ids
+            )
+        }
+        if com_respostas:
+            for execucao, t, y in conexao.execute(
+                f"SELECT execucao, t, y FROM respostas "
+                f"WHERE execucao IN ({marcadores})",
+                ids,
+            ):
+                execucoes[execucao]["t"] = _descomprimir(t)
+                execucoes[execucao]["y"] = _descomprimir(y)
+        return [execucoes[i] for i in ids if i in execucoes]
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "pendentes": self._fila.qsize(),
+                "gravadas": self._gravadas,
+                "lotes": self._lotes,
+                "erros": self._erros,
+            }
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        # Com WAL, NORMAL só arrisca as últimas transações em uma queda de energia
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            if not self._esquema_criado:
+                conexao.executescript(ESQUEMA)
+                self._esquema_criado = True
+        return conexao
+
+    def _leitura(self):
+        # Uma conexão por thread: o sqlite3 não permite compartilhá-las
+        conexao = getattr(self._locais, "conexao", None)
+        if conexao is None:
+            conexao = self._locais.conexao = self._conectar()
+        return conexao
+
+    def _gravar(self):
+        conexao = self._conectar()
+        while True:
+            itens = [self._fila.get()]
+            prazo = time.monotonic() + self.intervalo
+            while len(itens) < self.lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    itens.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            try:
+                with conexao:
+                    for item in itens:
+                        _inserir(conexao, *item)
+            except (sqlite3.Error, ValueError, TypeError):
+                with self._lock:
+                    self._erros += len(itens)
+            else:
+                with self._lock:
+                    self._gravadas += len(itens)
+                    self._lotes += 1
+            finally:
+                for _ in itens:
+                    self._fila.task_done()
+
+
+def ler_cursor(cursor):
+    """Converte o cursor de paginação "instante:id" em (instante, id)."""
+    instante, separador, id_execucao = str(cursor).rpartition(":")
+    if not separador:
+        raise ValueError(f"Cursor de paginação inválido: {cursor!r}")
+    return float(instante), int(id_execucao)
+
+
+def _inserir(conexao, instante, tipo, dataset, metodo, parametros, metricas, t, y):
+    cursor = conexao.execute(
+        "INSERT INTO execucoes (instante, tipo, dataset, metodo, parametros, metricas) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            instante,
+            tipo,
+            dataset,
+            metodo,
+            json.dumps(_finitos(parametros)),
+            json.dumps(_finitos(metricas)),
+        ),
+    )
+    if t is None or y is None:
+        return
+
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = lttb(t, y, PONTOS_HISTORICO)
+    conexao.execute(
+        "INSERT INTO respostas (execucao, pontos, t, y) VALUES (?, ?, ?, ?)",
+        (
+            cursor.lastrowid,
+            indices.size,
+            _comprimir(t[indices]),
+            _comprimir(y[indices]),
+        ),
+    )
+
+
+def _comprimir(valores):
+    # Valores fora do alcance do float32 (respostas divergentes) viram ±inf e NaN continua NaN
+    # antes da conversão, em vez de depender do overflow (com aviso) do cast
+    valores = np.asarray(valores, dtype=np.float64)
+    saturados = np.where(np.isnan(valores), np.nan, np.copysign(np.inf, valores))
+    dentro = np.abs(valores) <= np.finfo(np.float32).max
+    compactos = np.where(dentro, valores, saturados).astype("<f4")
+    return zlib.compress(compactos.tobytes(), 6)
+
+
+def _descomprimir(dados):
+    return np.frombuffer(zlib.decompress(dados), dtype="<f4")
+
+
+def _finitos(valores):
+    # JSON não representa inf/nan: viram None, como nas respostas das rotas
+    return {nome: _valor_json(valor) for nome, valor in valores.items()}
+
+
+def _valor_json(valor):
+    if valor is None or isinstance(valor, (bool, str)):
+        return valor
+    valor = float(valor)
+    return valor if math.isfinite(valor) else None
+
+
+def _linha_para_dict(linha):
+    id_execucao, instante, tipo, dataset, metodo, parametros, metricas = linha
+    return {
+        "id": id_execucao,
+        "instante": instante,
+        "tipo": tipo,
+        "dataset": dataset,
+        "metodo": metodo,
+        "parametros": json.loads(parametros),
+        "metricas": json.loads(metricas),
+    }
+
+
+historico = HistoricoExecucoes()
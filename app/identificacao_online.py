@@ -0,0 +1,594 @@
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+from flask import request
+from flask_socketio import Namespace
+
+from app.metricas import metricas_resposta
+from app.utils import METODOS_DOIS_PONTOS, parametros_dois_pontos, simular_fopdt
+from config import FONTES_PERMITIDAS
+
+NAMESPACE = "/identificacao_online"
+
+# Cada amostra do fluxo é um registro binário (t, u, y) de três float64 little-endian
+DTYPE_AMOSTRA = np.dtype("<f8")
+CANAIS = 3
+BYTES_AMOSTRA = CANAIS * DTYPE_AMOSTRA.itemsize
+
+PORTA_PADRAO = 9750
+CAPACIDADE_PADRAO = 1 << 16
+CAPACIDADE_MINIMA = 1 << 12
+CAPACIDADE_MAXIMA = 1 << 22
+TAMANHO_LEITURA = 1 << 16
+
+
+class BufferCircular:
+    """
+    Buffer circular pré-alocado de amostras (t, u, y).
+
+    Há um único escritor (a thread de leitura da fonte), que copia blocos inteiros para o vetor
+    pré-alocado; nenhuma alocação é feita por amostra. `total` conta as amostras já escritas e
+    serve de índice absoluto para os leitores, que devem consumir os dados antes que sejam
+    sobrescritos (a capacidade deve cobrir vários períodos de publicação).
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self.dados = np.zeros((capacidade, CANAIS))
+        self.total = 0
+
+    def escrever(self, bloco):
+        n = len(bloco)
+        if n > self.capacidade:
+            self.total += n - self.capacidade
+            bloco = bloco[-self.capacidade :]
+            n = self.capacidade
+
+        inicio = self.total % self.capacidade
+        k = min(n, self.capacidade - inicio)
+        self.dados[inicio : inicio + k] = bloco[:k]
+        self.dados[: n - k] = bloco[k:]
+        self.total += n
+
+    def ler(self, inicio, fim):
+        """Copia as amostras de índices absolutos [inicio, fim) em ordem cronológica."""
+        inicio = max(inicio, fim - self.capacidade, 0)
+        return self.dados.take(np.arange(inicio, fim), axis=0, mode="wrap")
+
+
+class LeitorFonte:
+    """
+    Lê registros (t, u, y) de uma fonte de bytes para um `BufferCircular` em uma thread.
+
+    `ler_em(memoryview)` deve preencher o buffer recebido e retornar o número de bytes lidos
+    (interface de `socket.recv_into` e de `readinto` em arquivos e portas seriais). Registros
+    partidos entre duas leituras (TCP, serial) são completados na leitura seguinte.
+    """
+
+    def __init__(self, ler_em, buffer, fechar=None):
+        self._ler_em = ler_em
+        self._fechar = fechar
+        self.buffer = buffer
+        self._bruto = bytearray(TAMANHO_LEITURA)
+        self._amostras = np.frombuffer(self._bruto, dtype=DTYPE_AMOSTRA)
+        self._visao = memoryview(self._bruto)
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(
+            target=self._trabalhar, name="leitor-fonte", daemon=True
+        )
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._fechar:
+            self._fechar()
+
+    def _trabalhar(self):
+        resto = 0
+        while not self._parar.is_set():
+            try:
+                n = self._ler_em(self._visao[resto:])
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not n:
+                break
+
+            disponivel = resto + n
+            completos = disponivel // BYTES_AMOSTRA
+            if completos:
+                amostras = self._amostras[: completos * CANAIS].reshape(
+                    completos, CANAIS
+                )
+                self.buffer.escrever(amostras)
+
+            resto = disponivel - completos * BYTES_AMOSTRA
+            if resto:
+                inicio = completos * BYTES_AMOSTRA
+                self._bruto[:resto] = self._bruto[inicio:disponivel]
+
+
+def fonte_permitida(url, permitidas=FONTES_PERMITIDAS):
+    """
+    Indica se a URL está em `permitidas` (ver `FONTES_PERMITIDAS` em config.py): mesmo esquema
+    e host, e a mesma porta se a entrada tiver uma; para "serial", o mesmo dispositivo.
+    """
+    partes = urlparse(url)
+    for entrada in permitidas:
+        permitida = urlparse(entrada)
+        if partes.scheme != permitida.scheme:
+            continue
+        if partes.scheme == "serial":
+            if partes.path and partes.path == permitida.path:
+                return True
+        elif (partes.hostname or "127.0.0.1") == permitida.hostname and (
+            permitida.port in (None, partes.port or PORTA_PADRAO)
+        ):
+            return True
+    return False
+
+
+def abrir_fonte_stream(url, buffer, permitidas=FONTES_PERMITIDAS):
+    """
+    Cria o leitor de uma fonte de amostras a partir de uma URL:
+
+    - "udp://host:porta": escuta datagramas com um ou mais registros (t, u, y);
+    - "tcp://host:porta": conecta a um servidor que envia os registros em sequência;
+    - "serial:///dev/ttyUSB0?baud=115200": porta serial (requer pyserial).
+
+    Exceções:
+    - Levanta `PermissionError` se a URL não estiver em `permitidas`.
+    - Levanta `ValueError` se o esquema não for suportado, se o pyserial não estiver instalado
+      ou se o caminho serial for um arquivo comum.
+    """
+    if not fonte_permitida(url, permitidas):
+        raise PermissionError(
+            f"Fonte de amostras não permitida: {url} (configure C213_FONTES)"
+        )
+
+    partes = urlparse(url)
+    if partes.scheme == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((partes.hostname or "127.0.0.1", partes.port or PORTA_PADRAO))
+        sock.settimeout(0.5)
+        return LeitorFonte(sock.recv_into, buffer, sock.close)
+
+    if partes.scheme == "tcp":
+        sock = socket.create_connection(
+            (partes.hostname or "127.0.0.1", partes.port or PORTA_PADRAO)
+        )
+        sock.settimeout(0.5)
+        return LeitorFonte(sock.recv_into, buffer, sock.close)
+
+    if partes.scheme == "serial":
+        if os.path.isfile(partes.path):
+            raise ValueError(f"{partes.path} é um arquivo, não uma porta serial.")
+        try:
+            import serial
+        except ImportError:
+            raise ValueError(
+                "Fontes seriais requerem o pacote pyserial (pip install pyserial)."
+            ) from None
+        opcoes = dict(p.split("=", 1) for p in partes.query.split("&") if "=" in p)
+        porta = serial.Serial(partes.path, int(opcoes.get("baud", 115200)), timeout=0.5)
+        return LeitorFonte(porta.readinto, buffer, porta.close)
+
+    raise ValueError(f"Fonte de amostras não suportada: {url}")
+
+
+class SimuladorPlanta:
+    """
+    Fonte local que substitui a bancada: envia por UDP a resposta ao degrau de uma planta FOPDT
+    com ruído de medição, em pacotes de `amostras_por_pacote` registros a `taxa_hz` amostras por
+    segundo (tempo de parede). Cada amostra avança `dt` segundos no tempo da planta.
+
+    Os valores padrão reproduzem o experimento do dataset do projeto.
+    """
+
+    def __init__(
+        self,
+        k=4.66,
+        tau=3097.5,
+        theta=1132.5,
+        amplitude=90.77,
+        y0=9.3,
+        dt=5.0,
+        t_degrau=100.0,
+        ruido=0.5,
+        taxa_hz=1000,
+        amostras_por_pacote=50,
+        destino=("127.0.0.1", PORTA_PADRAO),
+        semente=None,
+    ):
+        self.k, self.tau, self.theta = k, tau, theta
+        self.amplitude, self.y0, self.dt = amplitude, y0, dt
+        self.t_degrau, self.ruido = t_degrau, ruido
+        self.taxa_hz = taxa_hz
+        self.amostras_por_pacote = amostras_por_pacote
+        self.destino = destino
+        self._rng = np.random.default_rng(semente)
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(
+            target=self._trabalhar, name="simulador-planta", daemon=True
+        )
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _trabalhar(self):
+        n = self.amostras_por_pacote
+        pacote = np.empty((n, CANAIS), dtype=DTYPE_AMOSTRA)
+        t, u, y = pacote[:, 0], pacote[:, 1], pacote[:, 2]
+        passos = np.arange(n, dtype=np.float64)
+        ruido = np.empty(n)
+        periodo = n / self.taxa_hz
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        proximo = time.perf_counter()
+        enviados = 0
+        try:
+            while not self._parar.is_set():
+                np.multiply(passos + enviados, self.dt, out=t)
+                np.greater_equal(t, self.t_degrau, out=u)
+                u *= self.amplitude
+
+                # y = y0 + K·A·(1 − e^(−(t − t_degrau − θ)/τ)) após o atraso
+                np.subtract(t, self.t_degrau + self.theta, out=y)
+                np.maximum(y, 0.0, out=y)
+                y /= -self.tau
+                np.exp(y, out=y)
+                np.subtract(1.0, y, out=y)
+                y *= self.k * self.amplitude
+                y += self.y0
+                self._rng.standard_normal(out=ruido)
+                ruido *= self.ruido
+                y += ruido
+
+                sock.sendto(pacote, self.destino)
+                enviados += n
+
+                proximo += periodo
+                espera = proximo - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+        finally:
+            sock.close()
+
+
+class EstimadorRLS:
+    """
+    Mínimos quadrados recursivos do modelo ARX y[n] = a·y[n−1] + b·u[n−1−d] (desvios em
+    relação ao início do ensaio), para um banco de atrasos candidatos `d` de uma vez.
+
+    As amostras são incorporadas em blocos: as somas ponderadas ΣλφφT e Σλφy de todos os
+    atrasos são atualizadas com algumas operações vetorizadas por bloco, o que equivale ao RLS
+    amostra a amostra com fator de esquecimento λ. O atraso escolhido é o de menor custo
+    ponderado, e o modelo discreto é convertido em (K, τ, θ) pela discretização exata (ZOH).
+    """
+
+    def __init__(self, dt, atraso_max=1024, n_atrasos=256, esquecimento=1.0):
+        self.dt = dt
+        self.atrasos = np.unique(np.linspace(0, atraso_max, n_atrasos).astype(np.intp))
+        self.esquecimento = esquecimento
+        n = self.atrasos.size
+        self._yy = 0.0
+        self._yu = np.zeros(n)
+        self._uu = np.zeros(n)
+        self._ry = 0.0
+        self._ru = np.zeros(n)
+        self._s = 0.0
+
+    def atualizar(self, y_anterior, y, u_atrasado):
+        """
+        Incorpora um bloco: `y_anterior` e `y` com forma (B,), `u_atrasado` com forma
+        (B, n_atrasos) contendo u[n−1−d] para cada atraso candidato.
+        """
+        pesos = self.esquecimento ** np.arange(y.size - 1, -1, -1, dtype=np.float64)
+        decaimento = self.esquecimento**y.size
+        wy_anterior = pesos * y_anterior
+        wu = pesos[:, None] * u_atrasado
+
+        self._yy = decaimento * self._yy + wy_anterior @ y_anterior
+        self._yu = decaimento * self._yu + wy_anterior @ u_atrasado
+        self._uu = decaimento * self._uu + np.einsum("ij,ij->j", wu, u_atrasado)
+        self._ry = decaimento * self._ry + wy_anterior @ y
+        self._ru = decaimento * self._ru + y @ wu
+        self._s = decaimento * self._s + (pesos * y) @ y
+
+    def parametros(self):
+        """Retorna (K, τ, θ) do melhor atraso, ou None se ainda não há excitação suficiente."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            det = self._yy * self._uu - self._yu**2
+            a = (self._uu * self._ry - self._yu * self._ru) / det
+            b = (self._yy * self._ru - self._yu * self._ry) / det
+            custo = (
+                self._s
+                - 2 * (a * self._ry + b * self._ru)
+                + a**2 * self._yy
+                + 2 * a * b * self._yu
+                + b**2 * self._uu
+            )
+
+        validos = (det > 1e-12 * self._yy * self._uu) & (a > 0) & (a < 1)
+        if not validos.any():
+            return None
+        i = int(np.argmin(np.where(validos, custo, np.inf)))
+        return (
+            float(b[i] / (1 - a[i])),
+            float(-self.dt / np.log(a[i])),
+            float(self.atrasos[i] * self.dt),
+        )
+
+
+class IdentificadorOnline:
+    """
+    Identificação FOPDT contínua sobre um fluxo de amostras (t, u, y).
+
+    Uma thread de leitura grava as amostras no `BufferCircular`; a cada período de publicação o
+    identificador consome o trecho novo, atualiza o estimador e calcula o EQM do modelo sobre a
+    janela do buffer. O estimador é "rls" (`EstimadorRLS`) ou um método de dois pontos de
+    `METODOS_DOIS_PONTOS` (valor final = média do fim da janela).
+
+    O instante do degrau e as passagens pelos limiares do método de dois pontos são acompanhados
+    à medida que as amostras chegam, como em `identificar_em_blocos`: de cada lado do valor de
+    base guarda-se só a sequência de recordes do desvio de y (instante e valor de cada novo
+    máximo), que é monótona e basta para localizar a primeira passagem por qualquer limiar.
+    Assim o buffer só precisa conter a janela do EQM, e as estimativas continuam depois que
+    ele dá a volta.
+
+    O RLS dá estimativas já no início da subida, mas, como todo ajuste por erro de equação, é
+    polarizado pelo ruído de medição (τ tende a diminuir à medida que o regime permanente entra
+    na janela); por isso o padrão é o método de Smith sobre a janela.
+    """
+
+    def __init__(
+        self,
+        leitor,
+        estimador="Smith",
+        atraso_max=1024,
+        n_atrasos=256,
+        esquecimento=1.0,
+        amostras_base=16,
+    ):
+        if estimador != "rls" and estimador not in METODOS_DOIS_PONTOS:
+            raise ValueError(f"Estimador desconhecido: {estimador}")
+        self.leitor = leitor
+        self.buffer = leitor.buffer
+        self.estimador = estimador
+        self._opcoes_rls = (atraso_max, n_atrasos, esquecimento)
+        self._amostras_base = amostras_base
+        self._rls = None
+        self._base = None
+        self._processadas = 0
+        self._lidas = 0
+        self._t_degrau = None
+        self._indice_degrau = None
+        self._recordes = {}
+        self._inicio = None
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self.leitor.iniciar()
+
+    def parar(self):
+        self.leitor.parar()
+
+    def atualizar(self):
+        """Processa as amostras recebidas desde a última chamada e retorna a estimativa atual."""
+        total = self.buffer.total
+        if total < self._amostras_base + 2:
+            return None
+
+        if self._base is None:
+            inicio = self.buffer.ler(0, self._amostras_base)
+            self._base = inicio[:, 1:].mean(axis=0)
+            self._dt = float(np.median(np.diff(inicio[:, 0])))
+            self._rls = EstimadorRLS(self._dt, *self._opcoes_rls)
+            self._processadas = 1
+            self._recordes = {1.0: ([], -np.inf), -1.0: ([], -np.inf)}
+
+        # Amostras que já saíram do buffer antes de serem lidas estão perdidas
+        primeira = max(self._lidas, total - self.buffer.capacidade)
+        novas = self.buffer.ler(primeira, total)
+        self._lidas = total
+        u0, y0 = self._base
+        if self._t_degrau is None:
+            novas = self._detectar_degrau(novas, primeira, u0)
+        if self._t_degrau is None:
+            self._processadas = total
+            return {"amostras": total, "taxa_hz": self._taxa(total)}
+
+        if self.estimador == "rls":
+            self._atualizar_rls(total)
+            parametros = self._rls.parametros()
+        else:
+            self._acumular_recordes(novas, y0)
+            parametros = self._dois_pontos(total, y0)
+
+        estimativa = {"amostras": total, "taxa_hz": self._taxa(total)}
+        if parametros is not None:
+            k, tau, theta = parametros
+            janela = self.buffer.ler(0, total)
+            estimativa.update(
+                k=k, tau=tau, theta=theta, eqm=self._eqm(parametros, janela)
+            )
+        return estimativa
+
+    def _taxa(self, total):
+        return total / max(time.perf_counter() - self._inicio, 1e-9)
+
+    def _detectar_degrau(self, novas, primeira, u0):
+        """Procura o degrau em u nas amostras novas e retorna o trecho a partir dele."""
+        desvio = np.abs(novas[:, 1] - u0)
+        limiar = 0.5 * desvio.max(initial=0.0)
+        if limiar <= 0:
+            return novas[:0]
+        indice = int(np.argmax(desvio >= limiar))
+        self._t_degrau = float(novas[indice, 0])
+        self._indice_degrau = primeira + indice
+        self._step = float(novas[-1, 1] - u0)
+        return novas[indice:]
+
+    def _acumular_recordes(self, novas, y0):
+        """Acrescenta os novos máximos de ±(y − y0) às sequências de recordes de cada lado."""
+        if not novas.size:
+            return
+        t = novas[:, 0] - self._t_degrau
+        for sinal, (blocos, maximo) in self._recordes.items():
+            acumulado = np.maximum.accumulate(sinal * (novas[:, 2] - y0))
+            np.maximum(acumulado, maximo, out=acumulado)
+            novos = np.flatnonzero(np.diff(acumulado, prepend=maximo) > 0)
+            if novos.size:
+                blocos.append((t[novos], acumulado[novos]))
+            self._recordes[sinal] = (blocos, acumulado[-1])
+
+    def _atualizar_rls(self, total):
+        inicio = self._processadas
+        if inicio >= total:
+            return
+        atrasos = self._rls.atrasos
+
+        # Histórico a partir de u[inicio − 1 − atraso_max]; antes do início do fluxo, u e y
+        # valem os valores de base (desvio nulo). A capacidade do buffer deve cobrir o atraso
+        # máximo mais as amostras de um período de publicação.
+        primeiro = inicio - 1 - int(atrasos[-1])
+        desvios = np.zeros((total - primeiro, 2))
+        existentes = max(primeiro, 0)
+        desvios[existentes - primeiro :] = self.buffer.ler(existentes, total)[:, 1:]
+        desvios[existentes - primeiro :] -= self._base
+
+        posicoes = np.arange(inicio, total) - primeiro
+        y = desvios[posicoes, 1]
+        y_anterior = desvios[posicoes - 1, 1]
+        u_atrasado = desvios[(posicoes - 1)[:, None] - atrasos[None, :], 0]
+
+        self._rls.atualizar(y_anterior, y, u_atrasado)
+        self._processadas = total
+
+    def _dois_pontos(self, total, y0):
+        depois = total - self._indice_degrau
+        if depois < 2:
+            return None
+
+        # Valor final: média do último 1% das amostras após o degrau (limitado ao buffer)
+        fim = self.buffer.ler(total - max(1, depois // 100), total)
+        final = (fim[:, 2] - y0).mean()
+        fracoes, _ = METODOS_DOIS_PONTOS[self.estimador]
+        blocos, _ = self._recordes[1.0 if final >= 0 else -1.0]
+        if not blocos:
+            return None
+        if len(blocos) > 1:
+            blocos[:] = [tuple(map(np.concatenate, zip(*blocos)))]
+        t, acumulado = blocos[0]
+        indices = np.searchsorted(acumulado, np.asarray(fracoes) * abs(final))
+        if indices[-1] >= acumulado.size:
+            return None
+        tau, theta = parametros_dois_pontos(self.estimador, *t[indices])
+        if tau <= 0:
+            return None
+        return float(final / self._step), float(tau), float(theta)
+
+    def _eqm(self, parametros, janela):
+        y_modelo = simular_fopdt(
+            parametros, janela[:, 0], self._step, t_inicial=self._t_degrau
+        )[0]
+        medido = janela[:, 2] - self._base[1]
+        metricas = metricas_resposta(janela[:, 0], y_modelo, medido, temporais=False)
+        return float(metricas["eqm"][0])
+
+
+class NamespaceIdentificacaoOnline(Namespace):
+    """
+    Namespace Socket.IO da identificação em tempo real.
+
+    "iniciar" recebe {"fonte": "simulador" | URL de `abrir_fonte_stream`, "estimador",
+    "taxa_publicacao", "capacidade"} e passa a emitir "parametros" (K, τ, θ, EQM, amostras,
+    taxa) a todos os clientes do namespace na taxa pedida; "parar" encerra a sessão. Há uma
+    sessão por vez. A capacidade do buffer é limitada a [`CAPACIDADE_MINIMA`,
+    `CAPACIDADE_MAXIMA`]. Fontes fora de `FONTES_PERMITIDAS`, ou que não abrem, e opções
+    inválidas são recusadas com o evento "erro" ao cliente que pediu.
+    """
+
+    def __init__(self, namespace=NAMESPACE):
+        super().__init__(namespace)
+        self._lock = threading.Lock()
+        self._sessao = None
+        self.ultima = None
+
+    def on_iniciar(self, dados=None):
+        dados = dados or {}
+        self.on_parar()
+
+        fonte = dados.get("fonte", "simulador")
+        try:
+            taxa_publicacao = float(dados.get("taxa_publicacao", 5.0))
+            if not 0 < taxa_publicacao < float("inf"):
+                raise ValueError("A taxa de publicação deve ser positiva.")
+            capacidade = int(dados.get("capacidade", CAPACIDADE_PADRAO))
+            buffer = BufferCircular(
+                min(max(capacidade, CAPACIDADE_MINIMA), CAPACIDADE_MAXIMA)
+            )
+            if fonte == "simulador":
+                # A fonte do simulador local é montada aqui, não vem do cliente
+                url = f"udp://127.0.0.1:{int(dados.get('porta', PORTA_PADRAO))}"
+                leitor = abrir_fonte_stream(url, buffer, permitidas=(url,))
+                simulador = SimuladorPlanta(
+                    destino=("127.0.0.1", int(dados.get("porta", PORTA_PADRAO))),
+                    taxa_hz=float(dados.get("taxa_hz", 1000)),
+                )
+            else:
+                leitor = abrir_fonte_stream(fonte, buffer)
+                simulador = None
+            identificador = IdentificadorOnline(
+                leitor, estimador=dados.get("estimador", "Smith")
+            )
+        except (OSError, TypeError, ValueError) as erro:
+            self.emit("erro", {"erro": str(erro)}, room=request.sid)
+            return
+
+        parar = threading.Event()
+        with self._lock:
+            self._sessao = (identificador, simulador, parar)
+        identificador.iniciar()
+        if simulador:
+            simulador.iniciar()
+        self.socketio.start_background_task(
+            self._publicar, identificador, parar, 1.0 / taxa_publicacao
+        )
+
+    def on_parar(self, dados=None):
+        with self._lock:
+            sessao, self._sessao = self._sessao, None
+        if sessao is None:
+            return
+        identificador, simulador, parar = sessao
+        parar.set()
+        if simulador:
+            simulador.parar()
+        identificador.parar()
+
+    def _publicar(self, identificador, parar, periodo):
+        proximo = time.perf_counter()
+        while not parar.is_set():
+            estimativa = identificador.atualizar()
+            if estimativa is not None:
+                self.ultima = estimativa
+                self.emit("parametros", estimativa)
+
+            proximo += periodo
+            self.socketio.sleep(max(0.0, proximo - time.perf_counter()))
+
+
+identificacao_online = NamespaceIdentificacaoOnline()
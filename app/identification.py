@@ -0,0 +1,486 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.dataset import abrir_experimento, linha_numerica
+from app.metricas import metricas_resposta
+from app.rastreamento import etapa
+from app.utils import (
+    FRACOES_DOIS_PONTOS,
+    calcular_eqm,
+    parametros_dois_pontos,
+    simular_fopdt,
+    simular_sopdt,
+)
+
+# Amostras lidas por bloco nas passadas sobre o experimento
+TAMANHO_BLOCO = 1 << 16
+
+# Fração usada pelo modelo FOPDT clássico de `parametros_fopdt`
+FRACAO_FOPDT = 0.6321
+
+
+class FonteMemmap:
+    """Fonte de blocos a partir de vetores em memória ou memory-mapped (sidecar .npy)."""
+
+    def __init__(self, time, data_input, data_output):
+        self.time = time
+        self.data_input = data_input
+        self.data_output = data_output
+
+    def __len__(self):
+        return len(self.time)
+
+    def blocos(self, tamanho):
+        for inicio in range(0, len(self.time), tamanho):
+            fim = inicio + tamanho
+            yield (
+                np.asarray(self.time[inicio:fim], dtype=np.float64),
+                np.asarray(self.data_input[inicio:fim], dtype=np.float64),
+                np.asarray(self.data_output[inicio:fim], dtype=np.float64),
+            )
+
+    def cauda(self, n):
+        return tuple(
+            np.asarray(v[-n:], dtype=np.float64)
+            for v in (self.time, self.data_input, self.data_output)
+        )
+
+
+class FonteCSV:
+    """
+    Fonte de blocos lida diretamente de um CSV (tempo, entrada, saída), sem conversão prévia.
+
+    A cauda é obtida lendo o arquivo de trás para frente, então a estimativa de regime
+    permanente não exige percorrer o arquivo inteiro.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, encoding="utf-8") as f:
+            self._cabecalho = not linha_numerica(f.readline())
+
+    def blocos(self, tamanho):
+        with open(self.file_path, encoding="utf-8") as f:
+            if self._cabecalho:
+                f.readline()
+            linhas = (linha for linha in f if linha.strip())
+            while True:
+                lote = list(itertools.islice(linhas, tamanho))
+                if not lote:
+                    return
+                bloco = np.loadtxt(lote, delimiter=",", ndmin=2, usecols=(0, 1, 2))
+                yield bloco[:, 0], bloco[:, 1], bloco[:, 2]
+
+    def cauda(self, n):
+        with open(self.file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            fim = f.tell()
+            janela = 4096
+            while True:
+                inicio = max(0, fim - janela)
+                f.seek(inicio)
+                linhas = [
+                    linha
+                    for linha in f.read(fim - inicio).decode("utf-8").splitlines()
+                    if linha.strip()
+                ]
+                if inicio > 0:
+                    # A primeira linha pode estar cortada
+                    linhas = linhas[1:]
+                if len(linhas) >= n or inicio == 0:
+                    break
+                janela *= 4
+
+        linhas = [linha for linha in linhas if linha_numerica(linha)][-n:]
+        dados = np.loadtxt(linhas, delimiter=",", ndmin=2, usecols=(0, 1, 2))
+        return dados[:, 0], dados[:, 1], dados[:, 2]
+
+
+class FonteHDF5:
+    """Fonte de blocos lida de um arquivo HDF5 (por exemplo, .mat v7.3) com h5py."""
+
+    def __init__(self, file_path, grupo="reactionExperiment"):
+        import h5py
+
+        self._arquivo = h5py.File(file_path, "r")
+        g = self._arquivo[grupo]
+        self._campos = [g["sampleTime"], g["dataInput"], g["dataOutput"]]
+
+    def __len__(self):
+        return self._campos[0].size
+
+    def _fatia(self, campo, inicio, fim):
+        # O MATLAB grava vetores-linha transpostos: (N, 1) no HDF5
+        if campo.ndim == 1:
+            return campo[inicio:fim]
+        if campo.shape[1] == 1:
+            return campo[inicio:fim, 0]
+        return campo[0, inicio:fim]
+
+    def blocos(self, tamanho):
+        for inicio in range(0, len(self), tamanho):
+            yield tuple(
+                np.asarray(self._fatia(c, inicio, inicio + tamanho), dtype=np.float64)
+                for c in self._campos
+            )
+
+    def cauda(self, n):
+        inicio = max(0, len(self) - n)
+        return tuple(
+            np.asarray(self._fatia(c, inicio, len(self)), dtype=np.float64)
+            for c in self._campos
+        )
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def abrir_fonte(file_path):
+    """
+    Abre uma fonte de blocos para o arquivo: .csv e .h5/.hdf5 são lidos diretamente; .mat e
+    demais formatos suportados passam pelo sidecar memory-mapped de `app.dataset`.
+    """
+    extensao = os.path.splitext(file_path)[1].lower()
+    if extensao == ".csv":
+        return FonteCSV(file_path)
+    if extensao in (".h5", ".hdf5"):
+        return FonteHDF5(file_path)
+
+    experimento = abrir_experimento(file_path)
+    return FonteMemmap(
+        experimento.sample_time, experimento.data_input, experimento.data_output
+    )
+
+
+def identificar_em_blocos(
+    fonte,
+    metodos=("Sundaresan", "Smith"),
+    step=None,
+    tamanho_bloco=TAMANHO_BLOCO,
+    janela_final=1,
+    com_eqm=True,
+):
+    """
+    Identifica modelos FOPDT de um experimento longo lendo-o em blocos de tamanho fixo.
+
+    1. A cauda do experimento fornece a estimativa de regime permanente (média das últimas
+       `janela_final` amostras; com 1, o último valor, como em `identification_process`) e,
+       se `step` não for informado, a amplitude do degrau (média da entrada na cauda, em vez
+       da média da entrada inteira usada por `carregar_dataset`).
+    2. Uma única passada localiza, para todos os métodos ao mesmo tempo, os cruzamentos das
+       frações da variação total (via máximo acumulado + `searchsorted`, sem um vetor booleano
+       por limiar) e o início do tempo morto; a leitura para assim que tudo foi encontrado.
+    3. Se `com_eqm`, uma segunda passada acumula o EQM de todos os modelos em lote.
+
+    A memória usada é proporcional a `tamanho_bloco`, não ao tamanho do experimento.
+
+    Returns:
+    - dict: Parâmetros (k, tau, theta, eqm) por método, o modelo FOPDT clássico e o número de
+      amostras lidas na passada de cruzamentos.
+    """
+    t_cauda, u_cauda, y_cauda = fonte.cauda(janela_final)
+    if step is None:
+        step = float(np.mean(u_cauda))
+
+    blocos = fonte.blocos(tamanho_bloco)
+    t_bloco, _, y_bloco = next(blocos)
+    t_inicial = float(t_bloco[0])
+    valor_inicial = float(y_bloco[0])
+    variacao = float(np.mean(y_cauda)) - valor_inicial
+    sinal = 1.0 if variacao >= 0 else -1.0
+
+    # Todas as frações necessárias, em ordem crescente
+    fracoes = sorted(
+        {f for m in metodos for f in FRACOES_DOIS_PONTOS[m]} | {FRACAO_FOPDT}
+    )
+    limiares = np.array(fracoes) * abs(variacao)
+    instantes = np.full(len(fracoes), np.nan)
+
+    indice_mudanca = None
+    t_anterior = t_inicial  # instante da última amostra do bloco anterior
+    maximo = -np.inf
+    lidas = 0
+
+    for t_bloco, _, y_bloco in itertools.chain([(t_bloco, None, y_bloco)], blocos):
+        if indice_mudanca is None:
+            diferentes = np.flatnonzero(y_bloco != valor_inicial)
+            if diferentes.size:
+                i = diferentes[0]
+                # θ é o instante anterior à primeira mudança da saída
+                indice_mudanca = lidas + i - 1
+                theta_fopdt = t_bloco[i - 1] if i > 0 else t_anterior
+
+        acumulado = np.maximum.accumulate(sinal * (y_bloco - valor_inicial))
+        np.maximum(acumulado, maximo, out=acumulado)
+        maximo = acumulado[-1]
+
+        pendentes = np.isnan(instantes)
+        posicoes = np.searchsorted(acumulado, limiares[pendentes], side="left")
+        encontrados = posicoes < acumulado.size
+        instantes[np.flatnonzero(pendentes)[encontrados]] = t_bloco[
+            posicoes[encontrados]
+        ]
+
+        lidas += y_bloco.size
+        t_anterior = t_bloco[-1]
+        if indice_mudanca is not None and not np.isnan(instantes).any():
+            break
+
+    if indice_mudanca is None or np.isnan(instantes).any():
+        raise IndexError("O processo não mostra uma mudança detectável.")
+
+    tempo_em = dict(zip(fracoes, instantes))
+    k = variacao / step
+
+    resultado = {"metodos": {}, "amostras_lidas": lidas, "step": step}
+    for metodo in metodos:
+        frac1, frac2 = FRACOES_DOIS_PONTOS[metodo]
+        tau, theta = parametros_dois_pontos(metodo, tempo_em[frac1], tempo_em[frac2])
+        resultado["metodos"][metodo] = {"k": k, "tau": tau, "theta": theta}
+
+    resultado["fopdt"] = {
+        "k": k,
+        "tau": tempo_em[FRACAO_FOPDT] - theta_fopdt,
+        "theta": theta_fopdt,
+    }
+
+    if com_eqm:
+        parametros = [
+            (p["k"], p["tau"], p["theta"]) for p in resultado["metodos"].values()
+        ]
+        eqms = eqm_em_blocos(
+            fonte, parametros, step, valor_inicial, t_inicial, tamanho_bloco
+        )
+        for p, eqm in zip(resultado["metodos"].values(), eqms):
+            p["eqm"] = float(eqm)
+
+    return resultado
+
+
+def eqm_em_blocos(
+    fonte, parametros, step, valor_inicial, t_inicial, tamanho_bloco=TAMANHO_BLOCO
+):
+    """
+    Calcula o EQM de vários modelos FOPDT acumulando a soma dos quadrados bloco a bloco.
+
+    Returns:
+    - numpy.ndarray: Um EQM por conjunto de parâmetros.
+    """
+    soma = np.zeros(len(parametros))
+    n = 0
+    for t_bloco, _, y_bloco in fonte.blocos(tamanho_bloco):
+        y_sim = simular_fopdt(parametros, t_bloco, step, t_inicial=t_inicial)
+        y_sim -= y_bloco - valor_inicial
+        soma += np.einsum("ij,ij->i", y_sim, y_sim)
+        n += y_bloco.size
+    return np.sqrt(soma / n)
+
+
+# ---------------------------------------------------------------------------
+# Registro de métodos de identificação e torneio
+# ---------------------------------------------------------------------------
+
+METODOS_IDENTIFICACAO = {}
+
+# Amostras usadas nos ajustes por mínimos quadrados (a série é decimada acima disso)
+AMOSTRAS_AJUSTE = 2000
+
+
+def registrar_metodo(nome, modelo="FOPDT"):
+    """
+    Decorador que registra uma função de identificação em `METODOS_IDENTIFICACAO`.
+
+    A função recebe (step, time, output) e retorna os parâmetros do modelo: (K, τ, θ) para
+    "FOPDT" ou (K, τ1, τ2, θ) para "SOPDT". O EQM é calculado pelo torneio, em lote.
+    """
+
+    def decorador(funcao):
+        METODOS_IDENTIFICACAO[nome] = (modelo, funcao)
+        return funcao
+
+    return decorador
+
+
+def instantes_cruzamento(time, output_padronizado, fracoes):
+    """
+    Retorna os primeiros instantes em que a saída padronizada atinge cada fração da sua
+    variação total, com uma única varredura (máximo acumulado + `searchsorted`).
+    """
+    variacao = output_padronizado[-1]
+    sinal = 1.0 if variacao >= 0 else -1.0
+    acumulado = np.maximum.accumulate(sinal * output_padronizado)
+    indices = np.searchsorted(acumulado, np.asarray(fracoes) * abs(variacao))
+    return time[np.minimum(indices, len(time) - 1)]
+
+
+def _metodo_dois_pontos(nome):
+    def identificar(step, time, output):
+        output_padronizado = output - output[0]
+        k = output_padronizado[-1] / step
+        t1, t2 = instantes_cruzamento(
+            time, output_padronizado, FRACOES_DOIS_PONTOS[nome]
+        )
+        tau, theta = parametros_dois_pontos(nome, t1, t2)
+        return k, tau, theta
+
+    return identificar
+
+
+for _nome in FRACOES_DOIS_PONTOS:
+    registrar_metodo(_nome)(_metodo_dois_pontos(_nome))
+
+
+def _reta_tangente(time, output_padronizado, janela=None):
+    """
+    Ponto de inflexão (maior derivada) e a inclinação da reta tangente nele.
+
+    A derivada é tomada sobre a saída suavizada por média móvel (`janela` amostras, por padrão
+    2% da série); sem isso, o ruído de medição domina o máximo da derivada.
+    """
+    n = len(output_padronizado)
+    janela = janela or max(1, n // 50)
+    acumulado = np.concatenate(([0.0], np.cumsum(output_padronizado, dtype=np.float64)))
+    suavizado = (acumulado[janela:] - acumulado[:-janela]) / janela
+    tempo = time[janela // 2 : janela // 2 + len(suavizado)]
+
+    derivada = np.gradient(suavizado, tempo)
+    i = int(np.argmax(derivada if output_padronizado[-1] >= 0 else -derivada))
+    return tempo[i], suavizado[i], derivada[i]
+
+
+@registrar_metodo("Tangente")
+def identificar_tangente(step, time, output):
+    """
+    Método da tangente (Ziegler-Nichols): a tangente no ponto de inflexão cruza o valor inicial
+    em θ e o valor final em θ + τ.
+    """
+    output_padronizado = output - output[0]
+    final = output_padronizado[-1]
+    t_i, y_i, inclinacao = _reta_tangente(time, output_padronizado)
+
+    theta = t_i - y_i / inclinacao
+    tau = t_i + (final - y_i) / inclinacao - theta
+    return final / step, tau, theta
+
+
+@registrar_metodo("Hägglund")
+def identificar_hagglund(step, time, output):
+    """
+    Método de Hägglund: θ pela tangente no ponto de inflexão, como no método da tangente, e
+    θ + τ no instante em que a saída atinge 63,2% da variação total.
+    """
+    output_padronizado = output - output[0]
+    final = output_padronizado[-1]
+    t_i, y_i, inclinacao = _reta_tangente(time, output_padronizado)
+
+    theta = t_i - y_i / inclinacao
+    (t63,) = instantes_cruzamento(time, output_padronizado, [0.632])
+    return final / step, t63 - theta, theta
+
+
+def _amostras_ajuste(time, output):
+    passo = max(1, len(time) // AMOSTRAS_AJUSTE)
+    time = np.asarray(time[::passo], dtype=np.float64)
+    return time, np.asarray(output[::passo], dtype=np.float64) - output[0]
+
+
+@registrar_metodo("Mínimos quadrados FOPDT")
+def identificar_mq_fopdt(step, time, output):
+    """Ajuste de (K, τ, θ) por mínimos quadrados, partindo da estimativa de Smith."""
+    from scipy.optimize import least_squares
+
+    t0 = time[0]
+    time, y = _amostras_ajuste(time, output)
+    inicial = np.array(_metodo_dois_pontos("Smith")(step, time, y + output[0]))
+    duracao = time[-1] - t0
+    inicial[1] = max(inicial[1], duracao * 1e-3)
+    inicial[2] = min(max(inicial[2], 0.0), duracao)
+
+    def residuo(p):
+        return simular_fopdt(p, time, step, t_inicial=t0)[0] - y
+
+    ajuste = least_squares(
+        residuo,
+        inicial,
+        bounds=([-np.inf, duracao * 1e-6, 0.0], [np.inf, np.inf, duracao]),
+    )
+    return tuple(ajuste.x)
+
+
+@registrar_metodo("Mínimos quadrados SOPDT", modelo="SOPDT")
+def identificar_mq_sopdt(step, time, output):
+    """Ajuste de (K, τ1, τ2, θ) por mínimos quadrados, partindo do ajuste FOPDT."""
+    from scipy.optimize import least_squares
+
+    t0 = time[0]
+    k, tau, theta = identificar_mq_fopdt(step, time, output)
+    time, y = _amostras_ajuste(time, output)
+    duracao = time[-1] - t0
+
+    def residuo(p):
+        return simular_sopdt(p, time, step, t_inicial=t0)[0] - y
+
+    ajuste = least_squares(
+        residuo,
+        [k, tau * 0.8, tau * 0.2, theta],
+        bounds=(
+            [-np.inf, duracao * 1e-6, duracao * 1e-6, 0.0],
+            [np.inf, np.inf, np.inf, duracao],
+        ),
+    )
+    k, tau1, tau2, theta = ajuste.x
+    return k, max(tau1, tau2), min(tau1, tau2), theta
+
+
+@etapa("torneio")
+def torneio_identificacao(
+    step, time, output, metodos=None, max_workers=None, modo="exato", ordem_pade=6
+):
+    """
+    Executa vários métodos de identificação em paralelo e os classifica pelo EQM.
+
+    Os métodos rodam em um pool de threads sobre os mesmos vetores somente leitura (por exemplo,
+    as visões memory-mapped de `carregar_dataset`). Em seguida, os EQMs de todos os modelos de
+    cada tipo são calculados em lote (uma única simulação FOPDT e uma SOPDT).
+
+    Args:
+    - metodos (iterable, opcional): Nomes em `METODOS_IDENTIFICACAO`; por padrão, todos.
+    - modo, ordem_pade: Modo de simulação do EQM dos modelos FOPDT (ver `simular_fopdt`).
+
+    Returns:
+    - list[dict]: Uma linha por método, com "metodo", "modelo", "parametros" e "eqm",
+      ordenada do menor para o maior EQM. Métodos que falham aparecem no fim com "erro".
+    """
+    metodos = list(METODOS_IDENTIFICACAO if metodos is None else metodos)
+
+    def executar(nome):
+        modelo, funcao = METODOS_IDENTIFICACAO[nome]
+        try:
+            parametros = tuple(float(p) for p in funcao(step, time, output))
+        except (ValueError, IndexError, ArithmeticError) as erro:
+            return {"metodo": nome, "modelo": modelo, "erro": str(erro)}
+        return {"metodo": nome, "modelo": modelo, "parametros": parametros}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tabela = list(executor.map(executar, metodos))
+
+    validos = [linha for linha in tabela if "parametros" in linha]
+    for modelo in ("FOPDT", "SOPDT"):
+        linhas = [linha for linha in validos if linha["modelo"] == modelo]
+        if not linhas:
+            continue
+        parametros = [linha["parametros"] for linha in linhas]
+        if modelo == "FOPDT":
+            eqms = calcular_eqm(parametros, step, time, output, modo, ordem_pade)
+        else:
+            y_sim = simular_sopdt(parametros, time, step)
+            eqms = metricas_resposta(time, y_sim, output - output[0], temporais=False)[
+                "eqm"
+            ]
+        for linha, eqm in zip(linhas, eqms):
+            linha["eqm"] = float(eqm) if np.isfinite(eqm) else np.inf
+
+    return sorted(tabela, key=lambda linha: linha.get("eqm", np.inf))
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from flask import request
+from flask_socketio import Namespace
+
+NAMESPACE = "/inicializacao"
+
+
+class Inicializacao:
+    """
+    Linha do tempo da inicialização e aquecimento dos caches em segundo plano.
+
+    As etapas são marcadas em segundos desde o início do processo (o instante passado a
+    `iniciar`, tomado no topo de main.py) e formam o relatório de `relatorio`. Enquanto o
+    aquecimento roda, a tela inicial é servida sem resultados e espera o evento "pronto" do
+    namespace `NAMESPACE`.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.erro = None
+        self.pronto = threading.Event()
+        self._thread = None
+        self._socketio = None
+        self._lock = threading.Lock()
+
+    def iniciar(self, inicio, etapas=None):
+        """Define o instante de referência e importa etapas já medidas ({nome: instante})."""
+        with self._lock:
+            self.inicio = inicio
+            for nome, instante in (etapas or {}).items():
+                self.etapas[nome] = instante - inicio
+
+    def marcar(self, etapa, instante=None):
+        with self._lock:
+            self.etapas[etapa] = (instante or time.perf_counter()) - self.inicio
+
+    def em_andamento(self):
+        """Indica se o aquecimento começou e ainda não terminou."""
+        return self._thread is not None and not self.pronto.is_set()
+
+    def aquecer_em_segundo_plano(self, socketio=None, log=None):
+        """Inicia `aquecer` em uma thread; ao terminar, avisa os navegadores em espera."""
+        self._socketio = socketio
+        self._thread = threading.Thread(
+            target=self.aquecer, args=(log,), name="aquecimento", daemon=True
+        )
+        self._thread.start()
+
+    def aquecer(self, log=None):
+        """
+        Preenche os caches da identificação e da tela inicial do processo atual.
+
+        Os caches em memória são por processo (o cache em disco é compartilhado), então cada
+        worker do modo --headless aquece os seus assim que sobe. Requisições que chegam durante
+        o aquecimento esperam pelo mesmo cálculo em vez de repeti-lo.
+        """
+        from app.main_process import home_logic, ranking_identificacao
+
+        inicio = time.perf_counter()
+        try:
+            ranking_identificacao()
+            self.marcar("identificacao")
+            home_logic()
+            self.marcar("tela_inicial")
+        except (OSError, KeyError, ValueError) as erro:
+            self.erro = str(erro)
+            if log is not None:
+                log.warning("Aquecimento dos caches falhou: %s", erro)
+        else:
+            if log is not None:
+                log.info(
+                    "Caches aquecidos em %.2f s (pid %d)",
+                    time.perf_counter() - inicio,
+                    os.getpid(),
+                )
+        finally:
+            self.pronto.set()
+            if self._socketio is not None:
+                self._socketio.emit("pronto", self.relatorio(), namespace=NAMESPACE)
+
+    def relatorio(self):
+        with self._lock:
+            etapas = dict(sorted(self.etapas.items(), key=lambda item: item[1]))
+        return {"etapas_s": etapas, "pronto": self.pronto.is_set(), "erro": self.erro}
+
+
+class NamespaceInicializacao(Namespace):
+    """Avisa ("pronto") o navegador que abriu a tela inicial antes do fim do aquecimento."""
+
+    def on_connect(self, *args):
+        if inicializacao.pronto.is_set():
+            self.emit("pronto", inicializacao.relatorio(), room=request.sid)
+
+
+inicializacao = Inicializacao()
+namespace_inicializacao = NamespaceInicializacao(NAMESPACE)
@@ -1,218 +1,508 @@
-import base64
-import io
-import os
-
-import matplotlib
-from control import feedback
-
-matplotlib.use("Agg")  # Usa backend sem GUI
-import matplotlib.pyplot as plt
 import numpy as np
-from control import pade, series, step_response, tf
 
+from app.armazem_imagens import armazem_imagens
+from app.cache import CacheResultados, hash_arquivo, montar_chave
+from app.exporter import exportador
+from app.frequencia import diagrama_bode, margens_estabilidade
+from app.historico import NOMES_PARAMETROS, historico
+from app.identification import METODOS_IDENTIFICACAO, torneio_identificacao
+from app.metricas import metricas_resposta
+from app.preprocessamento import CONFIGURACAO, preprocessar
+from app.rastreamento import etapa
+from app.series import serie_compacta
+from app.tuning import analisar_robustez, sintonia_pid
 from app.utils import (
+    caminho_dataset,
     carregar_dataset,
-    chr_com_sobre_valor,
-    identificar_fopdt,
+    horizonte_simulacao,
     identification_process,
-    ziegler_nichols_malha_aberta,
+    parametros_fopdt,
+    simular_fopdt,
+    simular_malha_fechada_pid,
+    simular_sopdt,
 )
-from config import DESKTOP_FOLDER
-
-
-def home_logic():
-    time_dataset, step, output_dataset = carregar_dataset()
 
-    # Calcular os parâmetros para os diferentes métodos
-    k_sun, tau_sun, theta_sun, eqm_sun = identification_process(
-        step, time_dataset, output_dataset, "Sundaresan"
+cache_home = CacheResultados("home", capacidade=8)
+cache_identificacao = CacheResultados("identificacao", capacidade=8)
+# Séries reduzidas pelo pré-processamento, por conteúdo do dataset e configuração
+cache_preprocessamento = CacheResultados("preprocessamento", capacidade=4)
+# Respostas de /gerar_pid: só em memória, uma entrada por sintonia (e outra para a imagem)
+cache_pid = CacheResultados("pid", capacidade=256, pasta=None)
+
+nomes_dos_metodos = {
+    "zn": "Ziegler Nichols",
+    "chr": "CHR (com sobrevalor)",
+    "manual": "Sintonia Manual",
+}
+
+
+def resultado_home(metodos=("Sundaresan", "Smith"), ordem_pade=None, com_imagens=True):
+    """
+    Retorna o resultado da identificação da tela inicial, reaproveitando resultados em cache.
+
+    A chave do cache combina o hash do conteúdo do dataset, o conjunto de métodos de
+    identificação, a ordem de Padé e a configuração do pré-processamento, então qualquer
+    alteração no arquivo .MAT invalida automaticamente o resultado anterior. Com
+    `ordem_pade=None` as respostas em malha aberta usam o atraso exato; um inteiro seleciona o
+    caminho de referência com Padé. O EQM de cada método é o da série medida (`eqm_medido`).
+
+    As imagens só são rasterizadas quando `com_imagens` é verdadeiro; o item do cache guarda
+    os digests delas no `armazem_imagens`, e elas são renderizadas de novo se saíram do
+    armazém.
+    """
+    file_path = caminho_dataset()
+    chave = montar_chave(
+        hash_arquivo(file_path),
+        tuple(sorted(metodos)),
+        ordem_pade,
+        CONFIGURACAO,
+        "eqm_medido",
     )
-    k_smi, tau_smi, theta_smi, eqm_smi = identification_process(
-        step, time_dataset, output_dataset, "Smith"
+
+    resultado = cache_home.obter_ou_calcular(
+        chave, lambda: calcular_home(file_path, metodos, ordem_pade)
     )
 
-    # Modelo FOPDT real
-    fopdt_model_with_delay = identificar_fopdt(step, time_dataset, output_dataset)
-    t_sim_fopdt, y_sim_fopdt = step_response(fopdt_model_with_delay, T=time_dataset)
-    y_sim_fopdt *= step
+    if com_imagens and not all(
+        armazem_imagens.contem(resultado.get(campo))
+        for campo in ("imagem_aberta", "imagem_fechada")
+    ):
+        resultado = {**resultado, **renderizar_home(resultado)}
+        cache_home.guardar(chave, resultado)
 
-    # Seleção do melhor método
-    eqms = {"Sundaresan": eqm_sun, "Smith": eqm_smi}
-    best_method = min(eqms, key=eqms.get)
-    other_method = "Smith" if best_method == "Sundaresan" else "Sundaresan"
+    return resultado
 
-    # Dicionários para acesso dinâmico
-    params = {
-        "Sundaresan": (k_sun, tau_sun, theta_sun),
-        "Smith": (k_smi, tau_smi, theta_smi),
-    }
 
-    # -------- MELHOR MÉTODO --------
-    k, tau, theta = params[best_method]
-    f_identification = tf([k], [tau, 1])
-    num_delay, den_delay = pade(theta, 6)
-    f_identification = series(tf(num_delay, den_delay), f_identification)
-
-    # Malha aberta
-    t_open, y_open = step_response(f_identification, T=time_dataset)
-    y_open *= step
-
-    # Malha fechada
-    system_closed = feedback(f_identification, 1)
-    t_closed, y_closed = step_response(system_closed, T=time_dataset)
-    y_closed *= step
-
-    # Gráfico de malha aberta
-    plt.figure(figsize=(6, 4))
-    plt.plot(time_dataset, y_sim_fopdt, "b", label="Referência")
-    plt.plot(t_open, y_open, "m--", label=best_method)
-    plt.title(f"Malha Aberta - {best_method}")
-    plt.xlabel("Tempo (s)")
-    plt.ylabel("Temperatura (C°)")
-    plt.legend()
-    plt.grid(True)
-    buf_open = io.BytesIO()
-    plt.savefig(buf_open, format="png")
-    buf_open.seek(0)
-    image_base64_open = base64.b64encode(buf_open.read()).decode("utf-8")
-    buf_open.close()
-    plt.savefig(
-        os.path.join(DESKTOP_FOLDER, f"{best_method}_malha_aberta.png")
-    )  # Salvar no desktop
-
-    # Gráfico de malha fechada
-    plt.figure(figsize=(6, 4))
-    plt.plot(time_dataset, y_sim_fopdt, "b", label="Referência")
-    plt.plot(t_closed, y_closed, "g--", label=best_method)
-    plt.title(f"Malha Fechada - {best_method}")
-    plt.xlabel("Tempo (s)")
-    plt.ylabel("Temperatura (C°)")
-    plt.legend()
-    plt.grid(True)
-    buf_closed = io.BytesIO()
-    plt.savefig(buf_closed, format="png")
-    buf_closed.seek(0)
-    image_base64_closed = base64.b64encode(buf_closed.read()).decode("utf-8")
-    buf_closed.close()
-    plt.savefig(
-        os.path.join(DESKTOP_FOLDER, f"{best_method}_malha_fechada.png")
-    )  # Salvar no desktop
-
-    # -------- OUTRO MÉTODO (APENAS SALVAR) --------
-    k_o, tau_o, theta_o = params[other_method]
-    f_other = tf([k_o], [tau_o, 1])
-    num_d_o, den_d_o = pade(theta_o, 2)
-    f_other = series(tf(num_d_o, den_d_o), f_other)
-
-    t_other_open, y_other_open = step_response(f_other, T=time_dataset)
-    y_other_open *= step
-
-    system_closed_other = feedback(f_other, 1)
-    t_other_closed, y_other_closed = step_response(system_closed_other, T=time_dataset)
-    y_other_closed *= step
-
-    # Malha aberta - outro método
-    plt.figure(figsize=(6, 4))
-    plt.plot(time_dataset, y_sim_fopdt, "b", label="Referência")
-    plt.plot(t_other_open, y_other_open, "m--", label=other_method)
-    plt.title(f"Malha Aberta - {other_method}")
-    plt.xlabel("Tempo (s)")
-    plt.ylabel("Temperatura (C°)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(DESKTOP_FOLDER, f"{other_method}_malha_aberta.png"))
-
-    # Malha fechada - outro método
-    plt.figure(figsize=(6, 4))
-    plt.plot(time_dataset, y_sim_fopdt, "b", label="Referência")
-    plt.plot(t_other_closed, y_other_closed, "g--", label=other_method)
-    plt.title(f"Malha Fechada - {other_method}")
-    plt.xlabel("Tempo (s)")
-    plt.ylabel("Temperatura (C°)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(os.path.join(DESKTOP_FOLDER, f"{other_method}_malha_fechada.png"))
-
-    # -------- RETORNO --------
+def home_logic(metodos=("Sundaresan", "Smith"), ordem_pade=None, com_imagens=True):
+    resultado = resultado_home(metodos, ordem_pade, com_imagens)
+    k, tau, theta, eqm = resultado["parametros"][resultado["melhor_metodo"]]
+
     return (
-        image_base64_open,  # imagem do gráfico malha aberta
-        image_base64_closed,  # imagem do gráfico da malha fechada
+        resultado.get("imagem_aberta"),  # digest da imagem do gráfico malha aberta
+        resultado.get("imagem_fechada"),  # digest da imagem do gráfico da malha fechada
         round(k, 3),
         round(tau, 3),
         round(theta, 3),
-        round(eqms[best_method], 3),
-        time_dataset[-1],
+        round(eqm, 3),
+        resultado["time_dataset"][-1],
     )
 
 
-def controladores_pid(k, tau, theta, method, kp=None, ti=None, td=None):
-    nomes_dos_metodos = {
-        "zn": "Ziegler Nichols",
-        "chr": "CHR (com sobrevalor)",
-        "manual": "Sintonia Manual",
+def series_home(n_pontos, codificacao="json", metodos=("Sundaresan", "Smith")):
+    """
+    Retorna as curvas da tela inicial reduzidas por LTTB, sem rasterizar nenhum gráfico.
+    """
+    resultado = resultado_home(metodos, com_imagens=False)
+    melhor = resultado["melhor_metodo"]
+    t = resultado["time_dataset"]
+    y_aberta, y_fechada = resultado["curvas"][melhor]
+
+    return {
+        "melhor_metodo": melhor,
+        "referencia": serie_compacta(
+            t, resultado["y_referencia"], n_pontos, codificacao
+        ),
+        "aberta": serie_compacta(t, y_aberta, n_pontos, codificacao),
+        "fechada": serie_compacta(t, y_fechada, n_pontos, codificacao),
     }
 
-    if method == "zn":
-        kp, ti, td = ziegler_nichols_malha_aberta(k, tau, theta)
-    elif method == "chr":
-        kp, ti, td = chr_com_sobre_valor(k, tau, theta)
 
-    # Criar função de transferência do controlador PID
-    PID = tf([kp * td, kp, kp / ti], [1, 0])
+def ranking_identificacao(metodos=None, ordem_pade=None):
+    """
+    Executa o torneio de identificação sobre o dataset atual e retorna o ranking por EQM.
+
+    Os métodos identificam sobre a série pré-processada, mas o ranking usa o EQM contra a série
+    medida (`eqm_medido`). O resultado fica em cache com a mesma chave da tela inicial (hash do
+    dataset, métodos, ordem de Padé e configuração do pré-processamento).
+    """
+    file_path = caminho_dataset()
+    nomes = tuple(sorted(METODOS_IDENTIFICACAO if metodos is None else metodos))
+    dataset = hash_arquivo(file_path)
+    chave = montar_chave(dataset, nomes, ordem_pade, CONFIGURACAO, "eqm_medido")
+
+    def calcular():
+        time_dataset, step, output_dataset, relatorio = dataset_preprocessado(file_path)
+        modo = "exato" if ordem_pade is None else "pade"
+        ranking = torneio_identificacao(
+            step, time_dataset, output_dataset, nomes, modo=modo, ordem_pade=ordem_pade
+        )
+        for modelo in ("FOPDT", "SOPDT"):
+            linhas = [
+                linha
+                for linha in ranking
+                if linha["modelo"] == modelo and "parametros" in linha
+            ]
+            if not linhas:
+                continue
+            eqms = eqm_medido(
+                file_path,
+                [linha["parametros"] for linha in linhas],
+                step,
+                relatorio["linha_base"],
+                modelo,
+                modo,
+                ordem_pade,
+            )
+            for linha, eqm in zip(linhas, eqms):
+                linha["eqm"] = float(eqm) if np.isfinite(eqm) else np.inf
+        ranking.sort(key=lambda linha: linha.get("eqm", np.inf))
+
+        for linha in ranking:
+            if "parametros" in linha:
+                historico.registrar(
+                    "identificacao",
+                    linha["metodo"],
+                    dict(zip(NOMES_PARAMETROS[linha["modelo"]], linha["parametros"])),
+                    {"eqm": linha["eqm"], "modelo": linha["modelo"]},
+                    dataset=dataset,
+                )
+        return ranking
+
+    ranking = cache_identificacao.obter_ou_calcular(chave, calcular)
+    return ranking
+
+
+def dataset_preprocessado(file_path=None):
+    """
+    Carrega o dataset e aplica o pré-processamento (`app.preprocessamento.preprocessar`): a
+    identificação e as simulações rodam sobre a série filtrada e reduzida.
+
+    O resultado fica em `cache_preprocessamento`, por hash do dataset e configuração; o
+    relatório traz o custo de cada etapa medido quando a série foi calculada.
+
+    Returns:
+    - tuple: (time_dataset, step, output_dataset, relatorio)
+    """
+    if file_path is None:
+        file_path = caminho_dataset()
+    chave = montar_chave(hash_arquivo(file_path), CONFIGURACAO)
+
+    def calcular():
+        time_dataset, step, output_dataset = carregar_dataset(file_path)
+        time_reduzido, output_reduzido, relatorio = preprocessar(
+            time_dataset, output_dataset
+        )
+        # Os vetores ficam compartilhados no cache
+        time_reduzido.flags.writeable = False
+        output_reduzido.flags.writeable = False
+        return time_reduzido, float(step), output_reduzido, relatorio
+
+    return cache_preprocessamento.obter_ou_calcular(chave, calcular)
+
+
+def eqm_medido(
+    file_path, parametros, step, linha_base, modelo="FOPDT", modo="exato", ordem_pade=6
+):
+    """
+    EQM de um ou mais modelos contra a série medida, sem filtro nem decimação.
+
+    A identificação roda sobre a série pré-processada, mas o EQM contra ela sai menor (o filtro
+    remove o ruído) e não é o erro do modelo em relação ao processo: a escolha do melhor método
+    e o torneio usam este. O valor inicial é a linha de base estimada no pré-processamento.
+
+    Returns:
+    - numpy.ndarray: Um EQM por conjunto de parâmetros.
+    """
+    time_medido, _, output_medido = carregar_dataset(file_path)
+    if modelo == "SOPDT":
+        y_sim = simular_sopdt(parametros, time_medido, step)
+    else:
+        y_sim = simular_fopdt(parametros, time_medido, step, modo, ordem_pade)
+    medido = np.asarray(output_medido, dtype=np.float64) - linha_base
+    return metricas_resposta(time_medido, y_sim, medido, temporais=False)["eqm"]
+
+
+def calcular_home(file_path, metodos, ordem_pade):
+    time_dataset, step, output_dataset, relatorio = dataset_preprocessado(file_path)
+    modo = "exato" if ordem_pade is None else "pade"
+
+    # Calcular os parâmetros para os diferentes métodos, com o EQM da série medida
+    params = {
+        metodo: identification_process(
+            step, time_dataset, output_dataset, metodo, modo, ordem_pade
+        )
+        for metodo in metodos
+    }
+    eqms = eqm_medido(
+        file_path,
+        [valores[:3] for valores in params.values()],
+        step,
+        relatorio["linha_base"],
+        modo=modo,
+        ordem_pade=ordem_pade,
+    )
+    params = {
+        metodo: (*valores[:3], eqm)
+        for (metodo, valores), eqm in zip(params.items(), eqms)
+    }
 
-    # Sistema de processo (sem controle)
-    G = tf([k], [tau, 1])
+    # Modelo FOPDT real
+    fopdt_params = parametros_fopdt(step, time_dataset, output_dataset)
+    y_sim_fopdt = simular_fopdt(fopdt_params, time_dataset, step, modo, 1)[0]
 
-    num_delay, den_delay = pade(theta, 2)
-    delay = tf(num_delay, den_delay)
+    # Seleção do melhor método
+    best_method = min(params, key=lambda metodo: params[metodo][3])
+
+    # Malha aberta e malha fechada de cada método (os demais com Padé de ordem 2)
+    curvas = {}
+    for metodo in metodos:
+        ordem = ordem_pade if metodo == best_method else 2
+        params_m = params[metodo][:3]
+        y_open = simular_fopdt(params_m, time_dataset, step, modo, ordem)[0]
+        y_closed = malha_fechada_unitaria(params_m, time_dataset, step, modo, ordem)
+        curvas[metodo] = (y_open, y_closed)
+
+        k, tau, theta, eqm = params[metodo]
+        historico.registrar(
+            "identificacao",
+            metodo,
+            {"k": k, "tau": tau, "theta": theta},
+            {"eqm": eqm, "modelo": "FOPDT"},
+            dataset=hash_arquivo(file_path),
+            t=time_dataset,
+            y=y_open,
+        )
+
+    return {
+        "parametros": {
+            metodo: tuple(float(v) for v in valores)
+            for metodo, valores in params.items()
+        },
+        "melhor_metodo": best_method,
+        "time_dataset": np.array(time_dataset),
+        "y_referencia": y_sim_fopdt,
+        "curvas": curvas,
+    }
 
-    # Sistema com atraso
-    sistema = series(delay, G)
 
-    # Sistema em malha fechada com PID
-    malha_fechada = feedback(series(PID, sistema), 1)
+def renderizar_home(resultado):
+    """
+    Renderiza os gráficos de malha aberta e fechada de cada método, salva todos na pasta de
+    músicas e retorna os digests dos do melhor método no `armazem_imagens`.
+    """
+    # O Matplotlib só é carregado na primeira renderização, fora da inicialização
+    from app.rendering import renderizar_comparacao
+
+    time_dataset = resultado["time_dataset"]
+    y_sim_fopdt = resultado["y_referencia"]
+    imagens = {}
+
+    for metodo, (y_open, y_closed) in resultado["curvas"].items():
+        # Gráfico de malha aberta
+        with etapa("renderizacao"):
+            png_open = renderizar_comparacao(
+                time_dataset,
+                y_sim_fopdt,
+                y_open,
+                f"Malha Aberta - {metodo}",
+                metodo,
+                "m",
+            )
+        salvar_png(f"{metodo}_malha_aberta.png", png_open)  # Salvar no desktop
+
+        # Gráfico de malha fechada
+        with etapa("renderizacao"):
+            png_closed = renderizar_comparacao(
+                time_dataset,
+                y_sim_fopdt,
+                y_closed,
+                f"Malha Fechada - {metodo}",
+                metodo,
+                "g",
+            )
+        salvar_png(f"{metodo}_malha_fechada.png", png_closed)  # Salvar no desktop
+
+        if metodo == resultado["melhor_metodo"]:
+            with etapa("armazenamento"):
+                imagens["imagem_aberta"] = armazem_imagens.guardar(png_open)
+                imagens["imagem_fechada"] = armazem_imagens.guardar(png_closed)
+
+    return imagens
+
+
+def salvar_png(filename, png):
+    """
+    Enfileira os bytes PNG já renderizados para gravação em segundo plano na pasta de músicas
+    do usuário, sem bloquear a requisição.
+    """
+    with etapa("exportacao"):
+        exportador.enviar(filename, png)
+
+
+def malha_fechada_unitaria(parametros, time, step, modo="exato", ordem_pade=6):
+    """
+    Resposta ao degrau do modelo FOPDT em malha fechada com realimentação unitária.
+
+    No modo "exato" usa o simulador discreto com atraso exato (controlador proporcional de
+    ganho 1); no modo "pade" mantém o caminho de referência com `feedback` e `step_response`.
+    """
+    k, tau, theta = parametros
+    if modo == "exato":
+        return simular_malha_fechada_pid(k, tau, theta, 1.0, np.inf, 0.0, time, step)[0]
+
+    from control import feedback, pade, series, step_response, tf
+
+    num_delay, den_delay = pade(theta, ordem_pade)
+    sistema = series(tf(num_delay, den_delay), tf([k], [tau, 1]))
+    _, y = step_response(feedback(sistema, 1), T=time)
+    return y * step
+
+
+def chave_pid(k, tau, theta, method, kp=None, ti=None, td=None, ordem_pade=None):
+    """
+    Chave de cache de uma sintonia. Os valores são arredondados a 6 algarismos significativos,
+    para que pequenas diferenças de formatação vindas do navegador caiam na mesma entrada.
+    """
+
+    def arredondar(valor):
+        return None if valor is None else float(f"{float(valor):.6g}")
+
+    parametros = tuple(arredondar(v) for v in (k, tau, theta, kp, ti, td))
+    return montar_chave("pid", method, parametros, ordem_pade)
+
+
+def simular_pid(k, tau, theta, method, kp=None, ti=None, td=None):
+    """
+    Calcula a sintonia (ZN, CHR ou manual) e simula a malha fechada PID + FOPDT.
+
+    O resultado é memorizado em `cache_pid`; abrir de novo a mesma sintonia não resimula. Cada
+    simulação nova é registrada no `historico`, associada ao dataset atual.
+
+    Returns:
+    - t, y (numpy.ndarray): Tempo e resposta ao degrau.
+    - kp, ti, td (float): Parâmetros do controlador.
+    - overshoot (float): Sobressinal em porcentagem, relativo ao valor final.
+    - metricas (dict): Métricas de `metricas_resposta` (None quando não finitas).
+    """
+    chave = chave_pid(k, tau, theta, method, kp, ti, td)
+
+    def calcular():
+        resultado = _simular_pid(k, tau, theta, method, kp, ti, td)
+        t, y, kp_, ti_, td_, _, metricas = resultado
+        historico.registrar(
+            "sintonia",
+            method,
+            {"k": k, "tau": tau, "theta": theta, "kp": kp_, "ti": ti_, "td": td_},
+            metricas,
+            dataset=_dataset_atual(),
+            t=t,
+            y=y,
+        )
+        return resultado
+
+    return cache_pid.obter_ou_calcular(chave, calcular)
+
+
+def _dataset_atual():
+    # A sintonia não depende do arquivo; o hash só associa a execução ao dataset em uso
+    try:
+        return hash_arquivo(caminho_dataset())
+    except OSError:
+        return None
+
+
+def _simular_pid(k, tau, theta, method, kp, ti, td):
+    kp, ti, td = sintonia_pid(k, tau, theta, method, kp, ti, td)
+
+    # Resposta ao degrau da malha fechada PID + FOPDT (atraso exato)
+    t = horizonte_simulacao(tau, theta)
+    y = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)[0]
+    # Os vetores ficam compartilhados no cache
+    t.flags.writeable = False
+    y.flags.writeable = False
+
+    metricas = {
+        nome: float(valor[0]) if np.isfinite(valor[0]) else None
+        for nome, valor in metricas_resposta(t, y).items()
+    }
+    overshoot = (
+        round(metricas["overshoot"], 2) if metricas["overshoot"] is not None else None
+    )
+
+    return t, y, kp, ti, td, overshoot, metricas
+
+
+@etapa("robustez")
+def robustez_pid(
+    k, tau, theta, method, kp=None, ti=None, td=None, n_plantas=10000, variacao=0.1
+):
+    """
+    Análise de Monte Carlo da sintonia contra plantas com K, τ e θ perturbados em ±variacao.
+    O envelope de pior caso é devolvido como séries JSON reduzidas por LTTB.
+    """
+    kp, ti, td = sintonia_pid(k, tau, theta, method, kp, ti, td)
+    resultado = analisar_robustez(k, tau, theta, kp, ti, td, n_plantas, variacao)
+
+    envelope = resultado["envelope"]
+    t = envelope.pop("t")
+    for nome, y in envelope.items():
+        envelope[nome] = serie_compacta(t, y, 400) if np.isfinite(y).all() else None
+
+    return {**resultado, "kp": kp, "ti": ti, "td": td}
+
+
+@etapa("margens")
+def margens_pid(k, tau, theta, method, kp=None, ti=None, td=None):
+    """
+    Margens de ganho e fase, pico de sensibilidade e estabilidade da malha fechada da sintonia,
+    com o atraso exato. Valores infinitos ou indefinidos (sem cruzamento, ou Ms de uma malha
+    instável) viram None para serializar em JSON.
+    """
+    kp, ti, td = sintonia_pid(k, tau, theta, method, kp, ti, td)
+
+    def calcular():
+        margens = margens_estabilidade(k, tau, theta, kp, ti, td)
+        estavel = bool(margens.pop("estavel")[0])
+        resultado = {
+            nome: float(valor[0]) if np.isfinite(valor[0]) else None
+            for nome, valor in margens.items()
+        }
+        resultado["estavel"] = estavel
+        return resultado
+
+    # "estavel" entrou depois: a chave muda para não servir margens antigas do cache em disco
+    chave = montar_chave(
+        chave_pid(k, tau, theta, "manual", kp, ti, td), "margens", "estavel"
+    )
+    return dict(cache_pid.obter_ou_calcular(chave, calcular))
+
+
+def bode_pid(k, tau, theta, method, kp=None, ti=None, td=None, n_pontos=400):
+    """Diagrama de Bode da malha aberta C(s)·G(s): frequências, módulo (dB) e fase (graus)."""
+    kp, ti, td = sintonia_pid(k, tau, theta, method, kp, ti, td)
+    omega, modulo_db, fase = diagrama_bode(k, tau, theta, kp, ti, td, n_pontos)
+    return {
+        "omega": omega.tolist(),
+        "modulo_db": modulo_db.tolist(),
+        "fase": fase.tolist(),
+        "margens": margens_pid(k, tau, theta, "manual", kp, ti, td),
+        "kp": kp,
+        "ti": ti,
+        "td": td,
+    }
 
-    # Resposta ao degrau
-    t, y = step_response(malha_fechada)
-    y_max = np.max(y)
-    y_min = np.min(y)
 
-    # Plot
-    plt.figure(figsize=(6, 4))
-    plt.plot(t, y, label="PID", color="blue")
-    plt.axhline(
-        y_max,
-        linestyle="--",
-        color="red",
-        label=f"Overshoot ~ {round((y_max - 1) * 100, 2)}%",
+def controladores_pid(k, tau, theta, method, kp=None, ti=None, td=None):
+    t, y, kp, ti, td, overshoot, metricas = simular_pid(
+        k, tau, theta, method, kp, ti, td
     )
-    plt.grid(True)
-    plt.legend(loc="lower right")
-    plt.xlabel("Time (seconds)")
-    plt.ylabel("Temperatura [°C]")
-    plt.title(f"Sistema com Controle PID - {method}")
-
-    # Garantir que o ylim cobre todo o sinal com 5% de margem
-    margem = 0.05
-    delta = (y_max - y_min) * margem
-    plt.ylim([y_min - delta, y_max + delta])
-
-    # Salvar imagem
-    filename = f"PID_Metodo_{nomes_dos_metodos[method].replace(' ', '')}.png"
-    path = os.path.join(DESKTOP_FOLDER, filename)
-    plt.savefig(path)
 
-    # Converter para base64
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    buf.close()
-    plt.close()
+    def renderizar():
+        from app.rendering import renderizar_pid
 
-    # Overshoot calculado de forma simples aqui, pode substituir por uma função
-    overshoot = round((y_max - 1) * 100, 2)
+        with etapa("renderizacao"):
+            return renderizar_pid(
+                t, y, f"Sistema com Controle PID - {method}", overshoot
+            )
+
+    chave = montar_chave(chave_pid(k, tau, theta, method, kp, ti, td), "png")
+    png = cache_pid.obter_ou_calcular(chave, renderizar)
+    # Idempotente: com a imagem já no armazém, só o hash é calculado (~0,1 ms)
+    with etapa("armazenamento"):
+        digest = armazem_imagens.guardar(png)
+
+    # Salvar imagem (o exportador ignora conteúdo idêntico ao último gravado)
+    filename = f"PID_Metodo_{nomes_dos_metodos[method].replace(' ', '')}.png"
+    salvar_png(filename, png)
 
-    return image_base64, kp, ti, td, overshoot
+    return digest, kp, ti, td, overshoot, metricas
@@ -0,0 +1,181 @@
+import threading
+
+import numpy as np
+
+# Faixas (fração da variação total) dos tempos de acomodação calculados por padrão
+FAIXAS_ACOMODACAO = (0.02, 0.05)
+
+# Limites da subida, em fração da variação total
+SUBIDA = (0.1, 0.9)
+
+# Elementos (linhas × amostras) processados por bloco: as matrizes de trabalho de um bloco
+# (~512 KiB cada) cabem no cache, e todas as passadas sobre ele são feitas ali
+ELEMENTOS_BLOCO = 1 << 16
+
+_locais = threading.local()
+
+
+class BuffersMetricas:
+    """
+    Matrizes de trabalho reaproveitadas entre chamadas de `metricas_resposta`.
+
+    Cada buffer cresce sob demanda (até um bloco) e é devolvido como visão com a forma pedida,
+    então as chamadas seguintes não alocam nada. Não é seguro compartilhar uma instância entre
+    threads; por padrão cada thread usa a sua.
+    """
+
+    def __init__(self):
+        self._dados = {}
+
+    def matriz(self, nome, forma, dtype=np.float64):
+        tamanho = forma[0] * forma[1]
+        buffer = self._dados.get(nome)
+        if buffer is None or buffer.size < tamanho or buffer.dtype != dtype:
+            buffer = np.empty(tamanho, dtype=dtype)
+            self._dados[nome] = buffer
+        return buffer[:tamanho].reshape(forma)
+
+
+def _buffers_da_thread():
+    if not hasattr(_locais, "buffers"):
+        _locais.buffers = BuffersMetricas()
+    return _locais.buffers
+
+
+def _pesos_integracao(t):
+    """Largura de cada amostra na integração retangular (o último passo é repetido)."""
+    if t.size < 2:
+        return np.zeros(t.size)
+    pesos = np.empty(t.size)
+    pesos[:-1] = np.diff(t)
+    pesos[-1] = pesos[-2]
+    return pesos
+
+
+def _primeiro(mascara, t):
+    """Instante da primeira amostra verdadeira de cada linha (inf se não houver)."""
+    indice = np.argmax(mascara, axis=1)
+    return np.where(mascara[np.arange(mascara.shape[0]), indice], t[indice], np.inf)
+
+
+def _apos_ultimo(mascara, t, indices):
+    """
+    Instante seguinte à última amostra verdadeira de cada linha (t[0] se não houver).
+
+    `indices` é uma matriz inteira de trabalho com a forma de `mascara`: o máximo de
+    mascara·(1, 2, ..., n) é bem mais rápido que o argmax sobre a máscara invertida.
+    """
+    np.multiply(mascara, np.arange(1, t.size + 1, dtype=indices.dtype), out=indices)
+    apos = indices.max(axis=1)
+    return t[np.minimum(apos, t.size - 1)]
+
+
+def metricas_resposta(
+    t, y, referencia=1.0, faixas=FAIXAS_ACOMODACAO, temporais=True, buffers=None
+):
+    """
+    Calcula as métricas de resposta ao degrau de um lote de respostas de uma só vez.
+
+    As linhas de `y` são processadas em blocos de `ELEMENTOS_BLOCO` elementos, sem laço por
+    linha: o erro e as matrizes intermediárias de cada bloco ficam em buffers reaproveitados
+    (`BuffersMetricas`) que cabem no cache, e cada métrica é uma redução sobre eles. As integrais
+    usam a regra retangular sobre `t`, que pode ser não uniforme.
+
+    As métricas temporais usam a resposta normalizada pela variação total (do valor inicial ao
+    final): o sobressinal é relativo ao valor final, e não à referência, e vale também para
+    degraus negativos.
+
+    Args:
+    - t (numpy.ndarray): Instantes das amostras.
+    - y (numpy.ndarray): Matriz (n_respostas × len(t)) ou uma única resposta.
+    - referencia (float ou numpy.ndarray): Valor desejado, escalar ou um por amostra (por exemplo,
+      a saída medida, para o EQM de um modelo identificado).
+    - faixas (tuple): Faixas dos tempos de acomodação, em fração da variação total.
+    - temporais (bool): Se False, calcula só as métricas de erro (IAE, ISE, ITAE, EQM).
+    - buffers (BuffersMetricas, opcional): Buffers de trabalho; por padrão, os da thread.
+
+    Returns:
+    - dict: Vetores com um valor por resposta: "iae", "ise", "itae", "eqm" e "erro_regime" e, se
+      `temporais`, "overshoot" (%), "t_subida" (10–90%), "t_pico" e "t_acomodacao_<faixa %>"
+      (por exemplo, "t_acomodacao_2"). Respostas com valores não finitos recebem `np.inf`.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.atleast_2d(y)
+    n_respostas, n_amostras = y.shape
+    buffers = buffers or _buffers_da_thread()
+    pesos = _pesos_integracao(t)
+    # Pesos das reduções feitas como produto matriz-vetor (mais rápido que sum/mean)
+    reducoes = np.column_stack(
+        (pesos, t * pesos, np.full(n_amostras, 1.0 / n_amostras))
+    )
+
+    nomes = ["erro_regime", "iae", "itae", "ise", "eqm"]
+    if temporais:
+        nomes += ["overshoot", "t_pico", "t_subida"]
+        nomes += [f"t_acomodacao_{faixa * 100:g}" for faixa in faixas]
+    metricas = {nome: np.empty(n_respostas) for nome in nomes}
+
+    passo = max(1, ELEMENTOS_BLOCO // n_amostras)
+    tipo_indices = np.min_scalar_type(n_amostras)
+    with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+        for inicio in range(0, n_respostas, passo):
+            linhas = slice(inicio, inicio + passo)
+            bloco = y[linhas]
+            forma = bloco.shape
+            erro = buffers.matriz("erro", forma)
+            auxiliar = buffers.matriz("auxiliar", forma)
+
+            np.subtract(referencia, bloco, out=erro)
+            metricas["erro_regime"][linhas] = erro[:, -1]
+
+            np.abs(erro, out=auxiliar)
+            metricas["iae"][linhas], metricas["itae"][linhas] = (
+                auxiliar @ reducoes[:, :2]
+            ).T
+
+            np.square(erro, out=auxiliar)
+            integrais = auxiliar @ reducoes[:, ::2]
+            metricas["ise"][linhas] = integrais[:, 0]
+            metricas["eqm"][linhas] = np.sqrt(integrais[:, 1])
+
+            if temporais:
+                mascara = buffers.matriz("mascara", forma, np.bool_)
+                indices = buffers.matriz("indices", forma, tipo_indices)
+                temporais_bloco = _metricas_temporais(
+                    t, bloco, faixas, erro, auxiliar, mascara, indices
+                )
+                for nome, valores in temporais_bloco.items():
+                    metricas[nome][linhas] = valores
+
+    # Um valor não finito em qualquer amostra contamina o IAE da linha
+    invalidas = ~np.isfinite(metricas["iae"])
+    for valores in metricas.values():
+        valores[invalidas | np.isnan(valores)] = np.inf
+    return metricas
+
+
+def _metricas_temporais(t, y, faixas, normalizada, auxiliar, mascara, indices):
+    # Resposta normalizada: vai de 0 (valor inicial) a 1 (valor final)
+    inicial = y[:, :1]
+    np.subtract(y, inicial, out=normalizada)
+    np.multiply(normalizada, 1.0 / (y[:, -1:] - inicial), out=normalizada)
+
+    linhas = np.arange(y.shape[0])
+    pico = np.argmax(normalizada, axis=1)
+    metricas = {
+        "overshoot": np.maximum(normalizada[linhas, pico] - 1.0, 0.0) * 100,
+        "t_pico": t[pico],
+    }
+
+    np.greater_equal(normalizada, SUBIDA[0], out=mascara)
+    inicio_subida = _primeiro(mascara, t)
+    np.greater_equal(normalizada, SUBIDA[1], out=mascara)
+    metricas["t_subida"] = _primeiro(mascara, t) - inicio_subida
+
+    np.subtract(normalizada, 1.0, out=auxiliar)
+    np.abs(auxiliar, out=auxiliar)
+    for faixa in faixas:
+        np.greater(auxiliar, faixa, out=mascara)
+        metricas[f"t_acomodacao_{faixa * 100:g}"] = _apos_ultimo(mascara, t, indices)
+
+    return metricas
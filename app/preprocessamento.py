@@ -0,0 +1,281 @@
+from time import perf_counter
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.rastreamento import rastreador
+from config import (
+    AMOSTRAS_ALVO,
+    FILTRO_PREPROCESSAMENTO,
+    FRACAO_JANELA_BASE,
+    FRACAO_JANELA_REGIME,
+    JANELA_FILTRO,
+    NIVEIS_RUIDO,
+    ORDEM_SAVGOL,
+    PERSISTENCIA_TEMPO_MORTO,
+)
+
+FILTROS = ("mediana", "savgol", "nenhum")
+
+# Entra nas chaves de cache dos resultados calculados sobre a série pré-processada
+CONFIGURACAO = (
+    FILTRO_PREPROCESSAMENTO,
+    JANELA_FILTRO,
+    ORDEM_SAVGOL,
+    AMOSTRAS_ALVO,
+    FRACAO_JANELA_BASE,
+    FRACAO_JANELA_REGIME,
+    NIVEIS_RUIDO,
+    PERSISTENCIA_TEMPO_MORTO,
+)
+
+# Linhas de janelas processadas por vez no filtro de mediana (limita a cópia que a mediana faz)
+TAMANHO_BLOCO = 1 << 16
+
+# Janela máxima (amostras) do filtro de mediana por rede de ordenação (custo ~janela²/2)
+JANELA_MAXIMA_REDE = 15
+
+# Lóbulos de cada lado do sinc do filtro anti-aliasing (o filtro tem 2·LOBULOS·fator coeficientes)
+LOBULOS = 4
+
+# Amostras mínimas das janelas de linha de base e de regime
+AMOSTRAS_MINIMAS_JANELA = 8
+
+
+def filtro_mediana(y, janela=JANELA_FILTRO):
+    """
+    Mediana móvel centrada de `janela` amostras (ímpar), sobre uma visão em janelas do sinal
+    estendido pelas bordas, sem laço por amostra.
+
+    Até `JANELA_MAXIMA_REDE` amostras, as colunas da visão passam por uma rede de ordenação
+    (transposição par-ímpar: mínimos e máximos elemento a elemento), várias vezes mais rápida
+    que `np.median`, que ordena cada janela separadamente; acima disso, usa `np.median`. Os dois
+    caminhos trabalham em blocos de `TAMANHO_BLOCO` janelas, que cabem no cache.
+    """
+    meia = janela // 2
+    largura = 2 * meia + 1
+    janelas = sliding_window_view(
+        np.pad(np.asarray(y, dtype=np.float64), meia, mode="edge"), largura
+    )
+    filtrado = np.empty(len(y))
+    for inicio in range(0, len(y), TAMANHO_BLOCO):
+        fim = inicio + TAMANHO_BLOCO
+        bloco = janelas[inicio:fim]
+        if largura > JANELA_MAXIMA_REDE:
+            np.median(bloco, axis=1, out=filtrado[inicio:fim])
+            continue
+        colunas = [bloco[:, i].copy() for i in range(largura)]
+        for rodada in range(largura):
+            for i in range(rodada % 2, largura - 1, 2):
+                menor = np.minimum(colunas[i], colunas[i + 1])
+                np.maximum(colunas[i], colunas[i + 1], out=colunas[i + 1])
+                colunas[i] = menor
+        filtrado[inicio:fim] = colunas[meia]
+    return filtrado
+
+
+def coeficientes_savgol(janela=JANELA_FILTRO, ordem=ORDEM_SAVGOL):
+    """Coeficientes de suavização de Savitzky–Golay (ajuste polinomial de grau `ordem`)."""
+    meia = janela // 2
+    if ordem >= 2 * meia + 1:
+        raise ValueError("A ordem do Savitzky–Golay deve ser menor que a janela.")
+    posicoes = np.arange(-meia, meia + 1, dtype=np.float64)
+    return np.linalg.pinv(np.vander(posicoes, ordem + 1, increasing=True))[0]
+
+
+def filtro_savgol(y, janela=JANELA_FILTRO, ordem=ORDEM_SAVGOL):
+    """
+    Filtro de Savitzky–Golay centrado (bordas estendidas, como o modo "nearest" do SciPy): uma
+    soma ponderada das colunas da visão em janelas, uma operação vetorial por coeficiente.
+    """
+    coeficientes = coeficientes_savgol(janela, ordem)
+    janelas = sliding_window_view(
+        np.pad(np.asarray(y, dtype=np.float64), janela // 2, mode="edge"),
+        len(coeficientes),
+    )
+    filtrado = np.zeros(len(y))
+    for coluna, coeficiente in enumerate(coeficientes):
+        filtrado += coeficiente * janelas[:, coluna]
+    return filtrado
+
+
+def estimar_patamares(
+    y, fracao_base=FRACAO_JANELA_BASE, fracao_regime=FRACAO_JANELA_REGIME
+):
+    """
+    Estima a linha de base (mediana da janela inicial), o regime permanente (mediana da janela
+    final) e o desvio do ruído na janela inicial, onde a saída ainda não respondeu ao degrau
+    (mediana dos desvios absolutos, que não sente picos isolados e vale também para ruído já
+    filtrado, ao contrário das estimativas por diferenças).
+
+    Returns:
+    - tuple: (linha_base, regime, ruido)
+    """
+    n = len(y)
+    n_base = min(n, max(AMOSTRAS_MINIMAS_JANELA, int(n * fracao_base)))
+    n_regime = min(n, max(AMOSTRAS_MINIMAS_JANELA, int(n * fracao_regime)))
+    inicio = np.asarray(y[:n_base], dtype=np.float64)
+    linha_base = float(np.median(inicio))
+    return (
+        linha_base,
+        float(np.median(y[n - n_regime :])),
+        float(1.4826 * np.median(np.abs(inicio - linha_base))),
+    )
+
+
+def filtro_anti_aliasing(fator, lobulos=LOBULOS):
+    """Passa-baixas sinc com janela de Hamming, corte em 0,8× a nova frequência de Nyquist."""
+    comprimento = 2 * lobulos * fator + 1
+    posicoes = np.arange(comprimento) - (comprimento - 1) / 2
+    corte = 0.8 / (2 * fator)
+    coeficientes = 2 * corte * np.sinc(2 * corte * posicoes) * np.hamming(comprimento)
+    return coeficientes / coeficientes.sum()
+
+
+def decimar(time, y, fator, bordas=None, lobulos=LOBULOS):
+    """
+    Decima `y` por `fator` com filtro anti-aliasing, calculando só as amostras mantidas.
+
+    O filtro é aplicado na forma polifásica: o sinal estendido é visto como uma matriz de
+    linhas de `fator` amostras (sem cópia) e cada fase do filtro vira um produto matriz-vetor,
+    então o custo é ~2·`lobulos` operações por amostra de entrada. As bordas são estendidas com
+    `bordas` (linha de base e regime), ou com as amostras extremas.
+
+    Returns:
+    - tuple: (time, y) com as amostras de índice 0, fator, 2·fator, ...
+    """
+    if fator <= 1:
+        return np.asarray(time), np.asarray(y, dtype=np.float64)
+
+    coeficientes = filtro_anti_aliasing(fator, lobulos)
+    fases = -(-len(coeficientes) // fator)
+    coeficientes = np.pad(coeficientes, (0, fases * fator - len(coeficientes)))
+    meia = lobulos * fator
+
+    n_saida = -(-len(y) // fator)
+    esquerda, direita = bordas if bordas is not None else (y[0], y[-1])
+    estendido = np.concatenate(
+        (
+            np.full(meia, esquerda, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            np.full((n_saida + fases) * fator - meia - len(y), direita),
+        )
+    )
+    linhas = estendido.reshape(-1, fator)
+
+    reduzido = np.zeros(n_saida)
+    for fase, trecho in enumerate(coeficientes.reshape(fases, fator)):
+        reduzido += linhas[fase : fase + n_saida] @ trecho
+    return np.asarray(time[::fator]), reduzido
+
+
+def indice_tempo_morto(
+    y,
+    linha_base=None,
+    ruido=None,
+    niveis=NIVEIS_RUIDO,
+    persistencia=PERSISTENCIA_TEMPO_MORTO,
+    fracao_base=FRACAO_JANELA_BASE,
+):
+    """
+    Índice da última amostra antes de a saída deixar a linha de base.
+
+    A saída só conta como mudada quando se afasta da linha de base, no sentido da resposta,
+    mais de `niveis` desvios do ruído por `persistencia` amostras seguidas: um pico isolado
+    não basta. Sem ruído (desvio zero) equivale à primeira amostra diferente da inicial.
+
+    Exceções:
+    - Levanta `IndexError` se a saída não mostrar uma mudança detectável.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if linha_base is None or ruido is None:
+        base, _, desvio = estimar_patamares(y, fracao_base)
+        linha_base = base if linha_base is None else linha_base
+        ruido = desvio if ruido is None else ruido
+
+    sinal = 1.0 if y[-1] >= linha_base else -1.0
+    acima = sinal * (y - linha_base) > niveis * ruido
+    persistencia = max(1, min(persistencia, len(y)))
+    persistentes = sliding_window_view(acima, persistencia).all(axis=1)
+    return max(int(np.flatnonzero(persistentes)[0]) - 1, 0)
+
+
+def preprocessar(
+    time,
+    output,
+    filtro=FILTRO_PREPROCESSAMENTO,
+    janela=JANELA_FILTRO,
+    ordem=ORDEM_SAVGOL,
+    amostras_alvo=AMOSTRAS_ALVO,
+):
+    """
+    Prepara a série medida para a identificação: filtro, patamares, decimação e tempo morto.
+
+    1. filtro: mediana (remove picos) ou Savitzky–Golay (preserva a curvatura) de `janela`
+       amostras, ou "nenhum";
+    2. patamares: linha de base, regime e ruído estimados em janelas (ver `estimar_patamares`);
+    3. decimação: com `amostras_alvo` > 0 e a série pelo menos duas vezes maior, decimação
+       anti-aliasing por um fator inteiro, deixando entre `amostras_alvo` e o dobro de amostras;
+    4. tempo morto: detecção robusta (ver `indice_tempo_morto`) na série reduzida.
+
+    A primeira e a última amostras da série reduzida recebem a linha de base e o regime
+    estimados: são elas que os métodos de identificação usam como valor inicial e final.
+
+    Returns:
+    - tuple: (time, output, relatorio). `relatorio` tem as estimativas, os tamanhos e o custo de
+      cada etapa em "etapas_ms" (também registrado no rastreador como "preprocessamento_*").
+    """
+    if filtro not in FILTROS:
+        raise ValueError(f"Filtro desconhecido: {filtro!r} (use um de {FILTROS}).")
+
+    etapas = {}
+
+    def medir(nome, funcao):
+        inicio = perf_counter()
+        resultado = funcao()
+        duracao = perf_counter() - inicio
+        etapas[nome] = duracao * 1000
+        rastreador.registrar(f"preprocessamento_{nome}", duracao)
+        return resultado
+
+    n_entrada = len(output)
+    if filtro == "mediana":
+        filtrado = medir("filtro", lambda: filtro_mediana(output, janela))
+    elif filtro == "savgol":
+        filtrado = medir("filtro", lambda: filtro_savgol(output, janela, ordem))
+    else:
+        # Cópia: `output` costuma ser a visão memory-mapped somente leitura do sidecar, e os
+        # extremos da série são substituídos abaixo
+        filtrado = np.array(output, dtype=np.float64)
+
+    linha_base, regime, ruido = medir("patamares", lambda: estimar_patamares(filtrado))
+
+    fator = n_entrada // amostras_alvo if amostras_alvo > 0 else 1
+    time_reduzido, reduzido = medir(
+        "decimacao", lambda: decimar(time, filtrado, fator, (linha_base, regime))
+    )
+    reduzido[0], reduzido[-1] = linha_base, regime
+
+    # O limiar usa o ruído que sobra depois do filtro e da decimação
+    try:
+        indice = medir("tempo_morto", lambda: indice_tempo_morto(reduzido, linha_base))
+        theta = float(time_reduzido[indice])
+    except IndexError:
+        theta = None
+
+    return (
+        time_reduzido,
+        reduzido,
+        {
+            "filtro": filtro,
+            "janela": janela,
+            "amostras_entrada": n_entrada,
+            "amostras_saida": len(reduzido),
+            "fator_decimacao": max(fator, 1),
+            "linha_base": linha_base,
+            "regime": regime,
+            "ruido": ruido,
+            "theta": theta,
+            "etapas_ms": etapas,
+        },
+    )
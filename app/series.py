@@ -0,0 +1,117 @@
+import base64
+
+import numpy as np
+
+# Limites do orçamento de pontos pedido pelo cliente
+PONTOS_MIN = 3
+PONTOS_MAX = 5000
+
+# Tamanho médio de balde a partir do qual o LTTB vetorizado por balde compensa
+BALDE_VETORIZADO = 32
+
+# Codificações aceitas para os vetores do payload
+CODIFICACOES = ("json", "f32")
+
+
+def lttb(x, y, n_pontos):
+    """
+    Seleciona `n_pontos` amostras de (x, y) pelo algoritmo Largest-Triangle-Three-Buckets.
+
+    O primeiro e o último ponto são mantidos; o restante da série é dividido em baldes e, em cada
+    balde, é escolhido o ponto que forma o maior triângulo com o ponto escolhido no balde anterior
+    e a média do balde seguinte. O formato visual (picos, oscilações) é preservado com uma fração
+    dos pontos.
+
+    Returns:
+    - indices (numpy.ndarray): Índices das amostras selecionadas, em ordem crescente.
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < PONTOS_MIN:
+        return np.arange(n)
+
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(np.intp)
+    limites = np.append(limites, n)
+
+    if n < BALDE_VETORIZADO * n_pontos:
+        # Baldes pequenos: o custo de cada chamada NumPy supera o trabalho útil
+        return _lttb_escalar(x.tolist(), y.tolist(), limites.tolist(), n_pontos)
+
+    indices = np.empty(n_pontos, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(n_pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        x_medio = x[fim : limites[i + 2]].mean()
+        y_medio = y[fim : limites[i + 2]].mean()
+
+        area = np.abs(
+            (x[a] - x_medio) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (y_medio - y[a])
+        )
+        a = inicio + int(np.argmax(area))
+        indices[i + 1] = a
+
+    return indices
+
+
+def _lttb_escalar(x, y, limites, n_pontos):
+    indices = [0]
+    a = 0
+    for i in range(n_pontos - 2):
+        inicio, fim, prox = limites[i], limites[i + 1], limites[i + 2]
+        x_medio = sum(x[fim:prox]) / (prox - fim)
+        y_medio = sum(y[fim:prox]) / (prox - fim)
+
+        xa, ya = x[a], y[a]
+        melhor, maior = inicio, -1.0
+        for j in range(inicio, fim):
+            area = abs((xa - x_medio) * (y[j] - ya) - (xa - x[j]) * (y_medio - ya))
+            if area > maior:
+                melhor, maior = j, area
+        a = melhor
+        indices.append(a)
+
+    indices.append(len(x) - 1)
+    return np.array(indices, dtype=np.intp)
+
+
+def limitar_pontos(n_pontos):
+    """Restringe o orçamento de pontos pedido pelo cliente ao intervalo permitido."""
+    return int(min(max(int(n_pontos), PONTOS_MIN), PONTOS_MAX))
+
+
+def codificar(valores, codificacao="json"):
+    """
+    Codifica um vetor para o payload: lista JSON ("json") ou bytes float32 little-endian em
+    base64 ("f32").
+    """
+    if codificacao == "f32":
+        dados = np.asarray(valores, dtype="<f4").tobytes()
+        return base64.b64encode(dados).decode("ascii")
+    if codificacao == "json":
+        # Seis algarismos significativos bastam para desenhar e mantêm o JSON curto
+        return [float(f"{v:.6g}") for v in np.asarray(valores, dtype=np.float64)]
+    raise ValueError(
+        f"Codificação desconhecida: {codificacao!r} (use uma de {CODIFICACOES})."
+    )
+
+
+def serie_compacta(t, y, n_pontos, codificacao="json"):
+    """
+    Reduz a série (t, y) com LTTB para no máximo `n_pontos` e a codifica para o cliente.
+
+    Returns:
+    - dict: {"t": ..., "y": ..., "pontos": n, "codificacao": codificacao}
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = lttb(t, y, limitar_pontos(n_pontos))
+
+    return {
+        "t": codificar(t[indices], codificacao),
+        "y": codificar(y[indices], codificacao),
+        "pontos": int(indices.size),
+        "codificacao": codificacao,
+    }
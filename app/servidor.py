@@ -0,0 +1,91 @@
+import os
+
+from config import HOST_SERVIDOR, PORTA_SERVIDOR
+
+# Threads por processo: cada conexão WebSocket ocupa uma enquanto está aberta
+THREADS_PADRAO = 16
+
+# Tempo máximo (s) de uma requisição; as análises de robustez grandes levam alguns segundos
+TIMEOUT_PADRAO = 120
+
+
+def servir(
+    host=HOST_SERVIDOR,
+    porta=PORTA_SERVIDOR,
+    workers=None,
+    threads=THREADS_PADRAO,
+    fila=None,
+    aquecer_caches=True,
+    timeout=TIMEOUT_PADRAO,
+):
+    """
+    Serve a aplicação sem janela (modo --headless), para uso como serviço compartilhado.
+
+    Usa o Gunicorn com workers "gthread": `workers` processos (por padrão, um por núcleo), cada um
+    com `threads` threads e a sua própria aplicação criada por `create_app`. Como os cálculos são
+    NumPy/SciPy e dependem de CPU, a vazão escala com o número de processos; as análises grandes
+    de cada worker dividem-se só entre os núcleos da sua parte (`limitar_processos`).
+
+    Com mais de um worker, os eventos Socket.IO emitidos por um processo só chegam aos clientes
+    conectados a outro por meio da fila de mensagens (`fila`, por exemplo "redis://localhost:6379",
+    que requer o pacote redis). O cliente do navegador usa apenas WebSocket, então não é preciso
+    afinidade de sessão no balanceamento entre workers.
+
+    Sem o Gunicorn instalado (por exemplo, no Windows), só é possível servir com um processo, no
+    servidor do Werkzeug; o padrão passa a ser um worker.
+
+    Exceções:
+    - Levanta `ImportError` se o Gunicorn não estiver instalado e foram pedidos explicitamente
+      mais de um worker.
+    """
+    from app import create_app
+    from app.tuning import limitar_processos
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as erro:
+        if workers is not None and workers > 1:
+            raise ImportError(
+                "O modo --headless com vários workers requer o pacote gunicorn "
+                "(pip install gunicorn)."
+            ) from erro
+
+        from app import socketio
+        from app.inicializacao import inicializacao
+
+        app = create_app(message_queue=fila)
+        if aquecer_caches:
+            inicializacao.aquecer_em_segundo_plano(socketio)
+        socketio.run(app, host=host, port=porta, allow_unsafe_werkzeug=True)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Os núcleos são divididos entre os workers: com um worker por núcleo (o padrão), as análises
+    # grandes rodam no próprio worker, sem um executor de processos em cada um
+    limitar_processos((os.cpu_count() or 1) // workers)
+
+    def post_worker_init(worker):
+        if aquecer_caches:
+            from app import socketio
+            from app.inicializacao import inicializacao
+
+            inicializacao.aquecer_em_segundo_plano(socketio, worker.log)
+
+    class AplicacaoGunicorn(BaseApplication):
+        def load_config(self):
+            opcoes = {
+                "bind": f"{host}:{porta}",
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "timeout": timeout,
+                "post_worker_init": post_worker_init,
+            }
+            for nome, valor in opcoes.items():
+                self.cfg.set(nome, valor)
+
+        def load(self):
+            # Chamado em cada worker, depois do fork
+            return create_app(message_queue=fila)
+
+    AplicacaoGunicorn().run()
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from flask import request
+from flask_socketio import Namespace
+
+from app.series import serie_compacta
+from app.tuning import metricas_desempenho
+from app.utils import horizonte_simulacao, simular_malha_fechada_pid
+
+NAMESPACE = "/sintonia"
+
+
+def calcular_ajuste(dados):
+    """
+    Simula a malha fechada para uma posição dos controles deslizantes (Kp, Ti, Td) e monta a
+    resposta enviada ao navegador: série reduzida (float32) e métricas.
+    """
+    k, tau, theta, kp, ti, td = (
+        float(dados[campo]) for campo in ("k", "tau", "theta", "kp", "ti", "td")
+    )
+    t = horizonte_simulacao(tau, theta)
+    y = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)
+    overshoot, t_acomodacao, itae = metricas_desempenho(t, y)
+
+    return {
+        "seq": dados.get("seq"),
+        "serie": serie_compacta(t, y[0], dados.get("pontos", 600), "f32"),
+        "kp": kp,
+        "ti": ti,
+        "td": td,
+        "overshoot": _finito_ou_none(overshoot[0]),
+        "t_acomodacao": _finito_ou_none(t_acomodacao[0]),
+        "itae": _finito_ou_none(itae[0]),
+    }
+
+
+def _finito_ou_none(valor):
+    return float(valor) if np.isfinite(valor) else None
+
+
+def _percentis_ms(amostras):
+    if not amostras:
+        return None
+    valores = np.array(amostras)
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {
+        "p50": p50 * 1000,
+        "p95": p95 * 1000,
+        "p99": p99 * 1000,
+        "max": valores.max() * 1000,
+    }
+
+
+class NamespaceSintonia(Namespace):
+    """
+    Namespace Socket.IO para a sintonia manual interativa.
+
+    O navegador emite "ajustar" a cada movimento dos controles deslizantes. Cada cliente tem no
+    máximo uma simulação em andamento e uma pendente: se chegam vários ajustes enquanto um é
+    calculado, só o mais recente é processado e os intermediários são descartados. A resposta
+    volta no evento "resposta".
+
+    São registradas as latências no servidor (recebimento → envio, incluindo a espera) e as de
+    ida e volta medidas pelo navegador, que as informa no ajuste seguinte (`rtt_ms`).
+    """
+
+    def __init__(self, namespace=NAMESPACE):
+        super().__init__(namespace)
+        self._pendentes = {}
+        self._ativos = set()
+        self._lock = threading.Lock()
+
+        self._latencias = deque(maxlen=1024)
+        self._computo = deque(maxlen=1024)
+        self._ida_volta = deque(maxlen=1024)
+        self._processados = 0
+        self._descartados = 0
+
+    def on_ajustar(self, dados):
+        sid = request.sid
+        recebido = time.perf_counter()
+
+        with self._lock:
+            if isinstance(dados.get("rtt_ms"), (int, float)):
+                self._ida_volta.append(dados["rtt_ms"] / 1000)
+            if sid in self._pendentes:
+                self._descartados += 1
+            self._pendentes[sid] = (dados, recebido)
+            if sid in self._ativos:
+                return
+            self._ativos.add(sid)
+
+        self.socketio.start_background_task(self._processar, sid)
+
+    def on_disconnect(self, *args):
+        with self._lock:
+            self._pendentes.pop(request.sid, None)
+
+    def _processar(self, sid):
+        while True:
+            with self._lock:
+                item = self._pendentes.pop(sid, None)
+                if item is None:
+                    self._ativos.discard(sid)
+                    return
+            dados, recebido = item
+
+            inicio = time.perf_counter()
+            try:
+                resposta = calcular_ajuste(dados)
+            except (KeyError, TypeError, ValueError, ZeroDivisionError) as erro:
+                self.emit(
+                    "erro", {"seq": dados.get("seq"), "erro": str(erro)}, room=sid
+                )
+                continue
+            fim = time.perf_counter()
+
+            resposta["computo_ms"] = (fim - inicio) * 1000
+            self.emit("resposta", resposta, room=sid)
+
+            with self._lock:
+                self._processados += 1
+                self._computo.append(fim - inicio)
+                self._latencias.append(time.perf_counter() - recebido)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "processados": self._processados,
+                "descartados": self._descartados,
+                "latencia_servidor_ms": _percentis_ms(self._latencias),
+                "computo_ms": _percentis_ms(self._computo),
+                "ida_e_volta_ms": _percentis_ms(self._ida_volta),
+            }
+
+
+sintonia_ao_vivo = NamespaceSintonia()
@@ -1,24 +1,191 @@
 document.addEventListener("DOMContentLoaded", () => {
     let graficoAberto = true;
+    let seriesHome = null;
+
+    function desenharHome() {
+        const melhor = seriesHome.melhor_metodo;
+        desenharGrafico(document.getElementById("grafico-canvas"), {
+            titulo: `${graficoAberto ? "Malha Aberta" : "Malha Fechada"} - ${melhor}`,
+            rotuloX: "Tempo (s)",
+            rotuloY: "Temperatura (C°)",
+            curvas: [
+                {serie: seriesHome.referencia, cor: "blue", rotulo: "Referência"},
+                {
+                    serie: graficoAberto ? seriesHome.aberta : seriesHome.fechada,
+                    cor: graficoAberto ? "magenta" : "green",
+                    tracejado: true,
+                    rotulo: melhor
+                }
+            ]
+        });
+    }
 
     function alternarGrafico() {
         const grafico = document.getElementById("grafico");
         const seta = document.getElementById("seta");
 
         if (graficoAberto) {
-            grafico.src = window.IMAGE_CLOSED;
+            if (grafico) grafico.src = window.IMAGE_CLOSED;
             seta.style.transform = "rotate(180deg)";
         } else {
-            grafico.src = window.IMAGE_OPEN;
+            if (grafico) grafico.src = window.IMAGE_OPEN;
             seta.style.transform = "rotate(0deg)";
         }
 
         graficoAberto = !graficoAberto;
+
+        if (window.MODO_SERIES && seriesHome) {
+            desenharHome();
+        }
     }
 
     document.getElementById("toggle-button").addEventListener("click", alternarGrafico);
+
+    if (window.CARREGANDO) {
+        // O servidor ainda está aquecendo os caches: recarrega quando os resultados ficam prontos
+        conectarSocketIO('/inicializacao', {pronto: () => location.reload()});
+        return;
+    }
+
+    if (window.MODO_SERIES) {
+        const canvas = document.getElementById("grafico-canvas");
+        axios.get("/dados_home", {
+            params: {pontos: canvas.width, codificacao: "f32"}
+        }).then(response => {
+            seriesHome = response.data;
+            desenharHome();
+        }).catch(error => {
+            console.error("Erro ao carregar as séries:", error);
+        });
+    }
 });
 
+function decodificarSerie(serie) {
+    if (serie.codificacao !== 'f32') {
+        return {t: serie.t, y: serie.y};
+    }
+    const decodificar = (b64) => {
+        const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+        return new Float32Array(bytes.buffer);
+    };
+    return {t: decodificar(serie.t), y: decodificar(serie.y)};
+}
+
+function desenharGrafico(canvas, opcoes) {
+    const ctx = canvas.getContext('2d');
+    const largura = canvas.width;
+    const altura = canvas.height;
+    const margem = {esquerda: 70, direita: 20, topo: 40, base: 50};
+    const curvas = opcoes.curvas.map(c => ({...c, dados: decodificarSerie(c.serie)}));
+    const horizontais = opcoes.linhasHorizontais || [];
+
+    // Limites dos eixos com 5% de margem vertical
+    let xMin = Infinity, xMax = -Infinity, yMin = Infinity, yMax = -Infinity;
+    curvas.forEach(c => {
+        for (let i = 0; i < c.dados.t.length; i++) {
+            xMin = Math.min(xMin, c.dados.t[i]);
+            xMax = Math.max(xMax, c.dados.t[i]);
+            yMin = Math.min(yMin, c.dados.y[i]);
+            yMax = Math.max(yMax, c.dados.y[i]);
+        }
+    });
+    horizontais.forEach(h => {
+        yMin = Math.min(yMin, h.y);
+        yMax = Math.max(yMax, h.y);
+    });
+    const delta = (yMax - yMin) * 0.05 || 1;
+    yMin -= delta;
+    yMax += delta;
+
+    const px = (x) => margem.esquerda + (x - xMin) / (xMax - xMin || 1) * (largura - margem.esquerda - margem.direita);
+    const py = (y) => altura - margem.base - (y - yMin) / (yMax - yMin) * (altura - margem.topo - margem.base);
+
+    ctx.fillStyle = 'white';
+    ctx.fillRect(0, 0, largura, altura);
+
+    // Grade e rótulos dos eixos
+    ctx.strokeStyle = '#b0b0b0';
+    ctx.fillStyle = 'black';
+    ctx.lineWidth = 0.8;
+    ctx.setLineDash([]);
+    ctx.font = '11px sans-serif';
+    const divisoes = 5;
+    for (let i = 0; i <= divisoes; i++) {
+        const x = xMin + (xMax - xMin) * i / divisoes;
+        const y = yMin + (yMax - yMin) * i / divisoes;
+
+        ctx.beginPath();
+        ctx.moveTo(px(x), margem.topo);
+        ctx.lineTo(px(x), altura - margem.base);
+        ctx.moveTo(margem.esquerda, py(y));
+        ctx.lineTo(largura - margem.direita, py(y));
+        ctx.stroke();
+
+        ctx.textAlign = 'center';
+        ctx.fillText(Number(x.toPrecision(4)).toString(), px(x), altura - margem.base + 15);
+        ctx.textAlign = 'right';
+        ctx.fillText(Number(y.toPrecision(4)).toString(), margem.esquerda - 5, py(y) + 4);
+    }
+    ctx.strokeStyle = 'black';
+    ctx.strokeRect(margem.esquerda, margem.topo, largura - margem.esquerda - margem.direita, altura - margem.topo - margem.base);
+
+    ctx.textAlign = 'center';
+    ctx.font = '14px sans-serif';
+    ctx.fillText(opcoes.titulo || '', largura / 2, margem.topo - 15);
+    ctx.font = '12px sans-serif';
+    ctx.fillText(opcoes.rotuloX || '', largura / 2, altura - 12);
+    ctx.save();
+    ctx.translate(15, altura / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.fillText(opcoes.rotuloY || '', 0, 0);
+    ctx.restore();
+
+    // Área de plotagem
+    ctx.save();
+    ctx.beginPath();
+    ctx.rect(margem.esquerda, margem.topo, largura - margem.esquerda - margem.direita, altura - margem.topo - margem.base);
+    ctx.clip();
+    ctx.lineWidth = 1.5;
+
+    curvas.forEach(c => {
+        ctx.strokeStyle = c.cor;
+        ctx.setLineDash(c.tracejado ? [6, 4] : []);
+        ctx.beginPath();
+        for (let i = 0; i < c.dados.t.length; i++) {
+            const x = px(c.dados.t[i]);
+            const y = py(c.dados.y[i]);
+            if (i === 0) ctx.moveTo(x, y); else ctx.lineTo(x, y);
+        }
+        ctx.stroke();
+    });
+
+    horizontais.forEach(h => {
+        ctx.strokeStyle = h.cor;
+        ctx.setLineDash([6, 4]);
+        ctx.beginPath();
+        ctx.moveTo(margem.esquerda, py(h.y));
+        ctx.lineTo(largura - margem.direita, py(h.y));
+        ctx.stroke();
+    });
+    ctx.restore();
+
+    // Legenda
+    const itens = curvas.concat(horizontais.map(h => ({...h, tracejado: true})));
+    ctx.font = '12px sans-serif';
+    ctx.textAlign = 'left';
+    itens.forEach((item, i) => {
+        const y = margem.topo + 18 + i * 18;
+        ctx.strokeStyle = item.cor;
+        ctx.setLineDash(item.tracejado ? [6, 4] : []);
+        ctx.beginPath();
+        ctx.moveTo(margem.esquerda + 10, y - 4);
+        ctx.lineTo(margem.esquerda + 40, y - 4);
+        ctx.stroke();
+        ctx.fillText(item.rotulo, margem.esquerda + 46, y);
+    });
+    ctx.setLineDash([]);
+}
+
 function switchTab(index) {
     const tabs = document.querySelectorAll('.tab');
     const boxContent = document.getElementById('box-content');
@@ -65,6 +232,11 @@ function gerarPID(method) {
         return;
     }
 
+    if (method === 'pareto') {
+        buscarPareto();
+        return;
+    }
+
     coloca_botao_pid_como_ativo(method)
 
     axios.post("/gerar_pid", {
@@ -72,43 +244,177 @@ function gerarPID(method) {
         tau: tau,
         theta: theta,
         method: method,
-        last_time: lastTime
+        last_time: lastTime,
+        ...parametrosSeries()
+    }).then(response => {
+        exibirResultadoPID(response.data);
+
+    }).catch(error => {
+        console.error("Erro ao gerar PID:", error);
+        alert("Erro ao gerar o gráfico PID.");
+    });
+}
+
+function buscarPareto() {
+    const k = document.getElementById('k').innerText;
+    const tau = document.getElementById('tau').innerText;
+    const theta = document.getElementById('theta').innerText;
+
+    coloca_botao_pid_como_ativo('pareto')
+    document.getElementById('ajuste-ao-vivo').style.display = 'none';
+    document.getElementById('pid-resultados').innerHTML = '<p>Buscando sintonias...</p>';
+
+    axios.post("/buscar_pid", {
+        k: k,
+        tau: tau,
+        theta: theta
     }).then(response => {
-        const imgBase64 = response.data.image;
-        const kp = response.data.kp.toFixed(3);
-        const ti = response.data.ti.toFixed(3);
-        const td = response.data.td.toFixed(3);
-        const overshoot = response.data.overshoot.toFixed(2);
+        const fronteira = response.data.fronteira;
+        const tempo = response.data.tempo.toFixed(2);
+
+        const linhas = fronteira.map(s => `
+            <tr onclick="gerarPidManual(${s.kp}, ${s.ti}, ${s.td})">
+                <td>${s.kp.toFixed(3)}</td>
+                <td>${s.ti.toFixed(3)}</td>
+                <td>${s.td.toFixed(3)}</td>
+                <td>${s.overshoot.toFixed(2)}%</td>
+                <td>${s.t_acomodacao.toFixed(1)}</td>
+                <td>${s.itae.toExponential(3)}</td>
+            </tr>
+        `).join('');
 
         const html = `
-            <div class="inputs-container">
-                <div class="item"><span><strong>Kp:</strong> ${kp}<span></div>
-                <div class="item"><span><strong>Ti:</strong> ${ti}</span></div>
-                <div class="item"><span><strong>Td:</strong> ${td}</span></div>
-                <div class="item"><span><strong>Overshoot:</strong> ${overshoot}%</span></div>
-            </div>
-            <img id="pid-img" src="data:image/png;base64,${imgBase64}" alt="Resposta PID" style="max-width: 100%;">
+            <p>${response.data.candidatos} sintonias avaliadas em ${tempo} s.
+               Clique em uma linha para simulá-la.</p>
+            <table class="pareto-table">
+                <thead>
+                    <tr><th>Kp</th><th>Ti</th><th>Td</th><th>Overshoot</th><th>Acomodação (s)</th><th>ITAE</th></tr>
+                </thead>
+                <tbody>${linhas}</tbody>
+            </table>
         `;
 
         document.getElementById('pid-resultados').innerHTML = html;
 
-        // // Mostrar botão de download
-        // const downloadBtn = document.getElementById('download-btn');
-        // downloadBtn.style.display = 'inline-block';
-        //
-        // // Atualizar função do botão para baixar a imagem
-        // downloadBtn.onclick = () => {
-        //     const a = document.createElement('a');
-        //     a.href = `data:image/png;base64,${imgBase64}`;
-        //     a.download = `grafico_pid_${method}.png`;
-        //     document.body.appendChild(a);
-        //     a.click();
-        //     document.body.removeChild(a);
-        // };
+    }).catch(error => {
+        console.error("Erro ao buscar sintonias:", error);
+        alert("Erro ao buscar sintonias PID.");
+    });
+}
+
+function parametrosSeries() {
+    // No modo "series" o servidor devolve os dados e o navegador desenha o gráfico
+    return window.MODO_SERIES ? {format: 'series', pontos: 600, codificacao: 'f32'} : {};
+}
+
+function exibirResultadoPID(data) {
+    const kp = data.kp.toFixed(3);
+    const ti = data.ti.toFixed(3);
+    const td = data.td.toFixed(3);
+    const overshoot = data.overshoot === null ? '∞' : data.overshoot.toFixed(2);
+
+    const grafico = data.serie
+        ? '<canvas id="pid-canvas" width="600" height="400"></canvas>'
+        : `<img id="pid-img" src="${data.image_url}" alt="Resposta PID" style="max-width: 100%;">`;
+
+    const html = `
+        <div class="inputs-container">
+            <div class="item"><span><strong>Kp:</strong> ${kp}<span></div>
+            <div class="item"><span><strong>Ti:</strong> ${ti}</span></div>
+            <div class="item"><span><strong>Td:</strong> ${td}</span></div>
+            <div class="item"><span><strong>Overshoot:</strong> ${overshoot}%</span></div>
+        </div>
+        ${textoMetricas(data.metricas)}
+        ${textoMargens(data.margens)}
+        ${grafico}
+        <p id="robustez-resumo"></p>
+    `;
+
+    document.getElementById('pid-resultados').innerHTML = html;
+    analisarRobustez(data.kp, data.ti, data.td);
+
+    if (data.serie) {
+        desenharRespostaPID(document.getElementById('pid-canvas'), data.serie, overshoot);
+    }
+    prepararAjusteAoVivo(data.kp, data.ti, data.td);
+
+    // // Mostrar botão de download
+    // const downloadBtn = document.getElementById('download-btn');
+    // downloadBtn.style.display = 'inline-block';
+    //
+    // // Atualizar função do botão para baixar a imagem
+    // downloadBtn.onclick = () => {
+    //     const a = document.createElement('a');
+    //     a.href = `data:image/png;base64,${imgBase64}`;
+    //     a.download = `grafico_pid_${method}.png`;
+    //     document.body.appendChild(a);
+    //     a.click();
+    //     document.body.removeChild(a);
+    // };
+}
+
+function analisarRobustez(kp, ti, td) {
+    const variacao = 10;
 
+    axios.post("/robustez", {
+        k: document.getElementById('k').innerText,
+        tau: document.getElementById('tau').innerText,
+        theta: document.getElementById('theta').innerText,
+        method: 'manual',
+        kp: kp,
+        ti: ti,
+        td: td,
+        n_plantas: 2000,
+        variacao: variacao
+    }).then(response => {
+        const r = response.data;
+        const resumo = document.getElementById('robustez-resumo');
+        if (!resumo) return;
+
+        const overshoot = r.overshoot.finitos ? `${r.overshoot.p50.toFixed(1)}% (p95 ${r.overshoot.p95.toFixed(1)}%)` : '—';
+        const acomodacao = r.t_acomodacao.finitos ? `${r.t_acomodacao.p95.toFixed(0)} s` : '—';
+        resumo.innerText =
+            `Robustez (±${variacao}% em K, τ, θ; ${r.plantas} plantas): overshoot ${overshoot}, ` +
+            `acomodação p95 ${acomodacao}, instáveis ${(r.fracao_instavel * 100).toFixed(1)}%`;
     }).catch(error => {
-        console.error("Erro ao gerar PID:", error);
-        alert("Erro ao gerar o gráfico PID.");
+        console.error("Erro na análise de robustez:", error);
+    });
+}
+
+function textoMetricas(metricas) {
+    if (!metricas) return '';
+    const formatar = valor => valor === null ? '∞' : `${valor.toFixed(1)} s`;
+    return `
+        <div class="inputs-container">
+            <div class="item"><span><strong>Subida:</strong> ${formatar(metricas.t_subida)}</span></div>
+            <div class="item"><span><strong>Pico:</strong> ${formatar(metricas.t_pico)}</span></div>
+            <div class="item"><span><strong>Acomodação (2%):</strong> ${formatar(metricas.t_acomodacao_2)}</span></div>
+            <div class="item"><span><strong>ITAE:</strong> ${metricas.itae === null ? '∞' : metricas.itae.toExponential(2)}</span></div>
+        </div>
+    `;
+}
+
+function textoMargens(margens) {
+    if (!margens) return '';
+    // Margens infinitas (sem cruzamento) chegam como null
+    const formatar = (valor, casas, sufixo = '') => valor === null ? '∞' : `${valor.toFixed(casas)}${sufixo}`;
+    return `
+        <div class="inputs-container">
+            <div class="item"><span><strong>MG:</strong> ${formatar(margens.margem_ganho, 2)}</span></div>
+            <div class="item"><span><strong>MF:</strong> ${formatar(margens.margem_fase, 1, '°')}</span></div>
+            <div class="item"><span><strong>Ms:</strong> ${margens.estavel === false ? 'instável' : formatar(margens.ms, 2)}</span></div>
+        </div>
+    `;
+}
+
+function desenharRespostaPID(canvas, serie, overshoot) {
+    const y = decodificarSerie(serie).y;
+    desenharGrafico(canvas, {
+        titulo: 'Sistema com Controle PID',
+        rotuloX: 'Time (seconds)',
+        rotuloY: 'Temperatura [°C]',
+        curvas: [{serie: serie, cor: 'blue', rotulo: 'PID'}],
+        linhasHorizontais: [{y: Math.max(...y), cor: 'red', rotulo: `Overshoot ~ ${overshoot}%`}]
     });
 }
 
@@ -146,40 +452,10 @@ function gerarPidManual(kp, ti, td) {
         kp: kp,
         ti: ti,
         td: td,
-        last_time: lastTime
+        last_time: lastTime,
+        ...parametrosSeries()
     }).then(response => {
-        const imgBase64 = response.data.image;
-        const kp = response.data.kp.toFixed(3);
-        const ti = response.data.ti.toFixed(3);
-        const td = response.data.td.toFixed(3);
-        const overshoot = response.data.overshoot.toFixed(2);
-
-        const html = `
-            <div class="inputs-container">
-                <div class="item"><span><strong>Kp:</strong> ${kp}<span></div>
-                <div class="item"><span><strong>Ti:</strong> ${ti}</span></div>
-                <div class="item"><span><strong>Td:</strong> ${td}</span></div>
-                <div class="item"><span><strong>Overshoot:</strong> ${overshoot}%</span></div>
-            </div>
-            <img id="pid-img" src="data:image/png;base64,${imgBase64}" alt="Resposta PID" style="max-width: 100%;">
-        `;
-
-        document.getElementById('pid-resultados').innerHTML = html;
-
-        // // Mostrar botão de download
-        // const downloadBtn = document.getElementById('download-btn');
-        // downloadBtn.style.display = 'inline-block';
-        //
-        // // Atualizar função do botão para baixar a imagem
-        // downloadBtn.onclick = () => {
-        //     const a = document.createElement('a');
-        //     a.href = `data:image/png;base64,${imgBase64}`;
-        //     a.download = `grafico_pid_${method}.png`;
-        //     document.body.appendChild(a);
-        //     a.click();
-        //     document.body.removeChild(a);
-        // };
-
+        exibirResultadoPID(response.data);
         fecharModal();
 
     }).catch(error => {
@@ -198,4 +474,131 @@ function confirmarManual() {
         return;
     }
     gerarPidManual(kp, ti, td);
-}
\ No newline at end of file
+}
+
+// Cliente Socket.IO mínimo (Engine.IO v4, somente WebSocket)
+function conectarSocketIO(namespace, eventos) {
+    const protocolo = location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${protocolo}://${location.host}/socket.io/?EIO=4&transport=websocket`);
+    const conexao = {conectado: false};
+
+    conexao.emit = (evento, dados) => {
+        ws.send(`42${namespace},${JSON.stringify([evento, dados])}`);
+    };
+
+    ws.onmessage = (mensagem) => {
+        const pacote = mensagem.data;
+        if (pacote[0] === '0') {
+            ws.send(`40${namespace},`);               // abertura: conecta ao namespace
+        } else if (pacote[0] === '2') {
+            ws.send('3');                             // ping → pong
+        } else if (pacote[0] === '4') {
+            const tipo = pacote[1];
+            const corpo = pacote.slice(2 + namespace.length + 1);
+            if (tipo === '0') {
+                conexao.conectado = true;
+            } else if (tipo === '2') {
+                const [evento, dados] = JSON.parse(corpo);
+                if (eventos[evento]) eventos[evento](dados);
+            }
+        }
+    };
+    ws.onclose = () => {
+        conexao.conectado = false;
+    };
+    return conexao;
+}
+
+const aoVivo = {
+    conexao: null,
+    centro: null,         // Kp, Ti, Td em torno dos quais os controles variam
+    seq: 0,
+    ultimoExibido: -1,
+    enviados: {},
+    emAndamento: false,
+    pendente: false,
+    rtt: null,
+    rtts: []
+};
+
+// Os controles cobrem de 1/4 a 4x o valor central em escala logarítmica
+function valorSlider(id, centro) {
+    const posicao = document.getElementById(id).value / 1000;
+    return centro * Math.pow(4, 2 * posicao - 1);
+}
+
+function prepararAjusteAoVivo(kp, ti, td) {
+    aoVivo.centro = {kp: kp, ti: ti, td: td};
+    ['kp', 'ti', 'td'].forEach(p => {
+        document.getElementById(`slider-${p}`).value = 500;
+        document.getElementById(`valor-${p}`).innerText = aoVivo.centro[p].toFixed(3);
+    });
+    document.getElementById('ajuste-ao-vivo').style.display = 'flex';
+
+    if (!aoVivo.conexao) {
+        aoVivo.conexao = conectarSocketIO('/sintonia', {resposta: receberAjuste});
+    }
+}
+
+function ajustarAoVivo() {
+    if (!aoVivo.conexao || !aoVivo.conexao.conectado) return;
+
+    // No máximo um ajuste em andamento; movimentos intermediários viram um único pendente
+    if (aoVivo.emAndamento) {
+        aoVivo.pendente = true;
+        return;
+    }
+    aoVivo.emAndamento = true;
+    aoVivo.pendente = false;
+
+    const seq = ++aoVivo.seq;
+    aoVivo.enviados[seq] = performance.now();
+    aoVivo.conexao.emit('ajustar', {
+        seq: seq,
+        k: document.getElementById('k').innerText,
+        tau: document.getElementById('tau').innerText,
+        theta: document.getElementById('theta').innerText,
+        kp: valorSlider('slider-kp', aoVivo.centro.kp),
+        ti: valorSlider('slider-ti', aoVivo.centro.ti),
+        td: valorSlider('slider-td', aoVivo.centro.td),
+        pontos: 600,
+        rtt_ms: aoVivo.rtt
+    });
+}
+
+function receberAjuste(data) {
+    aoVivo.emAndamento = false;
+    if (data.seq > aoVivo.ultimoExibido) {
+        aoVivo.ultimoExibido = data.seq;
+        aoVivo.rtt = performance.now() - aoVivo.enviados[data.seq];
+        aoVivo.rtts.push(aoVivo.rtt);
+        if (aoVivo.rtts.length > 200) aoVivo.rtts.shift();
+        delete aoVivo.enviados[data.seq];
+        exibirAjuste(data);
+    }
+    if (aoVivo.pendente) ajustarAoVivo();
+}
+
+function exibirAjuste(data) {
+    ['kp', 'ti', 'td'].forEach(p => {
+        document.getElementById(`valor-${p}`).innerText = data[p].toFixed(3);
+    });
+
+    let canvas = document.getElementById('pid-canvas');
+    if (!canvas) {
+        // Modo imagem: troca o PNG por um canvas na primeira atualização ao vivo
+        const img = document.getElementById('pid-img');
+        canvas = document.createElement('canvas');
+        canvas.id = 'pid-canvas';
+        canvas.width = 600;
+        canvas.height = 400;
+        img.replaceWith(canvas);
+    }
+    const overshoot = data.overshoot === null ? '∞' : data.overshoot.toFixed(2);
+    desenharRespostaPID(canvas, data.serie, overshoot);
+
+    const ordenados = [...aoVivo.rtts].sort((a, b) => a - b);
+    const p = (q) => ordenados[Math.min(ordenados.length - 1, Math.floor(q * ordenados.length))].toFixed(1);
+    document.getElementById('latencia-ao-vivo').innerText =
+        `Ida e volta: p50 ${p(0.5)} ms · p95 ${p(0.95)} ms · simulação ${data.computo_ms.toFixed(1)} ms`;
+}
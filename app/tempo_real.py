@@ -0,0 +1,567 @@
+import argparse
+import asyncio
+import math
+import struct
+import threading
+import time
+
+import numpy as np
+from flask import request
+from flask_socketio import Namespace
+
+from app.identificacao_online import fonte_permitida
+from app.series import codificar
+from config import ESPERA_ATIVA_MS
+
+NAMESPACE = "/tempo_real"
+
+# Menor período de controle aceito (s) e maior duração de uma execução (s)
+TICK_MINIMO = 0.001
+DURACAO_MAXIMA = 600.0
+
+# Intervalo (s) entre os lotes de amostras enviados ao navegador
+INTERVALO_ENVIO = 0.05
+
+# Limites (s) das classes dos histogramas de atraso de despertar e de cômputo por período
+LIMITES_TEMPO_REAL = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+)
+
+# O seletor do asyncio dorme em milissegundos inteiros; com margem > 0 (s), as esperas dormem
+# até essa margem antes do instante pedido e completam o restante cedendo o laço a cada volta
+MARGEM_ESPERA_ATIVA = ESPERA_ATIVA_MS / 1000
+
+# Tempo máximo (s) de espera pela medida da planta remota antes de repetir a anterior
+TIMEOUT_PLANTA = 0.05
+
+# Pacotes da planta remota: pedido (tipo, seq, valor) e resposta (seq, y)
+PEDIDO = struct.Struct("<cId")
+RESPOSTA = struct.Struct("<Id")
+
+
+class PlantaFOPDT:
+    """
+    Planta K·e^(−θs)/(τs + 1) discretizada de forma exata para entrada segurada (ZOH) no passo
+    `dt`, com o atraso fracionário em um buffer circular: a mesma recorrência de
+    `simular_malha_fechada_pid`, avançada um passo por vez.
+    """
+
+    def __init__(self, k, tau, theta, dt):
+        self.dt = dt
+        self.a = math.exp(-dt / tau)
+        atraso = max(theta, 0.0) / dt
+        self.d = int(atraso)
+        a_f = self.a ** (1.0 - (atraso - self.d))
+        self.b1 = k * (1.0 - a_f)
+        self.b2 = k * (a_f - self.a)
+        self.buffer = [0.0] * (self.d + 2)
+        self.n = 0
+        self.y = 0.0
+        self.u = 0.0
+
+    def avancar(self, passos):
+        """Avança `passos` passos com a entrada atual segurada e retorna a saída."""
+        tamanho, d, buffer = len(self.buffer), self.d, self.buffer
+        for _ in range(passos):
+            n = self.n
+            buffer[n % tamanho] = self.u
+            self.y = (
+                self.a * self.y
+                + self.b1 * buffer[(n - d) % tamanho]
+                + self.b2 * buffer[(n - d - 1) % tamanho]
+            )
+            self.n = n + 1
+        return self.y
+
+    async def medir(self, passos):
+        return self.avancar(passos)
+
+    async def atuar(self, u):
+        self.u = u
+
+    def fechar(self):
+        pass
+
+
+class PIDDiscreto:
+    """PID ideal discretizado no passo `dt`, como em `simular_malha_fechada_pid`."""
+
+    def __init__(self, kp, ti, td, dt):
+        self.kp = kp
+        self.ki = kp * dt / ti if math.isfinite(ti) and ti > 0 else 0.0
+        self.kd = kp * td / dt
+        self.integral = 0.0
+        self.e_anterior = 0.0
+
+    def passo(self, e):
+        self.integral += e
+        u = self.kp * e + self.ki * self.integral + self.kd * (e - self.e_anterior)
+        self.e_anterior = e
+        return u
+
+
+class _ProtocoloCliente(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.pendentes = {}
+
+    def datagram_received(self, dados, endereco):
+        try:
+            seq, y = RESPOSTA.unpack(dados)
+        except struct.error:
+            return
+        futuro = self.pendentes.pop(seq, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(y)
+
+
+class PlantaUDP:
+    """
+    Planta remota acessada por UDP: o dispositivo real ou o substituto local de
+    `ProtocoloPlantaRemota` (`python -m app.tempo_real --porta ... --k ... --tau ... --theta ...`).
+
+    `medir` envia um pedido "M" e espera a resposta por até `timeout` segundos; sem resposta,
+    repete a última medida e conta uma perda. `atuar` envia "A" com o sinal de controle, sem
+    esperar confirmação. A planta remota evolui no tempo real, então `passos` é ignorado.
+    """
+
+    def __init__(self, host, porta, timeout=TIMEOUT_PLANTA):
+        self.endereco = (host, porta)
+        self.timeout = timeout
+        self.perdas = 0
+        self._seq = 0
+        self._ultima = 0.0
+        self._transporte = None
+        self._protocolo = None
+
+    async def abrir(self):
+        laco = asyncio.get_running_loop()
+        self._transporte, self._protocolo = await laco.create_datagram_endpoint(
+            _ProtocoloCliente, remote_addr=self.endereco
+        )
+        return self
+
+    async def medir(self, passos):
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        futuro = asyncio.get_running_loop().create_future()
+        self._protocolo.pendentes[self._seq] = futuro
+        self._transporte.sendto(PEDIDO.pack(b"M", self._seq, 0.0))
+        try:
+            self._ultima = await asyncio.wait_for(futuro, self.timeout)
+        except asyncio.TimeoutError:
+            self._protocolo.pendentes.pop(self._seq, None)
+            self.perdas += 1
+        return self._ultima
+
+    async def atuar(self, u):
+        self._transporte.sendto(PEDIDO.pack(b"A", self._seq, u))
+
+    def fechar(self):
+        if self._transporte is not None:
+            self._transporte.close()
+
+
+class ProtocoloPlantaRemota(asyncio.DatagramProtocol):
+    """
+    Substituto local do dispositivo: uma `PlantaFOPDT` que evolui no tempo real (`escala`
+    segundos de planta por segundo) e responde aos pedidos de `PlantaUDP`.
+    """
+
+    def __init__(self, planta, escala=1.0):
+        self.planta = planta
+        self.escala = escala
+        self.inicio = None
+        self.transporte = None
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+
+    def datagram_received(self, dados, endereco):
+        try:
+            tipo, seq, valor = PEDIDO.unpack(dados)
+        except struct.error:
+            return
+
+        # Alcança o instante atual com a entrada segurada desde o último pacote
+        agora = time.perf_counter()
+        if self.inicio is None:
+            self.inicio = agora
+        passo_real = self.planta.dt / self.escala
+        alvo = int((agora - self.inicio) / passo_real)
+        self.planta.avancar(alvo - self.planta.n)
+
+        if tipo == b"M":
+            self.transporte.sendto(RESPOSTA.pack(seq, self.planta.y), endereco)
+        elif tipo == b"A":
+            self.planta.u = valor
+
+
+class ExecutorTempoReal:
+    """
+    Executa a malha planta + PID em tempo real (brando) com período `tick`, em um laço asyncio.
+
+    A cada período o executor acorda no prazo (`inicio + n·tick`), mede a planta, calcula o PID
+    e, depois da latência injetada (`latencia` mais um valor uniforme em [0, `jitter`]), aplica o
+    controle. Se o laço acorda com um ou mais períodos inteiros de atraso, esses períodos são
+    perdidos: a planta simulada avança por eles com o controle anterior segurado, como a
+    planta real faria, e o PID continua usando o passo nominal, como o firmware.
+
+    São registrados por período executado o atraso de despertar (jitter do laço), o tempo de
+    cômputo (medida + PID, sem a latência injetada) e se a atuação terminou depois do prazo do
+    período seguinte (perda de prazo).
+
+    `escala` é o número de segundos de planta por segundo real: com τ de ~3000 s, escala=100
+    reproduz o ensaio em ~5 min a 1 ms por período.
+    """
+
+    def __init__(
+        self,
+        planta,
+        pid,
+        tick,
+        duracao,
+        referencia=1.0,
+        latencia=0.0,
+        jitter=0.0,
+        escala=1.0,
+        enviar=None,
+        intervalo_envio=INTERVALO_ENVIO,
+        semente=None,
+    ):
+        if tick < TICK_MINIMO:
+            raise ValueError(f"O período mínimo é de {TICK_MINIMO * 1000:g} ms.")
+        if not 0 < duracao <= DURACAO_MAXIMA:
+            raise ValueError(f"A duração deve estar entre 0 e {DURACAO_MAXIMA:g} s.")
+
+        self.planta = planta
+        self.pid = pid
+        self.tick = tick
+        self.duracao = duracao
+        self.referencia = referencia
+        self.latencia = latencia
+        self.jitter = jitter
+        self.escala = escala
+        self.enviar = enviar
+        self.intervalo_envio = intervalo_envio
+        self._aleatorio = np.random.default_rng(semente)
+
+    async def executar(self):
+        """Executa a malha até `duracao` e retorna o resumo (ver `resumo_execucao`)."""
+        laco = asyncio.get_running_loop()
+        relogio = time.perf_counter
+        n_ticks = int(round(self.duracao / self.tick))
+        dt_planta = self.tick * self.escala
+
+        despertar = np.empty(n_ticks)
+        computo = np.empty(n_ticks)
+        executados = perdidos = perdas_prazo = 0
+        lote = {"t": [], "y": [], "u": []}
+        proximo_envio = relogio() + self.intervalo_envio
+        envios = []
+
+        inicio = relogio()
+        n = ultimo = 0
+        while n < n_ticks:
+            await esperar_ate(inicio + n * self.tick)
+            acordou = relogio()
+
+            atual = min(max(n, int((acordou - inicio) / self.tick)), n_ticks - 1)
+            perdidos += atual - n
+
+            y = await self.planta.medir(atual - ultimo)
+            u = self.pid.passo(self.referencia - y)
+            fim_computo = relogio()
+
+            extra = self.latencia + (
+                self._aleatorio.uniform(0.0, self.jitter) if self.jitter else 0.0
+            )
+            if extra > 0:
+                await esperar_ate(fim_computo + extra)
+            await self.planta.atuar(u)
+
+            despertar[executados] = acordou - (inicio + atual * self.tick)
+            computo[executados] = fim_computo - acordou
+            executados += 1
+            if relogio() > inicio + (atual + 1) * self.tick:
+                perdas_prazo += 1
+
+            lote["t"].append(atual * dt_planta)
+            lote["y"].append(y)
+            lote["u"].append(u)
+            if self.enviar is not None and relogio() >= proximo_envio:
+                # O envio roda fora do laço para não atrasar o próximo período
+                envios.append(
+                    laco.run_in_executor(None, self.enviar, _codificar_lote(lote))
+                )
+                lote = {"t": [], "y": [], "u": []}
+                proximo_envio = relogio() + self.intervalo_envio
+
+            ultimo = atual
+            n = atual + 1
+
+        if self.enviar is not None and lote["t"]:
+            envios.append(
+                laco.run_in_executor(None, self.enviar, _codificar_lote(lote))
+            )
+        await asyncio.gather(*envios)
+
+        return resumo_execucao(
+            despertar[:executados],
+            computo[:executados],
+            n_ticks,
+            perdidos,
+            perdas_prazo,
+            relogio() - inicio,
+            getattr(self.planta, "perdas", 0),
+        )
+
+
+async def esperar_ate(instante, margem=MARGEM_ESPERA_ATIVA):
+    """
+    Espera até o instante `instante` de `time.perf_counter`, sem bloquear o laço.
+
+    Os instantes do executor são absolutos (início + n·período), então o atraso de um despertar
+    não se acumula nos seguintes. Com `margem` > 0, dorme só até `margem` segundos antes e
+    completa a espera cedendo o laço a cada volta (espera ativa).
+    """
+    espera = instante - time.perf_counter() - margem
+    if espera > 0:
+        await asyncio.sleep(espera)
+    if margem <= 0:
+        return
+    while time.perf_counter() < instante:
+        await asyncio.sleep(0)
+
+
+def _codificar_lote(lote):
+    return {campo: codificar(valores, "f32") for campo, valores in lote.items()}
+
+
+def histograma_ms(valores, limites=LIMITES_TEMPO_REAL):
+    """Percentis (ms) e contagens por classe (a última classe não tem limite superior)."""
+    if valores.size == 0:
+        return None
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    contagens, _ = np.histogram(valores, bins=(-np.inf, *limites, np.inf))
+    return {
+        "p50": p50 * 1000,
+        "p95": p95 * 1000,
+        "p99": p99 * 1000,
+        "max": float(valores.max()) * 1000,
+        "limites_ms": [limite * 1000 for limite in limites],
+        "contagens": contagens.tolist(),
+    }
+
+
+def resumo_execucao(
+    despertar, computo, n_ticks, perdidos, perdas_prazo, duracao_real, perdas_planta=0
+):
+    return {
+        "periodos": n_ticks,
+        "executados": int(despertar.size),
+        "perdidos": perdidos,
+        "perdas_prazo": perdas_prazo,
+        "perdas_planta": perdas_planta,
+        "duracao_real_s": duracao_real,
+        "atraso_despertar_ms": histograma_ms(despertar),
+        "computo_ms": histograma_ms(computo),
+    }
+
+
+class LacoTempoReal:
+    """Laço asyncio em uma thread própria, compartilhado pelas execuções em tempo real."""
+
+    def __init__(self):
+        self._laco = None
+        self._lock = threading.Lock()
+
+    def agendar(self, corrotina):
+        with self._lock:
+            if self._laco is None:
+                self._laco = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._laco.run_forever, name="tempo-real", daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(corrotina, self._laco)
+
+
+def configurar_execucao(dados, enviar=None):
+    """
+    Monta o executor a partir do pedido do navegador: planta (k, tau, theta), PID (kp, ti, td),
+    `tick_ms`, `duracao_s`, `escala`, `latencia_ms`, `jitter_ms`, `referencia` e, para usar a
+    planta remota em vez da simulada, `planta_udp` ("host:porta", que deve estar em
+    `FONTES_PERMITIDAS` como "udp://host[:porta]").
+
+    Returns:
+    - tuple: (executor, abrir), onde `abrir` é a corrotina que conecta a planta remota, ou None.
+    """
+    k, tau, theta, kp, ti, td = (
+        float(dados[campo]) for campo in ("k", "tau", "theta", "kp", "ti", "td")
+    )
+    tick = float(dados.get("tick_ms", 10)) / 1000
+    escala = float(dados.get("escala", 1.0))
+    dt_planta = tick * escala
+
+    abrir = None
+    if dados.get("planta_udp"):
+        host, _, porta = str(dados["planta_udp"]).rpartition(":")
+        host = host or "127.0.0.1"
+        if not fonte_permitida(f"udp://{host}:{int(porta)}"):
+            raise PermissionError(
+                f"Planta remota não permitida: {dados['planta_udp']} (configure C213_FONTES)"
+            )
+        planta = PlantaUDP(host, int(porta))
+        abrir = planta.abrir()
+    else:
+        planta = PlantaFOPDT(k, tau, theta, dt_planta)
+
+    executor = ExecutorTempoReal(
+        planta,
+        PIDDiscreto(kp, ti if ti > 0 else math.inf, td, dt_planta),
+        tick,
+        float(dados.get("duracao_s", 10)),
+        referencia=float(dados.get("referencia", 1.0)),
+        latencia=float(dados.get("latencia_ms", 0)) / 1000,
+        jitter=float(dados.get("jitter_ms", 0)) / 1000,
+        escala=escala,
+        enviar=enviar,
+    )
+    return executor, abrir
+
+
+class NamespaceTempoReal(Namespace):
+    """
+    Namespace Socket.IO do executor em tempo real.
+
+    O navegador emite "iniciar" (ver `configurar_execucao`) e recebe lotes de amostras em
+    "amostras" ({"t", "y", "u"} em float32/base64) e, ao fim, o resumo em "resumo". "parar"
+    (ou a desconexão) cancela a execução. Cada cliente tem no máximo uma execução; os resumos
+    das últimas ficam em `estatisticas`.
+    """
+
+    def __init__(self, namespace=NAMESPACE):
+        super().__init__(namespace)
+        self.laco = LacoTempoReal()
+        self._execucoes = {}
+        self._ultimos = []
+        self._lock = threading.Lock()
+
+    def on_iniciar(self, dados):
+        sid = request.sid
+        try:
+            executor, abrir = configurar_execucao(
+                dados, lambda lote: self.emit("amostras", lote, room=sid)
+            )
+        except (
+            KeyError,
+            TypeError,
+            ValueError,
+            ZeroDivisionError,
+            PermissionError,
+        ) as erro:
+            self.emit("erro", {"erro": str(erro)}, room=sid)
+            return
+
+        self._cancelar(sid)
+        futuro = self.laco.agendar(self._executar(sid, executor, abrir))
+        with self._lock:
+            self._execucoes[sid] = futuro
+
+    def on_parar(self, *args):
+        self._cancelar(request.sid)
+
+    def on_disconnect(self, *args):
+        self._cancelar(request.sid)
+
+    async def _executar(self, sid, executor, abrir):
+        try:
+            if abrir is not None:
+                await abrir
+            resumo = await executor.executar()
+        except Exception as erro:
+            # Qualquer falha da execução (rede, simulação) vai para o cliente que a pediu; o
+            # cancelamento (CancelledError) não é Exception e segue normalmente
+            self.emit("erro", {"erro": str(erro)}, room=sid)
+            return
+        finally:
+            executor.planta.fechar()
+            with self._lock:
+                self._execucoes.pop(sid, None)
+
+        with self._lock:
+            self._ultimos = (self._ultimos + [resumo])[-10:]
+        self.emit("resumo", resumo, room=sid)
+
+    def _cancelar(self, sid):
+        with self._lock:
+            futuro = self._execucoes.pop(sid, None)
+        if futuro is not None:
+            futuro.cancel()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "em_andamento": len(self._execucoes),
+                "ultimas": list(self._ultimos),
+            }
+
+
+tempo_real = NamespaceTempoReal()
+
+
+def servir_planta(host, porta, k, tau, theta, passo, escala=1.0):
+    """Roda o substituto UDP do dispositivo até ser interrompido."""
+
+    async def servir():
+        laco = asyncio.get_running_loop()
+        planta = PlantaFOPDT(k, tau, theta, passo * escala)
+        transporte, _ = await laco.create_datagram_endpoint(
+            lambda: ProtocoloPlantaRemota(planta, escala), local_addr=(host, porta)
+        )
+        print(f"Planta FOPDT em udp://{host}:{porta} (Ctrl+C para encerrar)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            transporte.close()
+
+    asyncio.run(servir())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Substituto UDP do dispositivo para o executor em tempo real"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=9999)
+    parser.add_argument("--k", type=float, required=True)
+    parser.add_argument("--tau", type=float, required=True)
+    parser.add_argument("--theta", type=float, required=True)
+    parser.add_argument(
+        "--passo-ms", type=float, default=1.0, help="passo interno da simulação"
+    )
+    parser.add_argument(
+        "--escala", type=float, default=1.0, help="segundos de planta por segundo real"
+    )
+    argumentos = parser.parse_args()
+    try:
+        servir_planta(
+            argumentos.host,
+            argumentos.porta,
+            argumentos.k,
+            argumentos.tau,
+            argumentos.theta,
+            argumentos.passo_ms / 1000,
+            argumentos.escala,
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,331 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.metricas import metricas_resposta
+from app.utils import (
+    chr_com_sobre_valor,
+    horizonte_simulacao,
+    simular_malha_fechada_pid,
+    ziegler_nichols_malha_aberta,
+)
+
+# A partir deste número de candidatos o lote é dividido entre processos
+LIMITE_PARALELO = 8000
+
+# Respostas que passam deste múltiplo da referência são tratadas como divergentes
+LIMITE_DIVERGENCIA = 100.0
+
+# Classes dos histogramas das distribuições da análise de robustez
+CLASSES_HISTOGRAMA = 20
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Processos das avaliações grandes; None usa um por núcleo (ver `limitar_processos`)
+_processos = None
+
+
+def limitar_processos(n_processos):
+    """
+    Define quantos processos as avaliações grandes usam; com 1 elas rodam no próprio processo.
+
+    O modo --headless divide os núcleos entre os workers do Gunicorn, que de outro modo teriam
+    cada um um executor do tamanho da máquina.
+    """
+    global _processos
+    _processos = max(1, int(n_processos))
+
+
+def _n_processos():
+    return _processos or os.cpu_count() or 1
+
+
+def _obter_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Sem fork: o processo do servidor tem várias threads, e o filho herdaria locks
+            # presos por elas. O forkserver parte de um processo limpo e é mais rápido que o spawn
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context(
+                "forkserver" if "forkserver" in metodos else "spawn"
+            )
+            _executor = ProcessPoolExecutor(
+                max_workers=_n_processos(), mp_context=contexto
+            )
+        return _executor
+
+
+METODOS_SINTONIA = ("zn", "chr", "manual")
+
+
+def sintonia_pid(k, tau, theta, method, kp=None, ti=None, td=None):
+    """Retorna (Kp, Ti, Td) pelo método pedido ("zn", "chr" ou "manual", que usa os dados)."""
+    if method == "zn":
+        return ziegler_nichols_malha_aberta(k, tau, theta)
+    if method == "chr":
+        return chr_com_sobre_valor(k, tau, theta)
+    return kp, ti, td
+
+
+def gerar_candidatos(
+    k, tau, theta, n_candidatos=20000, modo="aleatorio", fator=4.0, semente=None
+):
+    """
+    Gera sintonias (Kp, Ti, Td) ao redor da sintonia de Ziegler-Nichols do modelo identificado.
+
+    Cada parâmetro varia por um fator multiplicativo entre 1/fator e fator (escala logarítmica),
+    em uma grade regular (modo "grade") ou por amostragem aleatória (modo "aleatorio").
+
+    Returns:
+    - kp, ti, td (numpy.ndarray): Vetores com os parâmetros dos candidatos.
+    """
+    centro = np.array(ziegler_nichols_malha_aberta(k, tau, theta))
+    limite = np.log(fator)
+
+    if modo == "grade":
+        n_eixo = max(2, int(round(n_candidatos ** (1 / 3))))
+        eixo = np.linspace(-limite, limite, n_eixo)
+        expoentes = np.stack(np.meshgrid(eixo, eixo, eixo, indexing="ij"), axis=-1)
+        expoentes = expoentes.reshape(-1, 3)
+    elif modo == "aleatorio":
+        rng = np.random.default_rng(semente)
+        expoentes = rng.uniform(-limite, limite, size=(n_candidatos, 3))
+    else:
+        raise ValueError(f"Modo de busca desconhecido: {modo}")
+
+    candidatos = centro * np.exp(expoentes)
+    return candidatos[:, 0], candidatos[:, 1], candidatos[:, 2]
+
+
+def metricas_desempenho(t, y, referencia=1.0, faixa=0.02):
+    """
+    Calcula sobressinal (%), tempo de acomodação e ITAE para cada linha de `y`, a partir de
+    `metricas_resposta`.
+
+    Respostas instáveis, ou que terminam o horizonte fora da faixa em torno da referência (não
+    acomodam), recebem `np.inf`.
+
+    Returns:
+    - overshoot, t_acomodacao, itae (numpy.ndarray): Um valor por linha.
+    """
+    metricas = metricas_resposta(t, y, referencia, faixas=(faixa,))
+    t_acomodacao = metricas[f"t_acomodacao_{faixa * 100:g}"]
+    t_acomodacao[np.abs(metricas["erro_regime"]) > faixa * abs(referencia)] = np.inf
+    return metricas["overshoot"], t_acomodacao, metricas["itae"]
+
+
+def fronteira_pareto(objetivos):
+    """
+    Retorna os índices das linhas não dominadas de `objetivos` (minimização em todas as colunas).
+
+    Os pontos são ordenados pela soma dos objetivos e, a cada ponto ainda ativo, todos os que ele
+    domina são descartados de uma só vez, de forma vetorizada.
+    """
+    objetivos = np.asarray(objetivos, dtype=np.float64)
+    indices = np.argsort(objetivos.sum(axis=1), kind="stable")
+    restantes = objetivos[indices]
+
+    i = 0
+    while i < len(restantes):
+        nao_dominados = np.any(restantes < restantes[i], axis=1)
+        nao_dominados[i] = True
+        indices = indices[nao_dominados]
+        restantes = restantes[nao_dominados]
+        i = np.count_nonzero(nao_dominados[:i]) + 1
+
+    return indices
+
+
+def _avaliar_lote(k, tau, theta, kp, ti, td, t):
+    y = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)
+    return np.column_stack(metricas_desempenho(t, y))
+
+
+def avaliar_sintonias(k, tau, theta, kp, ti, td, n_pontos=400):
+    """
+    Simula e pontua um lote de sintonias, dividindo-o entre processos quando é grande.
+
+    Returns:
+    - objetivos (numpy.ndarray): Matriz (n × 3) com sobressinal, tempo de acomodação e ITAE.
+    """
+    t = horizonte_simulacao(tau, theta, n_pontos)
+
+    if kp.size < LIMITE_PARALELO or _n_processos() == 1:
+        return _avaliar_lote(k, tau, theta, kp, ti, td, t)
+
+    executor = _obter_executor()
+    n_partes = min(_n_processos(), int(np.ceil(kp.size / (LIMITE_PARALELO / 4))))
+    partes = np.array_split(np.arange(kp.size), n_partes)
+    futuros = [
+        executor.submit(_avaliar_lote, k, tau, theta, kp[p], ti[p], td[p], t)
+        for p in partes
+    ]
+    return np.vstack([f.result() for f in futuros])
+
+
+def buscar_sintonia_pid(
+    k, tau, theta, n_candidatos=20000, modo="aleatorio", n_pontos=400, semente=None
+):
+    """
+    Varre sintonias PID ao redor do modelo (k, τ, θ) e retorna a fronteira de Pareto por
+    sobressinal, tempo de acomodação e ITAE.
+
+    Returns:
+    - dict: Número de candidatos avaliados, tempo gasto (s) e a lista de sintonias não
+      dominadas, ordenada por ITAE.
+    """
+    inicio = time.perf_counter()
+
+    kp, ti, td = gerar_candidatos(k, tau, theta, n_candidatos, modo, semente=semente)
+    objetivos = avaliar_sintonias(k, tau, theta, kp, ti, td, n_pontos)
+
+    validos = np.flatnonzero(np.isfinite(objetivos).all(axis=1))
+    fronteira = validos[fronteira_pareto(objetivos[validos])]
+    fronteira = fronteira[np.argsort(objetivos[fronteira, 2])]
+
+    return {
+        "candidatos": int(kp.size),
+        "tempo": time.perf_counter() - inicio,
+        "fronteira": [
+            {
+                "kp": float(kp[i]),
+                "ti": float(ti[i]),
+                "td": float(td[i]),
+                "overshoot": float(objetivos[i, 0]),
+                "t_acomodacao": float(objetivos[i, 1]),
+                "itae": float(objetivos[i, 2]),
+            }
+            for i in fronteira
+        ],
+    }
+
+
+def perturbar_planta(k, tau, theta, n_plantas, variacao=0.1, semente=None):
+    """
+    Sorteia `n_plantas` modelos FOPDT com K, τ e θ variando uniformemente em ±`variacao`
+    (fração) em torno dos valores nominais, de forma independente.
+    """
+    rng = np.random.default_rng(semente)
+    fatores = rng.uniform(1 - variacao, 1 + variacao, size=(n_plantas, 3))
+    return k * fatores[:, 0], tau * fatores[:, 1], theta * fatores[:, 2]
+
+
+def _avaliar_robustez(k, tau, theta, kp, ti, td, t):
+    y = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)
+    overshoot, t_acomodacao, _ = metricas_desempenho(t, y)
+
+    with np.errstate(invalid="ignore"):
+        estaveis = np.abs(y).max(axis=1) < LIMITE_DIVERGENCIA
+    overshoot[~estaveis] = np.inf
+    t_acomodacao[~estaveis] = np.inf
+    if estaveis.any():
+        envelope = np.vstack((y[estaveis].min(axis=0), y[estaveis].max(axis=0)))
+    else:
+        envelope = np.vstack((np.full(t.size, np.inf), np.full(t.size, -np.inf)))
+    return np.column_stack((overshoot, t_acomodacao)), envelope
+
+
+def _resumo_distribuicao(valores):
+    finitos = valores[np.isfinite(valores)]
+    if finitos.size == 0:
+        return {"finitos": 0}
+
+    p5, p50, p95 = np.percentile(finitos, [5, 50, 95])
+    contagens, limites = np.histogram(finitos, bins=CLASSES_HISTOGRAMA)
+    return {
+        "finitos": int(finitos.size),
+        "media": float(finitos.mean()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(finitos.max()),
+        "histograma": {"limites": limites.tolist(), "contagens": contagens.tolist()},
+    }
+
+
+def analisar_robustez(
+    k,
+    tau,
+    theta,
+    kp,
+    ti,
+    td,
+    n_plantas=10000,
+    variacao=0.1,
+    n_pontos=400,
+    semente=None,
+):
+    """
+    Avalia uma sintonia PID contra `n_plantas` plantas perturbadas (±`variacao` em K, τ e θ).
+
+    Todos os pares (planta, controlador) são simulados em lotes vetorizados, divididos entre
+    processos quando o número de plantas passa de `LIMITE_PARALELO`. O horizonte cobre a planta
+    mais lenta do sorteio.
+
+    Returns:
+    - dict: Distribuições de sobressinal e tempo de acomodação, frações de respostas
+      divergentes e que não acomodam no horizonte, o envelope de pior caso (mínimo e máximo
+      de y(t) entre as plantas estáveis) com a resposta nominal e a planta de maior sobressinal.
+    """
+    inicio = time.perf_counter()
+
+    k_p, tau_p, theta_p = perturbar_planta(k, tau, theta, n_plantas, variacao, semente)
+    t = horizonte_simulacao(tau_p.max(), theta_p.max(), n_pontos)
+
+    if n_plantas < LIMITE_PARALELO or _n_processos() == 1:
+        objetivos, envelope = _avaliar_robustez(k_p, tau_p, theta_p, kp, ti, td, t)
+    else:
+        executor = _obter_executor()
+        n_partes = min(_n_processos(), int(np.ceil(n_plantas / (LIMITE_PARALELO / 4))))
+        partes = np.array_split(np.arange(n_plantas), n_partes)
+        futuros = [
+            executor.submit(
+                _avaliar_robustez, k_p[p], tau_p[p], theta_p[p], kp, ti, td, t
+            )
+            for p in partes
+        ]
+        resultados = [f.result() for f in futuros]
+        objetivos = np.vstack([r[0] for r in resultados])
+        envelope = np.vstack(
+            (
+                np.min([r[1][0] for r in resultados], axis=0),
+                np.max([r[1][1] for r in resultados], axis=0),
+            )
+        )
+
+    y_nominal = simular_malha_fechada_pid(k, tau, theta, kp, ti, td, t)[0]
+    overshoot, t_acomodacao = objetivos[:, 0], objetivos[:, 1]
+    finitos = np.isfinite(overshoot)
+    pior = int(np.argmax(np.where(finitos, overshoot, -np.inf)))
+
+    return {
+        "plantas": int(n_plantas),
+        "variacao": variacao,
+        "tempo": time.perf_counter() - inicio,
+        "overshoot": _resumo_distribuicao(overshoot),
+        "t_acomodacao": _resumo_distribuicao(t_acomodacao),
+        "fracao_instavel": float(np.mean(~np.isfinite(overshoot))),
+        "fracao_sem_acomodar": float(np.mean(~np.isfinite(t_acomodacao))),
+        "envelope": {
+            "t": t,
+            "y_min": envelope[0],
+            "y_max": envelope[1],
+            "y_nominal": y_nominal,
+        },
+        "pior_caso": (
+            {
+                "k": float(k_p[pior]),
+                "tau": float(tau_p[pior]),
+                "theta": float(theta_p[pior]),
+                "overshoot": float(overshoot[pior]),
+            }
+            if finitos.any()
+            else None
+        ),
+    }
@@ -1,9 +1,13 @@
+import math
 import os
 import sys
 
 import numpy as np
-from control import feedback, pade, series, step_response, tf
-from scipy.io import loadmat
+
+from app.dataset import abrir_experimento, ler_experimento
+from app.metricas import metricas_resposta
+from app.preprocessamento import indice_tempo_morto
+from app.rastreamento import etapa
 
 
 def identificar_fopdt(step, time_dataset, output_dataset):
@@ -19,7 +23,7 @@ def identificar_fopdt(step, time_dataset, output_dataset):
 
     A função usa a abordagem clássica para estimar os parâmetros:
     1. O ganho estático (K) é calculado como a razão entre a variação final da saída e a variação do degrau aplicado.
-    2. O tempo morto (θ) é estimado como o tempo até a primeira mudança na saída após o degrau.
+    2. O tempo morto (θ) é estimado como o tempo até a primeira mudança persistente na saída (acima do ruído) após o degrau.
     3. A constante de tempo (τ) é estimada com base na aproximação de 63,21% da variação total da saída.
     4. A função também gera o modelo FOPDT aproximado como uma função de transferência com o atraso modelado por uma aproximação de Padé.
 
@@ -45,6 +49,34 @@ def identificar_fopdt(step, time_dataset, output_dataset):
         modelo = identificar_fopdt(input_data, time_data, output_data)
         print(modelo)
     """
+    from control import pade, series, tf
+
+    K, tau, theta = parametros_fopdt(step, time_dataset, output_dataset)
+
+    # Parte sem atraso
+    g = tf([K], [tau, 1])  # G(s) = K / (τs + 1)
+
+    # Aproximação de Padé para o atraso
+    num_delay, den_delay = pade(theta, 1)
+    delay = tf(num_delay, den_delay)
+
+    # Sistema com atraso aproximado
+    g_total = series(delay, g)
+
+    return g_total
+
+
+def parametros_fopdt(step, time_dataset, output_dataset):
+    """
+    Estima os parâmetros (K, τ, θ) do modelo FOPDT pela abordagem clássica usada em
+    `identificar_fopdt`, sem construir a função de transferência.
+
+    Returns:
+    - K (float): Ganho estático.
+    - tau (float): Constante de tempo (ponto de 63,21%).
+    - theta (float): Tempo morto (instante anterior à primeira mudança persistente da saída,
+      acima do ruído; ver `indice_tempo_morto`).
+    """
     # Cálculo do ganho estático K
     valor_inicial = output_dataset[0]
 
@@ -52,8 +84,8 @@ def identificar_fopdt(step, time_dataset, output_dataset):
     output_padronizado = output_dataset - valor_inicial
     K = output_padronizado[-1] / step
 
-    # Estimativa do tempo morto (theta)
-    idx_mudanca = np.where(output_dataset != output_dataset[0])[0][0] - 1
+    # Estimativa do tempo morto (theta): instante anterior à mudança persistente da saída
+    idx_mudanca = indice_tempo_morto(output_dataset)
     theta = time_dataset[idx_mudanca]
 
     # Cálculo da constante de tempo (tau) - ponto de 63.21%
@@ -61,20 +93,39 @@ def identificar_fopdt(step, time_dataset, output_dataset):
     index_valor_referencia = np.where(output_padronizado >= valor_referencia)[0][0]
     tau = time_dataset[index_valor_referencia] - theta
 
-    # Parte sem atraso
-    g = tf([K], [tau, 1])  # G(s) = K / (τs + 1)
+    return K, tau, theta
 
-    # Aproximação de Padé para o atraso
-    num_delay, den_delay = pade(theta, 1)
-    delay = tf(num_delay, den_delay)
 
-    # Sistema com atraso aproximado
-    g_total = series(delay, g)
+# Métodos de dois pontos: frações (p1, p2) da variação total da saída e coeficientes (a, b, c)
+# de τ = a·(t2 − t1) e θ = b·t1 + c·t2, onde t1 e t2 são os instantes em que p1 e p2 são atingidas
+METODOS_DOIS_PONTOS = {
+    "Smith": ((0.283, 0.632), (1.5, 1.5, -0.5)),
+    "Sundaresan": ((0.353, 0.853), (2 / 3, 1.3, -0.29)),
+    "Alfaro 123c": ((0.25, 0.75), (0.910, 1.262, -0.262)),
+    "Bröida": ((0.28, 0.40), (5.5, 2.8, -1.8)),
+    "Ho": ((0.35, 0.85), (0.670, 1.3, -0.29)),
+    "Chen e Yang": ((0.33, 0.67), (1.4, 1.54, -0.54)),
+    "Viteckova": ((0.33, 0.70), (1.245, 1.498, -0.498)),
+}
+FRACOES_DOIS_PONTOS = {
+    metodo: fracoes for metodo, (fracoes, _) in METODOS_DOIS_PONTOS.items()
+}
 
-    return g_total
+
+def parametros_dois_pontos(method, t1, t2):
+    """
+    Calcula (τ, θ) a partir dos instantes t1 e t2 em que a saída cruza as frações de
+    `FRACOES_DOIS_PONTOS[method]`.
+    """
+    a, b, c = METODOS_DOIS_PONTOS[method][1]
+    tau = a * (t2 - t1)
+    theta = b * t1 + c * t2
+
+    return tau, theta
 
 
-def identification_process(step, time, output, method):
+@etapa("identificacao")
+def identification_process(step, time, output, method, modo="exato", ordem_pade=6):
     """
     identificationProcess identifies control systems using the Smith or Sundaresan methods based on
     test data, considering a First Order Plus Dead Time model.
@@ -84,7 +135,11 @@ def identification_process(step, time, output, method):
     Time.
 
     identification = identificationProcess(Step, Time, Output, 'Method', method) specifies the
-    system identification method, valid as 'Smith' or 'Sundaresan'. The default method is Smith.
+    system identification method, valid as 'Smith' or 'Sundaresan' (or any other two-point method
+    in METODOS_DOIS_PONTOS). The default method is Smith.
+
+    The EQM is computed against the closed-form FOPDT response with exact dead time
+    (modo="exato"); modo="pade" keeps the reference Padé/step_response simulation.
 
     Inputs:
       - Step   (scalar) Amplitude of the input step. Must be a finite, non-zero number.
@@ -99,57 +154,295 @@ def identification_process(step, time, output, method):
     output_padronizado = output - valor_inicial
     k = output_padronizado[-1] / step
 
-    if method == "Smith":
-        val1 = 0.283 * output_padronizado[-1]
-        val2 = 0.632 * output_padronizado[-1]
-    else:  # Sundaresan
-        val1 = 0.353 * output_padronizado[-1]
-        val2 = 0.853 * output_padronizado[-1]
+    frac1, frac2 = FRACOES_DOIS_PONTOS[method]
+    val1 = frac1 * output_padronizado[-1]
+    val2 = frac2 * output_padronizado[-1]
 
     index1 = np.where(output_padronizado >= val1)[0][0]
     index2 = np.where(output_padronizado >= val2)[0][0]
     t1 = time[index1]
     t2 = time[index2]
 
-    if method == "Smith":
-        tau = (t2 - t1) * 1.5
-        theta = t2 - tau
-    else:  # Sundaresan
-        tau = (t2 - t1) * (2 / 3)
-        theta = (1.3 * t1) - (0.29 * t2)
+    tau, theta = parametros_dois_pontos(method, t1, t2)
 
-    # Parte sem atraso
-    G = tf([k], [tau, 1])
+    # Simular a resposta ao degrau do sistema identificado e calcular o EQM
+    eqm = calcular_eqm((k, tau, theta), step, time, output, modo, ordem_pade)[0]
 
-    # Aproximação de Padé para o atraso
-    num_delay, den_delay = pade(theta, 6)
-    delay = tf(num_delay, den_delay)
+    return k, tau, theta, eqm
 
-    # Sistema com atraso aproximado
-    f_identification = series(delay, G)
 
-    # Simular a resposta ao degrau do sistema identificado
-    t_sim, y_sim = step_response(f_identification, T=time)
-    y_sim = y_sim * step
+@etapa("simulacao")
+def simular_fopdt(
+    parametros, time, step=1.0, modo="exato", ordem_pade=6, t_inicial=None
+):
+    """
+    Simula a resposta ao degrau em malha aberta de um ou mais modelos FOPDT.
 
-    # Calcular EQM
-    output_ref = output - output[0]
-    eqm = np.sqrt(np.mean((output_ref - y_sim) ** 2))
+    No modo "exato" a resposta é avaliada pela forma fechada
 
-    return k, tau, theta, eqm
+        y(t) = step · K · (1 − exp(−(t − θ) / τ)),  para t ≥ θ (e 0 antes disso),
+
+    com o atraso representado sem aproximação, para todos os conjuntos de parâmetros de uma vez.
+    O modo "pade" mantém o caminho de referência com a biblioteca `control` (atraso aproximado
+    por Padé de ordem `ordem_pade` e `step_response`), um modelo por vez.
+
+    O degrau é aplicado em `time[0]`, como em `control.step_response`, ou em `t_inicial`, o que
+    permite simular um trecho de uma série longa (modo "exato").
+
+    Args:
+    - parametros (array_like): Um conjunto (K, τ, θ) ou uma matriz (n_modelos × 3).
+    - time (numpy.ndarray): Instantes de simulação.
+    - step (float): Amplitude do degrau.
+    - modo (str): "exato" ou "pade".
+    - ordem_pade (int): Ordem da aproximação de Padé no modo "pade".
+
+    Returns:
+    - y (numpy.ndarray): Matriz (n_modelos × len(time)) com as respostas simuladas.
+    """
+    parametros = np.atleast_2d(np.asarray(parametros, dtype=np.float64))
+    time = np.asarray(time, dtype=np.float64)
+
+    if modo == "pade":
+        from control import pade, series, step_response, tf
+
+        y = np.empty((parametros.shape[0], time.size))
+        for i, (k, tau, theta) in enumerate(parametros):
+            num_delay, den_delay = pade(theta, ordem_pade)
+            sistema = series(tf(num_delay, den_delay), tf([k], [tau, 1]))
+            _, y[i] = step_response(sistema, T=time)
+        y *= step
+        return y
+
+    if modo != "exato":
+        raise ValueError(f"Modo de simulação desconhecido: {modo}")
+
+    k = parametros[:, 0:1]
+    tau = parametros[:, 1:2]
+    theta = parametros[:, 2:3]
+
+    # Operações in-place para evitar temporários do tamanho da matriz
+    if t_inicial is None:
+        t_inicial = time[0]
+
+    y = (time - t_inicial)[np.newaxis, :] - theta
+    np.maximum(y, 0.0, out=y)
+    y /= -tau
+    np.exp(y, out=y)
+    np.subtract(1.0, y, out=y)
+    y *= k * step
+    return y
+
+
+def calcular_eqm(parametros, step, time, output, modo="exato", ordem_pade=6):
+    """
+    Calcula a raiz do erro quadrático médio (EQM) entre a saída medida (relativa ao valor
+    inicial) e a resposta simulada de cada conjunto de parâmetros FOPDT.
+
+    Returns:
+    - eqm (numpy.ndarray): Vetor com um EQM por conjunto de parâmetros.
+    """
+    y_sim = simular_fopdt(parametros, time, step, modo, ordem_pade)
+    return metricas_resposta(time, y_sim, output - output[0], temporais=False)["eqm"]
+
+
+@etapa("simulacao")
+def simular_sopdt(parametros, time, step=1.0, t_inicial=None):
+    """
+    Simula em forma fechada a resposta ao degrau de um ou mais modelos de segunda ordem com
+    atraso (SOPDT), G(s) = K·e^(−θs) / ((τ1·s + 1)(τ2·s + 1)).
+
+    Args:
+    - parametros (array_like): Um conjunto (K, τ1, τ2, θ) ou uma matriz (n_modelos × 4).
+
+    Returns:
+    - y (numpy.ndarray): Matriz (n_modelos × len(time)) com as respostas simuladas.
+    """
+    parametros = np.atleast_2d(np.asarray(parametros, dtype=np.float64))
+    time = np.asarray(time, dtype=np.float64)
+    if t_inicial is None:
+        t_inicial = time[0]
+
+    k, tau1, tau2, theta = (parametros[:, i : i + 1] for i in range(4))
+    # Polos coincidentes: afasta τ2 levemente para evitar a divisão por zero
+    tau2 = np.where(np.isclose(tau1, tau2), tau2 * (1 + 1e-6) + 1e-12, tau2)
+
+    s = np.maximum((time - t_inicial)[np.newaxis, :] - theta, 0.0)
+    y = tau1 * np.exp(-s / tau1) - tau2 * np.exp(-s / tau2)
+    y /= tau1 - tau2
+    np.subtract(1.0, y, out=y)
+    y *= k * step
+    return y
+
+
+def horizonte_simulacao(tau, theta, n_pontos=1000):
+    """
+    Gera um vetor de tempo uniforme para simulações em malha fechada.
+
+    O horizonte de 25·θ (ou 5·τ, se não houver atraso) cobre o transitório das sintonias
+    clássicas (ZN, CHR), de forma semelhante ao horizonte automático de `step_response`.
+    """
+    t_final = 25 * theta if theta > 0 else 5 * tau
+    return np.linspace(0.0, t_final, n_pontos)
+
+
+@etapa("simulacao_pid")
+def simular_malha_fechada_pid(k, tau, theta, kp, ti, td, time, referencia=1.0):
+    """
+    Simula em tempo discreto a resposta ao degrau da malha fechada PID + FOPDT para vários
+    controladores (e, se desejado, várias plantas) de uma vez.
+
+    A planta K·e^(−θs)/(τs + 1) é discretizada de forma exata para entrada segurada (ZOH) no
+    período de amostragem dt = time[1] − time[0]. O atraso θ = d·dt + f·dt é representado sem
+    aproximação por um buffer circular de amostras do sinal de controle:
+
+        y[n+1] = a·y[n] + b1·u[n−d] + b2·u[n−d−1],
+        a = e^(−dt/τ),  b1 = K·(1 − a^(1−f)),  b2 = K·(a^(1−f) − a).
+
+    O controlador é o PID ideal discretizado, u = Kp·(e + dt/Ti·Σe + Td·Δe/dt). Use
+    `ti=np.inf` para remover a ação integral e `td=0` para remover a derivativa.
+
+    Args:
+    - k, tau, theta (float ou numpy.ndarray): Parâmetros da planta, escalares ou um por linha.
+    - kp, ti, td (float ou numpy.ndarray): Parâmetros do PID, escalares ou um por linha.
+    - time (numpy.ndarray): Instantes de simulação igualmente espaçados.
+    - referencia (float): Amplitude do degrau de referência.
+
+    Returns:
+    - y (numpy.ndarray): Matriz (n_lotes × len(time)) com a saída da planta.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    dt = time[1] - time[0]
+    k, tau, theta, kp, ti, td = (
+        np.ravel(v).astype(np.float64)
+        for v in np.broadcast_arrays(k, tau, theta, kp, ti, td)
+    )
+    n_lotes = k.size
+    if n_lotes == 1:
+        # Para um único controlador o laço com floats do Python é ~20x mais rápido
+        return _malha_fechada_escalar(
+            *(float(v[0]) for v in (k, tau, theta, kp, ti, td)), time, referencia
+        )
+
+    # Discretização exata da planta com atraso fracionário
+    a = np.exp(-dt / tau)
+    atraso = np.maximum(theta, 0.0) / dt
+    d = np.floor(atraso).astype(np.intp)
+    a_f = a ** (1.0 - (atraso - d))
+    b1 = k * (1.0 - a_f)
+    b2 = k * (a_f - a)
+
+    # Ganhos discretos do PID
+    with np.errstate(divide="ignore"):
+        ki = np.where(np.isfinite(ti) & (ti > 0), kp * dt / ti, 0.0)
+    kd = kp * td / dt
+
+    # Buffer circular com u[n−d−1] ... u[n]; posições ainda não escritas valem zero
+    tamanho = int(d.max()) + 2
+    buffer = np.zeros((n_lotes, tamanho))
+    linhas = np.arange(n_lotes)
+
+    y = np.empty((n_lotes, time.size))
+    y_n = np.zeros(n_lotes)
+    integral = np.zeros(n_lotes)
+    e_anterior = np.zeros(n_lotes)
+    e = np.empty(n_lotes)
+    u = np.empty(n_lotes)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        for n in range(time.size):
+            y[:, n] = y_n
+            np.subtract(referencia, y_n, out=e)
+            integral += e
+            np.multiply(kp, e, out=u)
+            u += ki * integral
+            u += kd * (e - e_anterior)
+            e_anterior, e = e, e_anterior
+
+            buffer[:, n % tamanho] = u
+            y_n = (
+                a * y_n
+                + b1 * buffer[linhas, (n - d) % tamanho]
+                + b2 * buffer[linhas, (n - d - 1) % tamanho]
+            )
+
+    return y
+
+
+def _malha_fechada_escalar(k, tau, theta, kp, ti, td, time, referencia):
+    """Mesma recorrência de `simular_malha_fechada_pid` para um único controlador."""
+    dt = float(time[1] - time[0])
+    a = math.exp(-dt / tau)
+    atraso = max(theta, 0.0) / dt
+    d = int(atraso)
+    a_f = a ** (1.0 - (atraso - d))
+    b1 = k * (1.0 - a_f)
+    b2 = k * (a_f - a)
+    ki = kp * dt / ti if math.isfinite(ti) and ti > 0 else 0.0
+    kd = kp * td / dt
+
+    tamanho = d + 2
+    buffer = [0.0] * tamanho
+    y = np.empty((1, time.size))
+    saida = y[0]
+    y_n = integral = e_anterior = 0.0
+
+    for n in range(time.size):
+        saida[n] = y_n
+        e = referencia - y_n
+        integral += e
+        buffer[n % tamanho] = kp * e + ki * integral + kd * (e - e_anterior)
+        e_anterior = e
+        try:
+            y_n = (
+                a * y_n
+                + b1 * buffer[(n - d) % tamanho]
+                + b2 * buffer[(n - d - 1) % tamanho]
+            )
+        except OverflowError:
+            y_n = math.inf
+
+    return y
+
+
+def caminho_dataset():
+    """
+    Retorna o caminho do arquivo .MAT padrão, considerando execução com PyInstaller.
+
+    A variável de ambiente C213_DATASET, se definida, aponta para outro experimento (lida a cada
+    chamada, o que permite aos benchmarks trocar de dataset sem recriar a aplicação).
+    """
+    caminho = os.environ.get("C213_DATASET")
+    if caminho:
+        return caminho
+
+    # Detecta o diretório base, considerando execução com PyInstaller
+    if getattr(sys, "frozen", False):
+        # Executável gerado com PyInstaller
+        base_path = sys._MEIPASS
+        base_path = os.path.join(base_path, "app")
+    else:
+        # Execução normal (modo desenvolvimento)
+        base_path = os.path.dirname(__file__)
+
+    return os.path.join(base_path, "Dataset_Grupo1.mat")
 
 
-def carregar_dataset():
+@etapa("dataset")
+def carregar_dataset(file_path=None, sidecar=True):
     """
     Carrega um arquivo .MAT contendo dados de um experimento e retorna os datasets necessários.
 
-    Esta função tenta carregar um arquivo MAT específico, localizando-o no mesmo diretório que o script.
+    Esta função tenta carregar um arquivo MAT específico, localizando-o no mesmo diretório que o script
+    (ou no caminho `file_path`, se informado).
     Os dados são extraídos a partir de chaves específicas do arquivo e divididos em três conjuntos:
     - Tempo do experimento.
     - Sinal de degrau aplicado.
     - Temperatura medida ao longo do tempo.
 
     A função verifica a existência do arquivo e, se encontrado, carrega os dados necessários em formato adequado.
+    Na primeira leitura o arquivo é convertido para um sidecar de arquivos .npy (ver `app.dataset`); as
+    leituras seguintes devolvem visões memory-mapped somente leitura, sem copiar os dados. Com
+    `sidecar=False`, o arquivo é lido para a memória sem gravar o sidecar (leituras únicas).
 
     Caso o arquivo não seja encontrado, uma exceção `FileNotFoundError` será levantada.
 
@@ -164,38 +457,19 @@ def carregar_dataset():
     Exemplo:
         time, step, temperature = carregar_dataset()
     """
-    # Detecta o diretório base, considerando execução com PyInstaller
-    if getattr(sys, "frozen", False):
-        # Executável gerado com PyInstaller
-        base_path = sys._MEIPASS
-        base_path = os.path.join(base_path, "app")
-    else:
-        # Execução normal (modo desenvolvimento)
-        base_path = os.path.dirname(__file__)
-
-    file_path = os.path.join(base_path, "Dataset_Grupo1.mat")
-
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Arquivo {file_path} não encontrado.")
-
-    data = loadmat(file_path)
-    print("Chaves do arquivo .mat:", data.keys())
+    if file_path is None:
+        file_path = caminho_dataset()
 
-    # Obtem o objeto principal
-    reaction_data = data["reactionExperiment"]
-
-    # A estrutura está encapsulada — precisamos acessar o primeiro item [0][0]
-    reaction_data = reaction_data[0, 0]
-
-    # Separar os campos
-    sample_time = reaction_data["sampleTime"].flatten()
-    data_input = reaction_data["dataInput"].flatten()
-    data_output = reaction_data["dataOutput"].flatten()
-    physical_quantity = reaction_data["physicalQuantity"]
-    units = reaction_data["units"]
+    if sidecar:
+        experimento = abrir_experimento(file_path)
+    else:
+        experimento = ler_experimento(file_path)
 
-    sample_time = sample_time.astype(np.float64)
-    return sample_time, np.mean(data_input), data_output
+    return (
+        experimento.sample_time,
+        np.mean(experimento.data_input),
+        experimento.data_output,
+    )
 
 
 def ziegler_nichols_malha_aberta(k, tau, theta):
@@ -0,0 +1,3 @@
+"""
+Benchmarks de desempenho sobre datasets FOPDT sintéticos (ver `python -m benchmarks --help`).
+"""
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.datasets import PASTA_PADRAO, TAMANHOS_PADRAO
+
+
+def ler_tamanhos(texto):
+    # Aceita notação científica: "1e3,1e5,1e7"
+    return [int(float(parte)) for parte in texto.split(",") if parte.strip()]
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks do Projeto Prático C213 sobre datasets sintéticos",
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    def opcoes_dataset(comando):
+        comando.add_argument(
+            "--tamanhos",
+            type=ler_tamanhos,
+            default=list(TAMANHOS_PADRAO),
+            help="amostras por dataset, separadas por vírgula (ex.: 1e3,1e5,1e7)",
+        )
+        comando.add_argument(
+            "--ruido", type=float, default=0.5, help="desvio padrão do ruído (°C)"
+        )
+        comando.add_argument("--semente", type=int, default=0)
+        comando.add_argument(
+            "--pasta",
+            default=PASTA_PADRAO,
+            help="pasta dos datasets gerados, do cache e das imagens exportadas",
+        )
+
+    gerar = comandos.add_parser("gerar", help="só gera os datasets sintéticos")
+    opcoes_dataset(gerar)
+
+    executar = comandos.add_parser("executar", help="mede etapas e rotas")
+    opcoes_dataset(executar)
+    executar.add_argument("--repeticoes", type=int, default=None)
+    executar.add_argument(
+        "--saida", default="benchmark.json", help="arquivo JSON dos resultados"
+    )
+    executar.add_argument(
+        "--sem-rotas", action="store_true", help="mede só as etapas, sem o Flask"
+    )
+    executar.add_argument(
+        "--comparar-com", default=None, help="baseline para comparar ao final"
+    )
+    opcoes_comparacao(executar)
+
+    comparar = comandos.add_parser(
+        "comparar", help="compara resultados com um baseline"
+    )
+    comparar.add_argument("base")
+    comparar.add_argument("atual")
+    opcoes_comparacao(comparar)
+
+    return parser.parse_args()
+
+
+def opcoes_comparacao(comando):
+    comando.add_argument(
+        "--limite",
+        type=float,
+        default=None,
+        help="aumento relativo tolerado antes de acusar regressão (padrão: 0.2)",
+    )
+    comando.add_argument(
+        "--piso-ms",
+        type=float,
+        default=None,
+        help="aumento absoluto mínimo para acusar regressão (padrão: 1 ms)",
+    )
+    comando.add_argument(
+        "--estatistica", choices=("mediana_s", "minimo_s"), default="mediana_s"
+    )
+
+
+def relatar_comparacao(base, atual, argumentos):
+    """Imprime a comparação e retorna o código de saída (1 se houver regressão)."""
+    from benchmarks.suite import LIMITE_REGRESSAO, PISO_REGRESSAO, comparar
+
+    limite = LIMITE_REGRESSAO if argumentos.limite is None else argumentos.limite
+    piso = PISO_REGRESSAO if argumentos.piso_ms is None else argumentos.piso_ms / 1000
+    linhas, ausentes = comparar(base, atual, limite, piso, argumentos.estatistica)
+
+    if base.get("ambiente") != atual.get("ambiente"):
+        print(
+            "Aviso: os resultados foram medidos em ambientes diferentes.",
+            file=sys.stderr,
+        )
+
+    largura = max((len(linha["caso"]) for linha in linhas), default=4)
+    print(f"{'caso':<{largura}}  {'base (ms)':>12}  {'atual (ms)':>12}  {'razão':>7}")
+    for linha in linhas:
+        print(
+            f"{linha['caso']:<{largura}}  {linha['base_s'] * 1000:12.3f}  "
+            f"{linha['atual_s'] * 1000:12.3f}  {linha['razao']:7.2f}"
+            + ("  REGRESSÃO" if linha["regressao"] else "")
+        )
+    for caso in ausentes:
+        print(f"Aviso: {caso} não foi medido nos resultados atuais.", file=sys.stderr)
+
+    regressoes = [linha["caso"] for linha in linhas if linha["regressao"]]
+    if regressoes:
+        print(
+            f"{len(regressoes)} regressão(ões) acima de {limite:.0%} e {piso * 1000:g} ms.",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main():
+    argumentos = ler_argumentos()
+
+    if argumentos.comando == "comparar":
+        with open(argumentos.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(argumentos.atual, encoding="utf-8") as f:
+            atual = json.load(f)
+        return relatar_comparacao(base, atual, argumentos)
+
+    if argumentos.comando == "gerar":
+        from benchmarks.datasets import garantir_dataset
+
+        for n_amostras in argumentos.tamanhos:
+            print(
+                garantir_dataset(
+                    argumentos.pasta, n_amostras, argumentos.ruido, argumentos.semente
+                )
+            )
+        return 0
+
+    # Cache isolado: o config é lido ao importar a aplicação, que só acontece dentro da suíte
+    os.environ.setdefault("C213_CACHE", os.path.join(argumentos.pasta, "cache"))
+    from benchmarks.suite import REPETICOES, executar
+
+    resultados = executar(
+        argumentos.tamanhos,
+        argumentos.ruido,
+        argumentos.repeticoes or REPETICOES,
+        argumentos.pasta,
+        argumentos.semente,
+        rotas=not argumentos.sem_rotas,
+    )
+    with open(argumentos.saida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {argumentos.saida}")
+
+    if argumentos.comparar_com:
+        with open(argumentos.comparar_com, encoding="utf-8") as f:
+            base = json.load(f)
+        return relatar_comparacao(base, resultados, argumentos)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import os
+import tempfile
+
+import numpy as np
+
+# Parâmetros padrão dos experimentos sintéticos, próximos aos do Dataset_Grupo1.mat
+# (K ≈ 4,66, τ ≈ 3100 s, θ ≈ 1120 s, degrau ≈ 90,8 e temperatura inicial ≈ 9,3 °C)
+PARAMETROS_PADRAO = (4.66, 3100.0, 1120.0)
+DEGRAU_PADRAO = 90.77
+SAIDA_INICIAL = 9.28
+
+# Duração do ensaio (s), a mesma do dataset original (6263 amostras a cada 5 s). O período de
+# amostragem diminui com o número de amostras, então a dinâmica é a mesma em todos os tamanhos.
+DURACAO = 31310.0
+
+# Tamanhos (amostras) usados por padrão. O de 10⁷ (~240 MB por arquivo, alguns minutos por
+# rodada) é pedido explicitamente com --tamanhos
+TAMANHOS_PADRAO = (10**3, 10**4, 10**5, 10**6)
+
+
+# Datasets gerados, cache isolado e imagens exportadas durante os benchmarks
+PASTA_PADRAO = os.path.join(tempfile.gettempdir(), "c213_benchmarks")
+
+
+def nome_dataset(n_amostras, ruido, semente=0):
+    return f"fopdt_{n_amostras}_ruido{ruido:g}_s{semente}.mat"
+
+
+def gerar_experimento(
+    n_amostras,
+    ruido=0.5,
+    parametros=PARAMETROS_PADRAO,
+    degrau=DEGRAU_PADRAO,
+    saida_inicial=SAIDA_INICIAL,
+    duracao=DURACAO,
+    semente=0,
+):
+    """
+    Gera um ensaio ao degrau de um processo FOPDT com ruído gaussiano.
+
+    A saída é a resposta exata (atraso sem aproximação) somada a um ruído de desvio padrão
+    `ruido` (°C); a entrada recebe um ruído de 1% desse desvio, como o sinal quase constante do
+    dataset original.
+
+    Returns:
+    - tuple: (sample_time, data_input, data_output), vetores float64 de `n_amostras` elementos.
+    """
+    k, tau, theta = parametros
+    gerador = np.random.default_rng(semente)
+    sample_time = np.linspace(0.0, duracao, n_amostras)
+
+    data_output = sample_time - theta
+    np.maximum(data_output, 0.0, out=data_output)
+    data_output /= -tau
+    np.exp(data_output, out=data_output)
+    np.subtract(1.0, data_output, out=data_output)
+    data_output *= k * degrau
+    data_output += saida_inicial
+    data_output += gerador.normal(0.0, ruido, n_amostras) if ruido else 0.0
+
+    data_input = np.full(n_amostras, float(degrau))
+    if ruido:
+        data_input += gerador.normal(0.0, ruido * 0.01, n_amostras)
+
+    return sample_time, data_input, data_output
+
+
+def salvar_experimento(file_path, sample_time, data_input, data_output):
+    """
+    Grava o ensaio com a estrutura `reactionExperiment` do Dataset_Grupo1.mat (vetores linha,
+    mais os cell arrays `physicalQuantity` e `units`), em MATLAB v5.
+    """
+    from scipy.io import savemat
+
+    experimento = {
+        "sampleTime": np.asarray(sample_time)[np.newaxis, :],
+        "dataInput": np.asarray(data_input)[np.newaxis, :],
+        "dataOutput": np.asarray(data_output)[np.newaxis, :],
+        "physicalQuantity": np.array([["Time", "Temperature"]], dtype=object),
+        "units": np.array([["Seconds", "°C"]], dtype=object),
+    }
+    savemat(
+        file_path,
+        {"reactionExperiment": experimento},
+        appendmat=False,
+        do_compression=False,
+    )
+
+
+def garantir_dataset(pasta, n_amostras, ruido=0.5, semente=0):
+    """
+    Retorna o caminho do dataset sintético em `pasta`, gerando-o só se ainda não existir (a
+    geração é determinística para o mesmo tamanho, ruído e semente).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    file_path = os.path.join(pasta, nome_dataset(n_amostras, ruido, semente))
+    if not os.path.exists(file_path):
+        # Grava em um temporário para não deixar um .mat incompleto se a geração for interrompida
+        temporario = file_path + ".tmp"
+        salvar_experimento(
+            temporario, *gerar_experimento(n_amostras, ruido, semente=semente)
+        )
+        os.replace(temporario, file_path)
+    return file_path
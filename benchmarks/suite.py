@@ -0,0 +1,314 @@
+import datetime
+import os
+import platform
+import shutil
+import statistics
+import time
+
+from benchmarks.datasets import PARAMETROS_PADRAO, PASTA_PADRAO, garantir_dataset
+
+VERSAO_RESULTADOS = 1
+
+REPETICOES = 5
+
+# Tempo (s) a partir do qual um caso para de repetir (os de 10⁷ amostras rodam poucas vezes)
+TEMPO_MAXIMO_CASO = 10.0
+
+# Uma regressão é um aumento acima de LIMITE_REGRESSAO (fração) E de PISO_REGRESSAO (s): o piso
+# evita falsos alarmes em casos de microssegundos, onde o ruído relativo é grande
+LIMITE_REGRESSAO = 0.2
+PISO_REGRESSAO = 0.001
+
+
+def medir(funcao, repeticoes=REPETICOES, preparar=None, tempo_maximo=TEMPO_MAXIMO_CASO):
+    """
+    Executa `funcao` até `repeticoes` vezes (ou até passar de `tempo_maximo` segundos) e retorna
+    a mediana, o mínimo e o máximo. `preparar`, se informado, roda antes de cada repetição, fora
+    da medição (por exemplo, para limpar um cache e medir o caminho frio).
+    """
+    tempos = []
+    inicio_caso = time.perf_counter()
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if time.perf_counter() - inicio_caso > tempo_maximo:
+            break
+
+    return {
+        "mediana_s": statistics.median(tempos),
+        "minimo_s": min(tempos),
+        "maximo_s": max(tempos),
+        "repeticoes": len(tempos),
+    }
+
+
+def medir_etapas(file_path, repeticoes=REPETICOES):
+    """
+    Mede cada etapa do processamento da tela inicial sobre o dataset `file_path`: carga (fria,
+    com conversão para o sidecar, e quente), pré-processamento, identificação, simulação em malha aberta e fechada,
+    renderização do PNG e armazenamento no armazém de imagens (hash do conteúdo).
+    """
+    from app.armazem_imagens import ArmazemImagens
+    from app.cache import montar_chave
+    from app.dataset import PASTA_SIDECAR
+    from app.identification import torneio_identificacao
+    from app.main_process import malha_fechada_unitaria
+    from app.preprocessamento import preprocessar
+    from app.rendering import renderizar_comparacao
+    from app.utils import (
+        carregar_dataset,
+        identification_process,
+        parametros_fopdt,
+        simular_fopdt,
+    )
+
+    sidecar = os.path.join(PASTA_SIDECAR, montar_chave(os.path.abspath(file_path)))
+    resultados = {
+        "carga_fria": medir(
+            lambda: carregar_dataset(file_path),
+            repeticoes,
+            preparar=lambda: shutil.rmtree(sidecar, ignore_errors=True),
+        ),
+        "carga": medir(lambda: carregar_dataset(file_path), repeticoes),
+    }
+
+    time_dataset, step, output = carregar_dataset(file_path)
+    resultados["preprocessamento"] = medir(
+        lambda: preprocessar(time_dataset, output), repeticoes
+    )
+    # As etapas seguintes rodam sobre a série reduzida, como na aplicação
+    time_dataset, output, _ = preprocessar(time_dataset, output)
+    resultados["identificacao"] = medir(
+        lambda: identification_process(step, time_dataset, output, "Smith"), repeticoes
+    )
+    resultados["torneio"] = medir(
+        lambda: torneio_identificacao(step, time_dataset, output), repeticoes
+    )
+
+    parametros = identification_process(step, time_dataset, output, "Smith")[:3]
+    resultados["simulacao"] = medir(
+        lambda: simular_fopdt(parametros, time_dataset, step), repeticoes
+    )
+    resultados["simulacao_malha_fechada"] = medir(
+        lambda: malha_fechada_unitaria(parametros, time_dataset, step), repeticoes
+    )
+
+    y_referencia = simular_fopdt(
+        parametros_fopdt(step, time_dataset, output), time_dataset, step
+    )[0]
+    y_modelo = simular_fopdt(parametros, time_dataset, step)[0]
+
+    def renderizar():
+        return renderizar_comparacao(
+            time_dataset, y_referencia, y_modelo, "Malha Aberta - Smith", "Smith"
+        )
+
+    resultados["renderizacao"] = medir(renderizar, repeticoes)
+    png = renderizar()
+    armazens = []
+    resultados["armazenamento"] = medir(
+        lambda: armazens[-1].guardar(png),
+        repeticoes,
+        preparar=lambda: armazens.append(ArmazemImagens(pasta=None, variantes=False)),
+    )
+    return resultados
+
+
+def medir_rotas(cliente, file_path, repeticoes=REPETICOES):
+    """
+    Mede as rotas que dependem do dataset (/ e /identificacao) pelo cliente de testes do Flask,
+    com os caches de resultados vazios ("_fria") e preenchidos. O sidecar do dataset já existe,
+    então o caminho frio mede o cálculo, e não a conversão do arquivo.
+    """
+    from app.main_process import cache_home, cache_identificacao
+
+    os.environ["C213_DATASET"] = file_path
+
+    def limpar_caches():
+        cache_home.limpar()
+        cache_identificacao.limpar()
+
+    resultados = {}
+    for nome, rota in (("home", "/"), ("identificacao", "/identificacao")):
+        resultados[f"{nome}_fria"] = _medir_rota(
+            lambda: cliente.get(rota), repeticoes, limpar_caches
+        )
+        resultados[nome] = _medir_rota(lambda: cliente.get(rota), repeticoes)
+    return resultados
+
+
+def medir_gerar_pid(cliente, repeticoes=REPETICOES):
+    """Mede o POST /gerar_pid (Ziegler-Nichols sobre o modelo padrão), frio e com cache."""
+    from app.main_process import cache_pid
+
+    k, tau, theta = PARAMETROS_PADRAO
+    corpo = {"k": k, "tau": tau, "theta": theta, "method": "zn", "last_time": 0}
+
+    def requisitar():
+        return cliente.post("/gerar_pid", json=corpo)
+
+    return {
+        "gerar_pid_fria": _medir_rota(requisitar, repeticoes, cache_pid.limpar),
+        "gerar_pid": _medir_rota(requisitar, repeticoes),
+    }
+
+
+def _medir_rota(requisitar, repeticoes, preparar=None):
+    respostas = []
+
+    def executar():
+        resposta = requisitar()
+        if resposta.status_code != 200:
+            raise RuntimeError(
+                f"{resposta.request.path} respondeu {resposta.status_code}"
+            )
+        respostas.append(resposta)
+
+    resultado = medir(executar, repeticoes, preparar)
+    # Detalhamento por etapa da última repetição, do cabeçalho Server-Timing (informativo)
+    resultado["server_timing_ms"] = _ler_server_timing(
+        respostas[-1].headers.get("Server-Timing", "")
+    )
+    return resultado
+
+
+def _ler_server_timing(cabecalho):
+    etapas = {}
+    for parte in cabecalho.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.partition("=")
+            if chave.strip() == "dur":
+                etapas[nome] = float(valor)
+    return etapas
+
+
+def ambiente():
+    """Versões e máquina em que os resultados foram medidos."""
+    import matplotlib
+    import numpy
+    import scipy
+
+    return {
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "matplotlib": matplotlib.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+def executar(
+    tamanhos,
+    ruido=0.5,
+    repeticoes=REPETICOES,
+    pasta=PASTA_PADRAO,
+    semente=0,
+    rotas=True,
+    log=print,
+):
+    """
+    Gera (ou reaproveita) os datasets sintéticos em `pasta` e mede etapas e rotas para cada
+    tamanho.
+
+    Returns:
+    - dict: Documento de resultados, serializável em JSON: "versao", "data", "ambiente",
+      "parametros" e "resultados" ({"<grupo>/<caso>/<amostras>": medição}).
+    """
+    from app import create_app
+    from app.exporter import exportador
+
+    # As imagens que a tela inicial exporta vão para a pasta dos benchmarks, e não para a do
+    # usuário
+    exportador.pasta = os.path.join(pasta, "imagens")
+    os.makedirs(exportador.pasta, exist_ok=True)
+
+    cliente = create_app(testing=True).test_client() if rotas else None
+    resultados = {}
+
+    for n_amostras in tamanhos:
+        inicio = time.perf_counter()
+        file_path = garantir_dataset(pasta, n_amostras, ruido, semente)
+        log(
+            f"{n_amostras} amostras: dataset pronto em {time.perf_counter() - inicio:.1f} s"
+        )
+
+        for caso, medicao in medir_etapas(file_path, repeticoes).items():
+            resultados[f"etapas/{caso}/{n_amostras}"] = medicao
+            log(f"  etapas/{caso}: {_formatar(medicao)}")
+        if rotas:
+            for caso, medicao in medir_rotas(cliente, file_path, repeticoes).items():
+                resultados[f"rotas/{caso}/{n_amostras}"] = medicao
+                log(f"  rotas/{caso}: {_formatar(medicao)}")
+
+    if rotas:
+        for caso, medicao in medir_gerar_pid(cliente, repeticoes).items():
+            resultados[f"rotas/{caso}"] = medicao
+            log(f"rotas/{caso}: {_formatar(medicao)}")
+
+    exportador.aguardar()
+    return {
+        "versao": VERSAO_RESULTADOS,
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "ambiente": ambiente(),
+        "parametros": {
+            "tamanhos": list(tamanhos),
+            "ruido": ruido,
+            "repeticoes": repeticoes,
+            "semente": semente,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(
+    base,
+    atual,
+    limite=LIMITE_REGRESSAO,
+    piso=PISO_REGRESSAO,
+    estatistica="mediana_s",
+):
+    """
+    Compara dois documentos de resultados caso a caso.
+
+    Returns:
+    - tuple: (linhas, ausentes). `linhas` tem um dict por caso presente nos dois documentos, com
+      "caso", "base_s", "atual_s", "razao" e "regressao"; `ausentes` lista os casos da base que
+      não foram medidos em `atual`.
+
+    Exceções:
+    - Levanta `ValueError` se as versões dos documentos forem diferentes.
+    """
+    if base.get("versao") != atual.get("versao"):
+        raise ValueError(
+            f"Versões de resultados incompatíveis: {base.get('versao')} e "
+            f"{atual.get('versao')}."
+        )
+
+    linhas = []
+    for caso in sorted(base["resultados"].keys() & atual["resultados"].keys()):
+        antes = base["resultados"][caso][estatistica]
+        depois = atual["resultados"][caso][estatistica]
+        linhas.append(
+            {
+                "caso": caso,
+                "base_s": antes,
+                "atual_s": depois,
+                "razao": depois / antes if antes > 0 else float("inf"),
+                "regressao": depois > antes * (1 + limite) and depois - antes > piso,
+            }
+        )
+    ausentes = sorted(base["resultados"].keys() - atual["resultados"].keys())
+    return linhas, ausentes
+
+
+def _formatar(medicao):
+    return (
+        f"mediana {medicao['mediana_s'] * 1000:.2f} ms, "
+        f"mínimo {medicao['minimo_s'] * 1000:.2f} ms ({medicao['repeticoes']}x)"
+    )
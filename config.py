@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from socket import socket
 
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
@@ -46,10 +47,30 @@ def get_music_folder():
     return fallback_path
 
 
-DESKTOP_FOLDER = get_music_folder()
+# C213_CACHE permite isolar o cache (por exemplo, nos benchmarks)
+CACHE_FOLDER = os.environ.get("C213_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".c213_cache"
+)
+# Histórico das identificações e sintonias (SQLite); C213_HISTORICO aponta para outro arquivo
+HISTORICO_DB = os.environ.get("C213_HISTORICO") or os.path.join(
+    CACHE_FOLDER, "historico.sqlite3"
+)
+# Pré-processamento entre a carga do dataset e a identificação (app/preprocessamento.py):
+# filtro ("mediana", "savgol" ou "nenhum") de JANELA_FILTRO amostras, ordem do Savitzky–Golay
+# e amostras da série reduzida pela decimação (0 desliga a decimação)
+FILTRO_PREPROCESSAMENTO = os.environ.get("C213_FILTRO", "mediana")
+JANELA_FILTRO = 5
+ORDEM_SAVGOL = 2
+AMOSTRAS_ALVO = int(os.environ.get("C213_AMOSTRAS_ALVO", "5000"))
+# Frações iniciais e finais da série usadas para estimar a linha de base (e o ruído) e o regime
+FRACAO_JANELA_BASE = 0.01
+FRACAO_JANELA_REGIME = 0.05
+# Tempo morto: a saída deixa a linha de base ao passar dela por mais de NIVEIS_RUIDO desvios do
+# ruído durante PERSISTENCIA_TEMPO_MORTO amostras seguidas
+NIVEIS_RUIDO = 4.0
+PERSISTENCIA_TEMPO_MORTO = 5
 STATIC_FOLDER = resource_path("static")
 TEMPLATE_FOLDER = resource_path("templates")
-print(DESKTOP_FOLDER)
 
 
 def find_available_port():
@@ -59,7 +80,46 @@ def find_available_port():
 
 
 HOST = "127.0.0.1"
-PORT = find_available_port()
+
+# Requisições mais lentas que isto (ms) têm as pilhas amostradas gravadas em
+# CACHE_FOLDER/perfis, no formato "folded" dos flame graphs; 0 desliga o perfilador
+PERFIL_LENTO_MS = float(os.environ.get("C213_PERFIL_LENTO_MS", "0"))
+
+# Endereço fixo do modo --headless (servidor compartilhado)
+HOST_SERVIDOR = os.environ.get("C213_HOST", "0.0.0.0")
+PORTA_SERVIDOR = int(os.environ.get("C213_PORTA", "8000"))
+
+# Fontes de amostras da identificação online e plantas remotas do tempo real que os clientes
+# podem abrir: "esquema://host[:porta]" (sem porta, qualquer porta do host) ou
+# "serial:///dev/ttyUSB0". C213_FONTES substitui a lista (separada por vírgulas)
+FONTES_PERMITIDAS = tuple(
+    fonte.strip()
+    for fonte in os.environ.get(
+        "C213_FONTES",
+        "udp://127.0.0.1,tcp://127.0.0.1,udp://localhost,tcp://localhost",
+    ).split(",")
+    if fonte.strip()
+)
+
+# Executor em tempo real (app/tempo_real.py): as esperas dormem até esta margem (ms) antes de
+# cada período e completam o restante em espera ativa, mais precisa abaixo de ~2 ms de período
+# mas ocupando um núcleo durante a margem; 0 (padrão) só dorme
+ESPERA_ATIVA_MS = float(os.environ.get("C213_ESPERA_ATIVA_MS", "0"))
+
+
+# DESKTOP_FOLDER (procura e cria pastas) e PORT (abre um socket) só são calculados no primeiro
+# acesso, e não ao importar este módulo, que fica no caminho da abertura da janela (PEP 562)
+_PREGUICOSOS = {"DESKTOP_FOLDER": get_music_folder, "PORT": find_available_port}
+_preguicosos_lock = threading.Lock()
+
+
+def __getattr__(nome):
+    if nome not in _PREGUICOSOS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    with _preguicosos_lock:
+        if nome not in globals():
+            globals()[nome] = _PREGUICOSOS[nome]()
+    return globals()[nome]
 
 
 class Config:
@@ -1,25 +1,135 @@
+import argparse
+import json
+import multiprocessing
 import os
+import socket
+import sys
+import threading
+import time
 
-import webview
+# Referência do relatório de inicialização (GET /inicializacao). Só módulos leves são
+# importados no topo: Flask, NumPy e a aplicação vêm depois que a janela já está aberta.
+INICIO = time.perf_counter()
 
-from app import create_app, socketio
-from config import HOST, PORT
+from config import HOST, HOST_SERVIDOR, PORTA_SERVIDOR  # noqa: E402
 
-app = create_app()
+# Exibida de imediato, enquanto a aplicação é importada e o servidor sobe
+TELA_CARREGANDO = """
+<html><body style="display:flex;align-items:center;justify-content:center;height:100vh;
+font-family:sans-serif;background:#1e1e2f;color:#fff">Carregando...</body></html>
+"""
 
 
 def run_socketio(app, host, port):
+    from app import socketio
+
     socketio.run(app=app, host=host, port=port, allow_unsafe_werkzeug=True)
 
 
-if __name__ == "__main__":
+def esperar_porta(host, port, timeout=30):
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def iniciar_servidor(window, etapas, relatorio):
+    """
+    Roda na thread que o pywebview inicia depois de abrir a janela: importa a aplicação, sobe o
+    servidor, aquece os caches em segundo plano e troca a tela de carregamento pela aplicação.
+    """
+    from app import create_app, socketio
+    from app.inicializacao import inicializacao
+    from config import PORT
+
+    etapas["importacao"] = time.perf_counter()
+    inicializacao.iniciar(INICIO, etapas)
+
+    app = create_app()
+    inicializacao.marcar("aplicacao")
+    inicializacao.aquecer_em_segundo_plano(socketio)
+
+    def abrir_aplicacao():
+        if esperar_porta(HOST, PORT):
+            inicializacao.marcar("servidor")
+            window.load_url(f"http://{HOST}:{PORT}")
+        if relatorio:
+            inicializacao.pronto.wait()
+            print(json.dumps(inicializacao.relatorio(), indent=2), file=sys.stderr)
+
+    threading.Thread(target=abrir_aplicacao, daemon=True).start()
+    run_socketio(app, HOST, PORT)
+
+
+def executar_janela(relatorio=False):
+    import webview
+
+    etapas = {"webview": time.perf_counter()}
     window = webview.create_window(
         "Projeto Prático C213 - Sistemas Embarcados",
-        f"http://{HOST}:{PORT}",
+        html=TELA_CARREGANDO,
         min_size=(1000, 700),
         maximized=False,
         text_select=True,
     )
-    webview.start(run_socketio, (app, HOST, PORT), debug=False)
+    window.events.shown += lambda: etapas.setdefault("janela", time.perf_counter())
+    webview.start(iniciar_servidor, (window, etapas, relatorio), debug=False)
 
     os._exit(0)
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Projeto Prático C213")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="serve a aplicação sem janela, como serviço compartilhado",
+    )
+    parser.add_argument("--host", default=HOST_SERVIDOR)
+    parser.add_argument("--porta", type=int, default=PORTA_SERVIDOR)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="processos (padrão: um por núcleo)"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="threads por processo"
+    )
+    parser.add_argument(
+        "--fila",
+        default=None,
+        help="fila de mensagens do Socket.IO entre workers (ex.: redis://localhost:6379)",
+    )
+    parser.add_argument(
+        "--sem-aquecimento",
+        action="store_true",
+        help="não pré-calcula os caches da identificação ao subir cada worker",
+    )
+    parser.add_argument(
+        "--relatorio-inicializacao",
+        action="store_true",
+        help="imprime os tempos de cada etapa da inicialização ao fim do aquecimento",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # Necessário para o pool de processos da busca de sintonias no executável PyInstaller
+    multiprocessing.freeze_support()
+
+    argumentos = ler_argumentos()
+    if argumentos.headless:
+        from app.servidor import THREADS_PADRAO, servir
+
+        servir(
+            argumentos.host,
+            argumentos.porta,
+            argumentos.workers,
+            argumentos.threads or THREADS_PADRAO,
+            argumentos.fila,
+            not argumentos.sem_aquecimento,
+        )
+    else:
+        executar_janela(argumentos.relatorio_inicializacao)
@@ -20,7 +20,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # A aplicação só renderiza com o backend Agg; o Tk apenas aumenta o executável a extrair
+    excludes=['tkinter'],
     noarchive=False,
 )
 pyz = PYZ(a.pure)
@@ -35,7 +36,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # Bibliotecas comprimidas com UPX são descomprimidas a cada abertura, atrasando a inicialização
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
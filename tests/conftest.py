@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# O config é lido ao importar a aplicação: os testes usam um cache próprio, descartável
+os.environ.setdefault("C213_CACHE", tempfile.mkdtemp(prefix="c213_testes_"))
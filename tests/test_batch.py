@@ -0,0 +1,84 @@
+import csv
+import os
+
+import numpy as np
+
+from app import dataset
+from app.batch import main
+from app.cache import montar_chave
+
+METODOS = "Smith,Sundaresan"
+
+
+def gravar_ensaio(caminho, k=4.66, tau=3100.0, theta=1120.0):
+    t = np.linspace(0.0, 31310.0, 2000)
+    y = 9.28 + k * 90.77 * (1 - np.exp(-np.maximum(t - theta, 0.0) / tau))
+    np.savetxt(
+        caminho,
+        np.column_stack((t, np.full(t.size, 90.77), y)),
+        delimiter=",",
+        header="tempo,entrada,saida",
+        comments="",
+    )
+
+
+def ler_resumo(caminho):
+    with open(caminho, newline="", encoding="utf-8") as f:
+        return {
+            os.path.basename(linha["arquivo"]): linha for linha in csv.DictReader(f)
+        }
+
+
+def test_lote_de_ponta_a_ponta_com_retomada(tmp_path, capsys):
+    pasta = tmp_path / "ensaios"
+    pasta.mkdir()
+    gravar_ensaio(pasta / "a.csv")
+    gravar_ensaio(pasta / "b.csv", k=2.0, tau=1500.0, theta=300.0)
+    (pasta / "defeituoso.csv").write_text("tempo,entrada,saida\n1,2\n")
+    saida = str(tmp_path / "resumo.csv")
+    argumentos = [str(pasta), "--saida", saida, "--workers", "1", "--metodos", METODOS]
+
+    # Termina com 1 enquanto houver experimentos com erro
+    assert main(argumentos) == 1
+    resumo = ler_resumo(saida)
+    assert sorted(resumo) == ["a.csv", "b.csv", "defeituoso.csv"]
+    assert resumo["defeituoso.csv"]["erro"]
+    for nome, (k, tau, theta) in {
+        "a.csv": (4.66, 3100.0, 1120.0),
+        "b.csv": (2.0, 1500.0, 300.0),
+    }.items():
+        linha = resumo[nome]
+        assert not linha["erro"]
+        assert (
+            float(linha["k"]) == np.float64(k).round(2)
+            or abs(float(linha["k"]) / k - 1) < 0.05
+        )
+        assert abs(float(linha["tau"]) / tau - 1) < 0.1
+        assert abs(float(linha["theta"]) - theta) < 0.1 * tau
+        assert float(linha["kp_zn"]) > 0 and float(linha["kp_chr"]) > 0
+
+    # O lote lê os arquivos direto, sem deixar sidecars no cache
+    for nome in resumo:
+        chave = montar_chave(os.path.abspath(pasta / nome))
+        assert not os.path.exists(os.path.join(dataset.PASTA_SIDECAR, chave))
+
+    # Retomada: só o experimento com erro é refeito
+    capsys.readouterr()
+    assert main(argumentos) == 1
+    assert "2 experimento(s) já processado(s)" in capsys.readouterr().out
+    assert ler_resumo(saida).keys() == resumo.keys()
+
+    # Um arquivo alterado depois de processado é refeito
+    gravar_ensaio(pasta / "a.csv", k=3.0)
+    os.utime(pasta / "a.csv", ns=(0, 0))
+    os.remove(pasta / "defeituoso.csv")
+    assert main(argumentos) == 0
+    novo = ler_resumo(saida)
+    assert abs(float(novo["a.csv"]["k"]) / 3.0 - 1) < 0.05
+    assert novo["b.csv"] == resumo["b.csv"]
+    assert "defeituoso.csv" not in novo
+
+    # --recomecar ignora o resumo existente
+    capsys.readouterr()
+    assert main([*argumentos, "--recomecar"]) == 0
+    assert "já processado" not in capsys.readouterr().out
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from app.cache import CacheResultados, montar_chave
+
+
+def calcular_em_paralelo(cache, chave, calcular, n_threads=8):
+    barreira = threading.Barrier(n_threads)
+    resultados = [None] * n_threads
+
+    def consultar(i):
+        barreira.wait()
+        try:
+            resultados[i] = cache.obter_ou_calcular(chave, calcular)
+        except Exception as erro:
+            resultados[i] = erro
+
+    threads = [threading.Thread(target=consultar, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+
+def test_calculo_unico_para_consultas_simultaneas():
+    cache = CacheResultados("teste", pasta=None)
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.05)
+        return object()
+
+    resultados = calcular_em_paralelo(cache, "chave", calcular)
+
+    assert len(chamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    estatisticas = cache.estatisticas()
+    assert estatisticas["faltas"] == 1
+    assert estatisticas["acertos"] + estatisticas["coalescidos"] == 7
+
+
+def test_erro_chega_a_todos_e_nao_fica_no_cache():
+    cache = CacheResultados("teste", pasta=None)
+
+    def falhar():
+        time.sleep(0.05)
+        raise RuntimeError("falhou")
+
+    resultados = calcular_em_paralelo(cache, "chave", falhar)
+
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    assert cache.obter_ou_calcular("chave", lambda: 42) == 42
+
+
+def test_lru_descarta_a_entrada_usada_ha_mais_tempo():
+    cache = CacheResultados("teste", capacidade=2, pasta=None)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obter("a")
+    cache.guardar("c", 3)
+
+    assert cache.obter("a") == 1
+    assert cache.obter("b") is None
+    assert cache.obter("c") == 3
+
+
+def test_disco_sobrevive_a_nova_instancia(tmp_path):
+    chave = montar_chave("experimento", 1.5, (2, 3))
+    CacheResultados("teste", pasta=str(tmp_path)).guardar(chave, {"k": 4.66})
+
+    novo = CacheResultados("teste", pasta=str(tmp_path))
+
+    assert novo.obter_ou_calcular(chave, pytest.fail) == {"k": 4.66}
+    assert novo.estatisticas()["acertos"] == 1
+
+
+def test_disco_limitado(tmp_path):
+    cache = CacheResultados("teste", capacidade_disco=3, pasta=str(tmp_path))
+    for i in range(6):
+        cache.guardar(montar_chave(i), i)
+        time.sleep(0.01)
+
+    assert len(list((tmp_path / "teste").glob("*.pkl"))) == 3
+    assert cache._ler_disco(montar_chave(5)) == 5
+    assert cache._ler_disco(montar_chave(0)) is None
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from app import dataset
+from app.cache import montar_chave
+from app.dataset import abrir_experimento
+
+
+def gravar_csv(caminho, n=2000, ganho=1.0):
+    t = np.arange(n, dtype=np.float64)
+    y = ganho * (1 - np.exp(-t / 300.0))
+    np.savetxt(
+        caminho,
+        np.column_stack((t, np.ones(n), y)),
+        delimiter=",",
+        header="tempo,entrada,saida",
+        comments="",
+    )
+    return y
+
+
+@pytest.fixture
+def sidecars(tmp_path, monkeypatch):
+    pasta = str(tmp_path / "sidecars")
+    monkeypatch.setattr(dataset, "PASTA_SIDECAR", pasta)
+    return pasta
+
+
+def pasta_sidecar(caminho):
+    return os.path.join(dataset.PASTA_SIDECAR, montar_chave(os.path.abspath(caminho)))
+
+
+def somar_saida(caminho):
+    return float(np.sum(abrir_experimento(caminho).data_output))
+
+
+def test_processos_concorrentes_convertem_o_mesmo_arquivo(tmp_path):
+    caminho = str(tmp_path / "ensaio.csv")
+    y = gravar_csv(caminho, n=50_000)
+
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(4) as pool:
+        somas = pool.map(somar_saida, [caminho] * 8)
+
+    assert somas == pytest.approx([y.sum()] * 8)
+    restos = [n for n in os.listdir(dataset.PASTA_SIDECAR) if n.endswith(".tmp")]
+    assert restos == []
+
+
+def test_conversao_perdida_usa_o_sidecar_publicado(tmp_path, sidecars):
+    caminho = str(tmp_path / "ensaio.csv")
+    gravar_csv(caminho)
+    publicado = abrir_experimento(caminho).metadados
+
+    # Simula um processo que validou antes de o outro publicar e converteu também
+    metadados = dataset._converter(caminho, pasta_sidecar(caminho))
+
+    assert metadados["hash"] == publicado["hash"]
+    assert abrir_experimento(caminho).data_output.size == 2000
+
+
+def test_sidecar_desatualizado_e_substituido(tmp_path, sidecars):
+    caminho = str(tmp_path / "ensaio.csv")
+    gravar_csv(caminho, ganho=1.0)
+    abrir_experimento(caminho)
+
+    y = gravar_csv(caminho, n=1000, ganho=2.0)
+    os.utime(caminho, ns=(0, 0))
+
+    np.testing.assert_allclose(abrir_experimento(caminho).data_output, y)
+
+
+def test_poda_remove_os_sidecars_menos_usados(tmp_path, sidecars):
+    caminhos = [str(tmp_path / f"ensaio{i}.csv") for i in range(3)]
+    for i, caminho in enumerate(caminhos):
+        gravar_csv(caminho)
+        abrir_experimento(caminho)
+        os.utime(os.path.join(pasta_sidecar(caminho), "meta.json"), (i, i))
+
+    # Cabe só um sidecar além do que está sendo aberto
+    tamanho = dataset._tamanho_pasta(pasta_sidecar(caminhos[0]))
+    dataset._podar_sidecars(manter=pasta_sidecar(caminhos[0]), capacidade=2 * tamanho)
+
+    assert os.path.isdir(pasta_sidecar(caminhos[0]))
+    assert not os.path.isdir(pasta_sidecar(caminhos[1]))
+    assert os.path.isdir(pasta_sidecar(caminhos[2]))
+
+
+def test_poda_remove_temporarios_abandonados(sidecars):
+    abandonado = os.path.join(sidecars, "chave.abc.tmp")
+    recente = os.path.join(sidecars, "chave.def.tmp")
+    os.makedirs(abandonado)
+    os.makedirs(recente)
+    os.utime(abandonado, (0, 0))
+
+    dataset._podar_sidecars()
+
+    assert not os.path.exists(abandonado)
+    assert os.path.exists(recente)
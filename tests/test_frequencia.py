@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from app.frequencia import diagrama_bode, margens_estabilidade
+from app.utils import simular_malha_fechada_pid
+
+PLANTA = (4.66, 3100.0, 1120.0)
+
+
+def margens_varredura(k, tau, theta, kp, ti, td):
+    """Margens por força bruta: L(jω) complexo numa grade muito densa, sem refino."""
+    omega = np.logspace(-8, 1, 4_000_001)
+    integral = 1.0 / (1j * omega * ti) if 0 < ti < np.inf else 0.0
+    malha = (
+        kp
+        * (1.0 + integral + 1j * omega * td)
+        * k
+        * np.exp(-1j * omega * theta)
+        / (1j * omega * tau + 1.0)
+    )
+    modulo = np.abs(malha)
+
+    # −180°: a parte imaginária troca de sinal com a parte real negativa
+    cruza_fase = (np.signbit(malha.imag[:-1]) != np.signbit(malha.imag[1:])) & (
+        malha.real[:-1] < 0
+    )
+    margem_ganho = 1.0 / modulo[:-1][cruza_fase].max() if cruza_fase.any() else np.inf
+
+    cruza_ganho = np.signbit(modulo[:-1] - 1.0) != np.signbit(modulo[1:] - 1.0)
+    fases = np.rad2deg(np.angle(malha[:-1][cruza_ganho])) % 360.0 - 180.0
+    margem_fase = fases.min() if cruza_ganho.any() else np.inf
+    return margem_ganho, margem_fase
+
+
+@pytest.mark.parametrize(
+    "kp, ti, td",
+    [
+        (0.3, np.inf, 0.0),  # P
+        (0.3, np.inf, 200.0),  # PD
+        (0.3, 0.0, 200.0),  # PD com Ti = 0
+        (0.3, 3000.0, 0.0),  # PI
+        (0.3, 3000.0, 200.0),  # PID
+    ],
+)
+def test_margens_iguais_a_varredura(kp, ti, td):
+    margens = margens_estabilidade(*PLANTA, kp, ti, td)
+    margem_ganho, margem_fase = margens_varredura(*PLANTA, kp, ti, td)
+
+    assert margens["margem_ganho"][0] == pytest.approx(margem_ganho, rel=1e-4)
+    assert margens["margem_fase"][0] == pytest.approx(margem_fase, abs=1e-2)
+
+
+def test_ti_zero_equivale_a_sem_integral():
+    with np.errstate(all="raise"):
+        sem_integral = margens_estabilidade(*PLANTA, 0.3, 0.0, 200.0)
+        _, modulo_db, fase = diagrama_bode(*PLANTA, 0.3, 0.0, 200.0)
+
+    esperado = margens_estabilidade(*PLANTA, 0.3, np.inf, 200.0)
+    for nome, valor in esperado.items():
+        np.testing.assert_array_equal(sem_integral[nome], valor)
+    assert np.isfinite(modulo_db).all() and np.isfinite(fase).all()
+
+
+@pytest.mark.parametrize(
+    "kp, ti, td, estavel",
+    [
+        (0.3, 3000.0, 200.0, True),
+        (0.3, np.inf, 0.0, True),
+        (1000.0, 3000.0, 200.0, False),  # |L| > 1 em −180°
+        (0.3, 3000.0, 3000.0, False),  # |L(∞)| = K·Kp·Td/τ > 1
+        (-0.1, np.inf, 0.0, True),  # realimentação positiva com K·Kp > −1
+        (-0.1, 3000.0, 0.0, False),  # integrador com o sinal trocado
+        (-0.5, np.inf, 0.0, False),  # K·Kp < −1
+    ],
+)
+def test_estabilidade_da_malha_fechada(kp, ti, td, estavel):
+    margens = margens_estabilidade(*PLANTA, kp, ti, td)
+
+    assert margens["estavel"][0] == estavel
+    if estavel:
+        assert 1.0 <= margens["ms"][0] < np.inf
+    else:
+        assert margens["ms"][0] == np.inf
+
+
+def test_estabilidade_confere_com_a_simulacao():
+    t = np.linspace(0.0, 150_000.0, 15_001)
+    kp = np.array([0.4, 0.8, 1.5, 3.0])
+    margens = margens_estabilidade(*PLANTA, kp, 3000.0, 200.0)
+
+    for i, estavel in enumerate(margens["estavel"]):
+        y = simular_malha_fechada_pid(*PLANTA, kp[i], 3000.0, 200.0, t)[0]
+        assert (abs(y[-1000:] - 1.0).max() < 1e-2) == estavel
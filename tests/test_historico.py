@@ -0,0 +1,110 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app import historico as modulo
+from app.historico import ESQUEMA, HistoricoExecucoes, ler_cursor
+
+# Instantes fora da ordem dos ids, como com relógios de processos diferentes
+INSTANTES = [100.0, 50.0, 100.0, 75.0, 200.0, 50.0, 150.0, 100.0, 10.0, 300.0]
+
+
+@pytest.fixture
+def historico(tmp_path, monkeypatch):
+    relogio = iter(INSTANTES)
+    monkeypatch.setattr(modulo.time, "time", lambda: next(relogio))
+    banco = HistoricoExecucoes(str(tmp_path / "historico.sqlite3"), intervalo=0.0)
+    for i in range(len(INSTANTES)):
+        banco.registrar(
+            "sintonia",
+            "zn" if i % 2 else "chr",
+            {"kp": float(i)},
+            {"itae": 1.0},
+            dataset="a.mat" if i % 3 else "b.mat",
+        )
+    banco.aguardar()
+    monkeypatch.undo()
+    return banco
+
+
+def paginar(historico, limite, **filtros):
+    paginas, antes = [], None
+    while True:
+        execucoes, antes = historico.listar(antes=antes, limite=limite, **filtros)
+        paginas.append(execucoes)
+        if antes is None:
+            return paginas
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3, 10, 50])
+def test_paginas_seguem_instante_e_id(historico, limite):
+    execucoes = list(itertools.chain(*paginar(historico, limite)))
+
+    chaves = [(e["instante"], e["id"]) for e in execucoes]
+    assert chaves == sorted(
+        ((instante, i + 1) for i, instante in enumerate(INSTANTES)), reverse=True
+    )
+
+
+def test_filtros_e_intervalo(historico):
+    execucoes = list(
+        itertools.chain(
+            *paginar(historico, 2, dataset="a.mat", metodo="zn", desde=50.0, ate=200.0)
+        )
+    )
+
+    esperados = [
+        (instante, i + 1)
+        for i, instante in enumerate(INSTANTES)
+        if i % 3 and i % 2 and 50.0 <= instante < 200.0
+    ]
+    assert [(e["instante"], e["id"]) for e in execucoes] == sorted(
+        esperados, reverse=True
+    )
+
+
+def test_cursor_invalido(historico):
+    with pytest.raises(ValueError):
+        historico.listar(antes="12")
+    assert ler_cursor("1.5:7") == (1.5, 7)
+
+
+@pytest.mark.parametrize(
+    "filtros",
+    [
+        {},
+        {"dataset": "a.mat"},
+        {"metodo": "zn"},
+        {"tipo": "sintonia"},
+        {"dataset": "a.mat", "metodo": "zn"},
+    ],
+)
+def test_paginas_sem_ordenar(historico, filtros):
+    condicoes = [f"{campo} = ?" for campo in filtros]
+    condicoes.append("(instante, id) < (?, ?)")
+    plano = historico._leitura().execute(
+        f"EXPLAIN QUERY PLAN SELECT {modulo._COLUNAS} FROM execucoes WHERE "
+        + " AND ".join(condicoes)
+        + " ORDER BY instante DESC, id DESC LIMIT 10",
+        (*filtros.values(), 100.0, 5),
+    )
+    detalhes = " ".join(linha[-1] for linha in plano)
+
+    assert "TEMP B-TREE" not in detalhes
+    assert "INDEX ix_execucoes_" in detalhes
+
+
+def test_indice_redundante_removido():
+    assert "ix_execucoes_dataset ON" not in ESQUEMA
+
+
+@pytest.mark.filterwarnings("error")
+def test_compressao_de_valores_fora_do_float32():
+    valores = [1.0, 1e300, -1e300, np.inf, -np.inf, np.nan]
+
+    restaurados = modulo._descomprimir(modulo._comprimir(valores))
+
+    np.testing.assert_array_equal(
+        restaurados, [1.0, np.inf, -np.inf, np.inf, -np.inf, np.nan]
+    )
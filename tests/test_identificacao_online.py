@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app import create_app, socketio
+from app.identificacao_online import (
+    NAMESPACE,
+    BufferCircular,
+    IdentificadorOnline,
+    abrir_fonte_stream,
+    fonte_permitida,
+)
+
+PERMITIDAS = ("udp://127.0.0.1", "tcp://bancada.local:9000", "serial:///dev/ttyUSB0")
+
+
+@pytest.mark.parametrize(
+    "url, esperado",
+    [
+        ("udp://127.0.0.1:9750", True),
+        ("udp://127.0.0.1", True),
+        ("tcp://127.0.0.1:9750", False),
+        ("udp://0.0.0.0:9750", False),
+        ("tcp://bancada.local:9000", True),
+        ("tcp://bancada.local:22", False),
+        ("serial:///dev/ttyUSB0?baud=9600", True),
+        ("serial:///etc/passwd", False),
+        ("file:///etc/passwd", False),
+        ("/etc/passwd", False),
+    ],
+)
+def test_fonte_permitida(url, esperado):
+    assert fonte_permitida(url, PERMITIDAS) is esperado
+
+
+def test_fonte_fora_da_lista_e_recusada():
+    with pytest.raises(PermissionError):
+        abrir_fonte_stream("tcp://10.0.0.1:22", BufferCircular(16), PERMITIDAS)
+
+
+def test_serial_recusa_arquivo_comum(tmp_path):
+    arquivo = tmp_path / "amostras.bin"
+    arquivo.write_bytes(b"\0" * 48)
+    url = f"serial://{arquivo}"
+
+    with pytest.raises(ValueError):
+        abrir_fonte_stream(url, BufferCircular(16), (url,))
+
+
+def test_iniciar_com_fonte_proibida_emite_erro():
+    cliente = socketio.test_client(create_app(testing=True), namespace=NAMESPACE)
+    cliente.emit("iniciar", {"fonte": "serial:///etc/passwd"}, namespace=NAMESPACE)
+
+    eventos = cliente.get_received(NAMESPACE)
+    assert [e["name"] for e in eventos] == ["erro"]
+    assert "não permitida" in eventos[0]["args"][0]["erro"]
+    cliente.disconnect(namespace=NAMESPACE)
+
+
+def identificar_fluxo(capacidade, n_blocos=10, tamanho_bloco=2000):
+    """Grava um ensaio ao degrau em blocos e coleta a estimativa após cada bloco."""
+    rng = np.random.default_rng(0)
+    n = n_blocos * tamanho_bloco
+    t = 5.0 * np.arange(n)
+    u = np.where(t >= 100.0, 90.77, 0.0)
+    atraso = np.maximum(t - 100.0 - 1132.5, 0.0)
+    y = 9.3 + 4.66 * 90.77 * (1 - np.exp(-atraso / 3097.5)) + rng.normal(0, 0.5, n)
+    amostras = np.column_stack((t, u, y))
+
+    buffer = BufferCircular(capacidade)
+    identificador = IdentificadorOnline(
+        SimpleNamespace(buffer=buffer, iniciar=lambda: None)
+    )
+    identificador.iniciar()
+    estimativas = []
+    for inicio in range(0, n, tamanho_bloco):
+        buffer.escrever(amostras[inicio : inicio + tamanho_bloco])
+        estimativas.append(identificador.atualizar())
+    return estimativas
+
+
+def test_estimativas_continuam_depois_que_o_buffer_da_a_volta():
+    pequeno = identificar_fluxo(capacidade=4096)
+    grande = identificar_fluxo(capacidade=1 << 16)
+
+    for estimativa, referencia in zip(pequeno[1:], grande[1:]):
+        assert "tau" in estimativa
+        for nome in ("k", "tau", "theta"):
+            assert estimativa[nome] == referencia[nome]
+    assert pequeno[-1]["k"] == pytest.approx(4.66, rel=0.01)
+    assert pequeno[-1]["tau"] == pytest.approx(3097.5, rel=0.05)
+    assert pequeno[-1]["theta"] == pytest.approx(1132.5, abs=50)
+
+
+@pytest.mark.parametrize("taxa", [0, -1, "nan", "abc"])
+def test_iniciar_com_taxa_invalida_emite_erro(taxa):
+    app = create_app(testing=True)
+    cliente = socketio.test_client(app, namespace=NAMESPACE)
+    outro = socketio.test_client(app, namespace=NAMESPACE)
+    cliente.emit("iniciar", {"taxa_publicacao": taxa}, namespace=NAMESPACE)
+
+    eventos = cliente.get_received(NAMESPACE)
+    assert [e["name"] for e in eventos] == ["erro"]
+    assert outro.get_received(NAMESPACE) == []
+    cliente.disconnect(namespace=NAMESPACE)
+    outro.disconnect(namespace=NAMESPACE)
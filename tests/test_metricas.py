@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from app import metricas
+from app.metricas import metricas_resposta
+from app.utils import simular_malha_fechada_pid
+
+
+def metricas_referencia(t, y, referencia=1.0, faixas=(0.02, 0.05)):
+    """As definições de `metricas_resposta`, uma resposta por vez, com laços explícitos."""
+    larguras = [t[i + 1] - t[i] for i in range(len(t) - 1)]
+    larguras.append(larguras[-1])
+    erro = [referencia - v for v in y]
+    resultado = {
+        "erro_regime": erro[-1],
+        "iae": sum(abs(e) * w for e, w in zip(erro, larguras)),
+        "itae": sum(ti * abs(e) * w for ti, e, w in zip(t, erro, larguras)),
+        "ise": sum(e * e * w for e, w in zip(erro, larguras)),
+        "eqm": (sum(e * e for e in erro) / len(erro)) ** 0.5,
+    }
+
+    z = [(v - y[0]) / (y[-1] - y[0]) for v in y]
+    pico = max(range(len(z)), key=lambda i: z[i])
+    resultado["overshoot"] = max(z[pico] - 1.0, 0.0) * 100
+    resultado["t_pico"] = t[pico]
+    inicio = next(t[i] for i, v in enumerate(z) if v >= 0.1)
+    fim = next(t[i] for i, v in enumerate(z) if v >= 0.9)
+    resultado["t_subida"] = fim - inicio
+    for faixa in faixas:
+        fora = [i for i, v in enumerate(z) if abs(v - 1.0) > faixa]
+        resultado[f"t_acomodacao_{faixa * 100:g}"] = (
+            t[min(fora[-1] + 1, len(t) - 1)] if fora else t[0]
+        )
+    return resultado
+
+
+def respostas(n_respostas, n_amostras=400, semente=0):
+    rng = np.random.default_rng(semente)
+    # Instantes não uniformes
+    t = np.cumsum(rng.uniform(50.0, 90.0, n_amostras)) - 50.0
+    t_uniforme = np.linspace(0.0, t[-1], n_amostras)
+    kp = rng.uniform(0.05, 0.35, n_respostas)
+    ti = rng.uniform(1500.0, 6000.0, n_respostas)
+    td = rng.uniform(0.0, 400.0, n_respostas)
+    y = simular_malha_fechada_pid(4.66, 3100.0, 1120.0, kp, ti, td, t_uniforme)
+    return t, y
+
+
+def test_igual_a_referencia():
+    t, y = respostas(12)
+
+    calculadas = metricas_resposta(t, y)
+
+    for linha in range(y.shape[0]):
+        esperadas = metricas_referencia(t, y[linha])
+        for nome, valor in esperadas.items():
+            assert calculadas[nome][linha] == pytest.approx(valor, rel=1e-9), nome
+
+
+def test_blocos_nao_mudam_o_resultado(monkeypatch):
+    t, y = respostas(60)
+    inteiro = metricas_resposta(t, y)
+
+    # Blocos de poucas linhas: o último bloco fica incompleto
+    monkeypatch.setattr(metricas, "ELEMENTOS_BLOCO", 7 * y.shape[1])
+    em_blocos = metricas_resposta(t, y, buffers=metricas.BuffersMetricas())
+
+    for nome, valores in inteiro.items():
+        # O produto matriz-vetor pode somar em outra ordem conforme o tamanho do bloco
+        np.testing.assert_allclose(em_blocos[nome], valores, rtol=1e-12, err_msg=nome)
+
+
+def test_resposta_nao_finita_recebe_inf():
+    t, y = respostas(3)
+    y = y.copy()
+    y[1, 200] = np.nan
+
+    calculadas = metricas_resposta(t, y)
+
+    for nome, valores in calculadas.items():
+        assert valores[1] == np.inf, nome
+        assert np.isfinite(valores[[0, 2]]).all(), nome
+
+
+def test_so_metricas_de_erro_com_referencia_por_amostra():
+    t, y = respostas(2)
+    medido = y[0] + 0.01
+
+    calculadas = metricas_resposta(t, y, referencia=medido, temporais=False)
+
+    assert set(calculadas) == {"erro_regime", "iae", "itae", "ise", "eqm"}
+    assert calculadas["eqm"][0] == pytest.approx(0.01)
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.main_process import (
+    calcular_home,
+    dataset_preprocessado,
+    ranking_identificacao,
+)
+from app.preprocessamento import (
+    decimar,
+    filtro_anti_aliasing,
+    filtro_mediana,
+    filtro_savgol,
+    indice_tempo_morto,
+    preprocessar,
+)
+from app.utils import caminho_dataset, carregar_dataset, simular_fopdt
+
+
+def resposta_fopdt(n, ruido=0.0, theta=1120.0, semente=0):
+    t = np.linspace(0.0, 31310.0, n)
+    y = 9.28 + 4.66 * 90.77 * (1 - np.exp(-np.maximum(t - theta, 0.0) / 3100.0))
+    if ruido:
+        y += np.random.default_rng(semente).normal(0.0, ruido, n)
+    return t, y
+
+
+def somente_leitura(valores):
+    valores = np.array(valores)
+    valores.flags.writeable = False
+    return valores
+
+
+@pytest.mark.parametrize("janela", [3, 5, 9, 21])
+def test_mediana_igual_a_np_median(janela):
+    y = np.random.default_rng(1).normal(size=1000)
+    referencia = np.median(
+        sliding_window_view(np.pad(y, janela // 2, mode="edge"), janela), axis=1
+    )
+    np.testing.assert_array_equal(filtro_mediana(y, janela), referencia)
+
+
+def test_savgol_igual_ao_scipy():
+    signal = pytest.importorskip("scipy.signal")
+    y = np.random.default_rng(2).normal(size=1000)
+    np.testing.assert_allclose(
+        filtro_savgol(y, 7, 3),
+        signal.savgol_filter(y, 7, 3, mode="nearest"),
+        atol=1e-12,
+    )
+
+
+def test_decimacao_igual_a_convolucao_direta():
+    y = np.random.default_rng(3).normal(size=1003)
+    t = np.arange(y.size, dtype=float)
+    fator = 10
+    h = filtro_anti_aliasing(fator)
+    meia = len(h) // 2
+    estendido = np.concatenate((np.full(meia, y[0]), y, np.full(meia, y[-1])))
+    referencia = np.convolve(estendido, h, mode="valid")[::fator]
+
+    t_reduzido, reduzido = decimar(t, y, fator)
+    np.testing.assert_array_equal(t_reduzido, t[::fator])
+    np.testing.assert_allclose(reduzido, referencia, atol=1e-12)
+
+
+def test_decimacao_atenua_acima_do_novo_nyquist():
+    t = np.arange(200_000, dtype=float)
+    fator = 100
+    _, alto = decimar(t, np.sin(2 * np.pi * 0.8 / fator * t), fator)
+    _, baixo = decimar(t, np.sin(2 * np.pi * 0.1 / fator * t), fator)
+    assert np.abs(alto[50:-50]).max() < 1e-2
+    # Valor eficaz: com 10 amostras por período, o pico da senoide pode não ser amostrado
+    assert np.sqrt(np.mean(baixo[50:-50] ** 2)) > 0.99 / np.sqrt(2)
+
+
+def test_tempo_morto_ignora_pico_isolado():
+    t, y = resposta_fopdt(10_000, ruido=0.5)
+    y[50] += 30.0
+    indice = indice_tempo_morto(y)
+    assert abs(t[indice] - 1120.0) < 20.0
+
+
+def test_tempo_morto_sem_ruido_e_a_primeira_mudanca():
+    t, y = resposta_fopdt(1000)
+    primeira = np.flatnonzero(y != y[0])[0] - 1
+    assert indice_tempo_morto(y) == primeira
+
+
+def test_tempo_morto_sem_mudanca():
+    with pytest.raises(IndexError):
+        indice_tempo_morto(np.ones(100))
+
+
+@pytest.mark.parametrize("filtro", ["nenhum", "mediana", "savgol"])
+def test_preprocessar_sem_decimacao_com_entrada_somente_leitura(filtro):
+    t, y = resposta_fopdt(2000, ruido=0.2)
+    t, y = somente_leitura(t), somente_leitura(y)
+    original = y.copy()
+
+    t_reduzido, reduzido, relatorio = preprocessar(
+        t, y, filtro=filtro, amostras_alvo=5000
+    )
+
+    assert relatorio["fator_decimacao"] == 1
+    assert len(reduzido) == len(y)
+    assert reduzido[0] == relatorio["linha_base"]
+    assert reduzido[-1] == relatorio["regime"]
+    np.testing.assert_array_equal(y, original)
+
+
+def test_preprocessar_decima_e_recupera_o_tempo_morto():
+    t, y = resposta_fopdt(100_000, ruido=0.5)
+    t_reduzido, reduzido, relatorio = preprocessar(t, y, amostras_alvo=5000)
+
+    assert relatorio["fator_decimacao"] == 20
+    assert 5000 <= len(reduzido) < 10_000
+    assert abs(relatorio["theta"] - 1120.0) < 30.0
+    assert set(relatorio["etapas_ms"]) == {
+        "filtro",
+        "patamares",
+        "decimacao",
+        "tempo_morto",
+    }
+
+
+def eqm_contra_a_medicao(parametros):
+    t, step, y = carregar_dataset(caminho_dataset())
+    linha_base = dataset_preprocessado()[3]["linha_base"]
+    y_sim = simular_fopdt(parametros, t, step)[0]
+    return np.sqrt(np.mean((y - linha_base - y_sim) ** 2))
+
+
+def test_eqm_da_identificacao_e_o_da_serie_medida():
+    metodos = ("Smith", "Sundaresan")
+    resultado = calcular_home(caminho_dataset(), metodos, None)
+    ranking = ranking_identificacao(metodos)
+
+    for metodo in metodos:
+        k, tau, theta, eqm = resultado["parametros"][metodo]
+        assert eqm == pytest.approx(eqm_contra_a_medicao((k, tau, theta)), rel=1e-9)
+    for linha in ranking:
+        assert linha["eqm"] == pytest.approx(
+            eqm_contra_a_medicao(linha["parametros"]), rel=1e-9
+        )
+    assert [linha["eqm"] for linha in ranking] == sorted(
+        linha["eqm"] for linha in ranking
+    )
@@ -0,0 +1,134 @@
+import math
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope="module")
+def cliente():
+    return create_app(testing=True).test_client()
+
+
+def test_dados_home_rejeita_codificacao_desconhecida(cliente):
+    resposta = cliente.get("/dados_home?codificacao=xml")
+
+    assert resposta.status_code == 400
+    assert resposta.get_json()["codificacoes"] == ["json", "f32"]
+
+
+def test_gerar_pid_rejeita_codificacao_desconhecida(cliente):
+    resposta = cliente.post(
+        "/gerar_pid",
+        json={
+            "k": 4.66,
+            "tau": 3100,
+            "theta": 1120,
+            "method": "zn",
+            "last_time": 31310,
+            "format": "series",
+            "codificacao": "f64",
+        },
+    )
+
+    assert resposta.status_code == 400
+    assert resposta.get_json()["codificacoes"] == ["json", "f32"]
+
+
+@pytest.mark.parametrize("codificacao", ["json", "f32"])
+def test_gerar_pid_aceita_codificacoes_conhecidas(cliente, codificacao):
+    resposta = cliente.post(
+        "/gerar_pid",
+        json={
+            "k": 4.66,
+            "tau": 3100,
+            "theta": 1120,
+            "method": "zn",
+            "last_time": 31310,
+            "format": "series",
+            "pontos": 50,
+            "codificacao": codificacao,
+        },
+    )
+
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    assert dados["serie"]["codificacao"] == codificacao
+    assert 0 < dados["serie"]["pontos"] <= 50
+    assert dados["serie"]["y"]
+    assert math.isfinite(dados["kp"]) and dados["kp"] > 0
+    assert dados["ti"] > 0 and dados["td"] > 0
+
+
+PLANTA = {"k": 4.66, "tau": 3100, "theta": 1120}
+
+
+@pytest.mark.parametrize("rota", ["/gerar_pid", "/bode", "/robustez"])
+@pytest.mark.parametrize(
+    "sintonia",
+    [
+        {"method": "ZN"},
+        {"method": "imc"},
+        {},
+        {"method": "manual", "kp": 0.3, "td": 200},
+        {"method": "manual", "kp": "abc", "ti": 1000, "td": 200},
+    ],
+)
+def test_sintonia_invalida_responde_400(cliente, rota, sintonia):
+    resposta = cliente.post(rota, json={**PLANTA, **sintonia})
+
+    assert resposta.status_code == 400
+    assert "erro" in resposta.get_json()
+
+
+@pytest.mark.parametrize("pontos", ["muitos", None, [10]])
+def test_gerar_pid_rejeita_pontos_invalidos(cliente, pontos):
+    resposta = cliente.post(
+        "/gerar_pid",
+        json={**PLANTA, "method": "zn", "format": "series", "pontos": pontos},
+    )
+
+    assert resposta.status_code == 400
+
+
+def test_gerar_pid_limita_pontos(cliente):
+    resposta = cliente.post(
+        "/gerar_pid",
+        json={**PLANTA, "method": "chr", "format": "series", "pontos": 10**9},
+    )
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()["serie"]["pontos"] <= 5000
+
+
+def test_bode_pd_com_ti_zero(cliente):
+    resposta = cliente.post(
+        "/bode",
+        json={
+            "k": 4.66,
+            "tau": 3100,
+            "theta": 1120,
+            "method": "manual",
+            "kp": 0.3,
+            "ti": 0,
+            "td": 200,
+            "pontos": 100,
+        },
+    )
+
+    assert resposta.status_code == 200
+    margens = resposta.get_json()["margens"]
+    assert margens["margem_ganho"] == pytest.approx(3.95, rel=1e-3)
+    assert margens["margem_fase"] == pytest.approx(118.87, abs=1e-2)
+    assert margens["estavel"] is True
+
+
+def test_margens_de_malha_instavel(cliente):
+    resposta = cliente.post(
+        "/bode",
+        json={**PLANTA, "method": "manual", "kp": 1000, "ti": 3000, "td": 200},
+    )
+
+    margens = resposta.get_json()["margens"]
+    assert margens["estavel"] is False
+    assert margens["ms"] is None
@@ -0,0 +1,82 @@
+import base64
+
+import numpy as np
+import pytest
+
+from app.series import codificar, lttb, serie_compacta
+
+
+def lttb_referencia(x, y, n_pontos):
+    """LTTB direto da descrição, um ponto por vez, com os mesmos limites de balde."""
+    n = len(x)
+    limites = [int(v) for v in np.linspace(1, n - 1, n_pontos - 1)] + [n]
+    escolhidos = [0]
+    for i in range(n_pontos - 2):
+        seguinte = range(limites[i + 1], limites[i + 2])
+        x_medio = sum(x[j] for j in seguinte) / len(seguinte)
+        y_medio = sum(y[j] for j in seguinte) / len(seguinte)
+        a = escolhidos[-1]
+
+        def area(j):
+            return abs(
+                (x[a] - x_medio) * (y[j] - y[a]) - (x[a] - x[j]) * (y_medio - y[a])
+            )
+
+        escolhidos.append(max(range(limites[i], limites[i + 1]), key=area))
+    return escolhidos + [n - 1]
+
+
+def serie(n, semente=0):
+    rng = np.random.default_rng(semente)
+    x = np.sort(rng.uniform(0.0, 100.0, n))
+    y = np.sin(x / 3) + 0.3 * rng.standard_normal(n)
+    return x, y
+
+
+@pytest.mark.parametrize(
+    "n, n_pontos",
+    [
+        (1000, 100),  # baldes pequenos: laço escalar
+        (20000, 100),  # baldes grandes: laço vetorizado
+        (5000, 3),
+    ],
+)
+def test_lttb_igual_a_referencia(n, n_pontos):
+    x, y = serie(n)
+
+    indices = lttb(x, y, n_pontos)
+
+    assert indices.tolist() == lttb_referencia(x, y, n_pontos)
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_preserva_pico_isolado():
+    x = np.arange(10000, dtype=np.float64)
+    y = np.zeros(10000)
+    y[4321] = 50.0
+
+    assert 4321 in lttb(x, y, 50)
+
+
+def test_lttb_com_orcamento_maior_que_a_serie():
+    x, y = serie(50)
+
+    np.testing.assert_array_equal(lttb(x, y, 100), np.arange(50))
+
+
+def test_codificacao_f32_ida_e_volta():
+    valores = np.linspace(-1.0, 1.0, 17)
+    dados = base64.b64decode(codificar(valores, "f32"))
+
+    np.testing.assert_array_equal(
+        np.frombuffer(dados, dtype="<f4"), valores.astype(np.float32)
+    )
+
+
+def test_serie_compacta_limita_os_pontos():
+    x, y = serie(20000)
+
+    resultado = serie_compacta(x, y, 10**6)
+
+    assert resultado["pontos"] == len(resultado["t"]) == 5000
+    assert resultado["t"][0] == pytest.approx(x[0], rel=1e-5)
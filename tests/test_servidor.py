@@ -0,0 +1,44 @@
+import sys
+
+import pytest
+
+from app import socketio, tuning
+from app.servidor import servir
+from config import HOST_SERVIDOR
+
+
+@pytest.fixture
+def sem_gunicorn(monkeypatch):
+    # None em sys.modules faz o import levantar ImportError
+    monkeypatch.setitem(sys.modules, "gunicorn", None)
+    monkeypatch.setitem(sys.modules, "gunicorn.app.base", None)
+    chamadas = []
+    monkeypatch.setattr(socketio, "run", lambda *a, **kw: chamadas.append(kw))
+    return chamadas
+
+
+def test_sem_gunicorn_o_padrao_e_um_worker(sem_gunicorn):
+    servir(porta=8123, aquecer_caches=False)
+
+    assert sem_gunicorn == [
+        {"host": HOST_SERVIDOR, "port": 8123, "allow_unsafe_werkzeug": True}
+    ]
+
+
+def test_sem_gunicorn_recusa_varios_workers_pedidos(sem_gunicorn):
+    with pytest.raises(ImportError):
+        servir(workers=4, aquecer_caches=False)
+    assert sem_gunicorn == []
+
+
+@pytest.mark.parametrize("workers, processos", [(2, 4), (8, 1), (None, 1)])
+def test_nucleos_divididos_entre_os_workers(monkeypatch, workers, processos):
+    from gunicorn.app.base import BaseApplication
+
+    monkeypatch.setattr(BaseApplication, "run", lambda self: None)
+    monkeypatch.setattr(tuning.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(tuning, "_processos", None)
+
+    servir(workers=workers, aquecer_caches=False)
+
+    assert tuning._n_processos() == processos
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils import horizonte_simulacao, simular_malha_fechada_pid
+
+PLANTA = (4.66, 3100.0, 1120.0)
+
+
+def malha_fechada_referencia(
+    k, tau, theta, kp, ti, td, t, referencia=1.0, subpassos=400
+):
+    """
+    PID discreto + FOPDT contínua, sem a discretização exata: a planta é integrada em
+    `subpassos` subintervalos por período, com a entrada atrasada lida do histórico completo
+    do sinal de controle (segurado entre amostras).
+    """
+    dt = t[1] - t[0]
+    h = dt / subpassos
+    decaimento = math.exp(-h / tau)
+    u = []
+    y = np.empty(t.size)
+    y_n = integral = e_anterior = 0.0
+    for n in range(t.size):
+        y[n] = y_n
+        e = referencia - y_n
+        integral += e
+        acao_integral = kp * dt / ti * integral if 0 < ti < math.inf else 0.0
+        u.append(kp * e + acao_integral + kp * td / dt * (e - e_anterior))
+        e_anterior = e
+        for j in range(subpassos):
+            # Entrada no meio do subintervalo, atrasada de θ
+            instante = n * dt + (j + 0.5) * h - theta
+            amostra = math.floor(instante / dt)
+            entrada = u[amostra] if amostra >= 0 else 0.0
+            y_n = decaimento * y_n + k * (1 - decaimento) * entrada
+    return y
+
+
+@pytest.mark.parametrize(
+    "kp, ti, td",
+    [
+        (0.2, math.inf, 0.0),  # P
+        (0.2, 3000.0, 0.0),  # PI
+        (0.25, 2500.0, 300.0),  # PID
+        (0.2, 0.0, 300.0),  # PD com Ti = 0
+    ],
+)
+def test_igual_a_integracao_fina(kp, ti, td):
+    # 300 pontos: o atraso não é múltiplo do período (θ/dt ≈ 11,96)
+    t = horizonte_simulacao(PLANTA[1], PLANTA[2], 300)
+    y = simular_malha_fechada_pid(*PLANTA, kp, ti, td, t)[0]
+    esperado = malha_fechada_referencia(*PLANTA, kp, ti, td, t)
+
+    np.testing.assert_allclose(y, esperado, atol=1e-4 * np.abs(esperado).max())
+
+
+def test_lote_igual_a_cada_sintonia_separada():
+    t = horizonte_simulacao(PLANTA[1], PLANTA[2], 400)
+    kp = np.array([0.1, 0.2, 0.3])
+    ti = np.array([np.inf, 3000.0, 2000.0])
+    td = np.array([0.0, 0.0, 400.0])
+    theta = np.array([500.0, 1120.0, 1300.0])
+
+    lote = simular_malha_fechada_pid(PLANTA[0], PLANTA[1], theta, kp, ti, td, t)
+
+    for i in range(3):
+        separada = simular_malha_fechada_pid(
+            PLANTA[0], PLANTA[1], theta[i], kp[i], ti[i], td[i], t
+        )
+        np.testing.assert_allclose(lote[i], separada[0], rtol=1e-12, atol=1e-12)
+
+
+def test_regime_do_proporcional():
+    # Só com ação proporcional, o regime é K·Kp/(1 + K·Kp) da referência
+    t = horizonte_simulacao(PLANTA[1], PLANTA[2], 1000)
+    y = simular_malha_fechada_pid(*PLANTA, 0.1, np.inf, 0.0, t, referencia=2.0)[0]
+    ganho = PLANTA[0] * 0.1
+
+    assert y[-1] == pytest.approx(2.0 * ganho / (1 + ganho), rel=1e-4)
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.tempo_real import NamespaceTempoReal, configurar_execucao, esperar_ate
+
+PEDIDO = {"k": 4.66, "tau": 3100, "theta": 1120, "kp": 0.3, "ti": 3000, "td": 0}
+
+
+def test_espera_sem_margem_nao_ocupa_o_processador():
+    async def esperar():
+        inicio = time.perf_counter()
+        for n in range(1, 51):
+            await esperar_ate(inicio + n * 0.002, margem=0.0)
+        return time.perf_counter() - inicio
+
+    cpu = time.process_time()
+    decorrido = asyncio.run(esperar())
+
+    assert decorrido >= 0.1
+    assert time.process_time() - cpu < 0.5 * decorrido
+
+
+@pytest.mark.parametrize("margem", [0.0, 0.0015])
+def test_espera_nao_acorda_antes_do_instante(margem):
+    async def atraso():
+        instante = time.perf_counter() + 0.01
+        await esperar_ate(instante, margem)
+        return time.perf_counter() - instante
+
+    assert asyncio.run(atraso()) > -1e-3
+
+
+def test_executor_cumpre_os_periodos():
+    executor, abrir = configurar_execucao({**PEDIDO, "tick_ms": 5, "duracao_s": 0.25})
+    resumo = asyncio.run(executor.executar())
+
+    assert abrir is None
+    assert resumo["periodos"] == 50
+    assert resumo["executados"] + resumo["perdidos"] == 50
+
+
+def test_planta_udp_fora_da_lista_e_recusada():
+    with pytest.raises(PermissionError):
+        configurar_execucao({**PEDIDO, "planta_udp": "10.0.0.5:9999"})
+
+
+def test_planta_udp_local_e_aceita():
+    executor, abrir = configurar_execucao({**PEDIDO, "planta_udp": "127.0.0.1:9999"})
+
+    assert executor.planta.endereco == ("127.0.0.1", 9999)
+    abrir.close()
+
+
+def test_falha_da_execucao_vira_evento_de_erro(monkeypatch):
+    executor, _ = configurar_execucao({**PEDIDO, "tick_ms": 5, "duracao_s": 0.05})
+
+    async def falhar():
+        raise RuntimeError("controlador divergiu")
+
+    monkeypatch.setattr(executor, "executar", falhar)
+    namespace = NamespaceTempoReal()
+    eventos = []
+    monkeypatch.setattr(
+        namespace, "emit", lambda *args, **kwargs: eventos.append((args, kwargs))
+    )
+
+    asyncio.run(namespace._executar("sid-1", executor, None))
+
+    assert eventos == [(("erro", {"erro": "controlador divergiu"}), {"room": "sid-1"})]
+    assert namespace._execucoes == {}
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from app import tuning
+from app.metricas import metricas_resposta
+from app.tuning import (
+    analisar_robustez,
+    avaliar_sintonias,
+    buscar_sintonia_pid,
+    fronteira_pareto,
+    gerar_candidatos,
+    perturbar_planta,
+)
+from app.utils import horizonte_simulacao, simular_malha_fechada_pid
+
+PLANTA = (4.66, 3100.0, 1120.0)
+SINTONIA = (0.2, 3000.0, 200.0)
+
+
+def pareto_referencia(objetivos):
+    """Pontos que nenhum outro domina (<= em tudo e < em algum), por comparação par a par."""
+    return {
+        i
+        for i, ponto in enumerate(objetivos)
+        if not any(
+            np.all(outro <= ponto) and np.any(outro < ponto)
+            for j, outro in enumerate(objetivos)
+            if j != i
+        )
+    }
+
+
+@pytest.mark.parametrize("n, dimensoes", [(300, 2), (500, 3), (40, 1)])
+def test_fronteira_igual_a_referencia(n, dimensoes):
+    objetivos = np.random.default_rng(n).uniform(size=(n, dimensoes))
+
+    fronteira = fronteira_pareto(objetivos)
+
+    assert len(fronteira) == len(set(fronteira.tolist()))
+    assert set(fronteira.tolist()) == pareto_referencia(objetivos)
+
+
+def test_busca_devolve_a_fronteira_dos_candidatos():
+    resultado = buscar_sintonia_pid(*PLANTA, n_candidatos=400, semente=3)
+
+    kp, ti, td = gerar_candidatos(*PLANTA, 400, semente=3)
+    objetivos = avaliar_sintonias(*PLANTA, kp, ti, td)
+    validos = np.flatnonzero(np.isfinite(objetivos).all(axis=1))
+    esperados = {
+        (kp[i], ti[i], td[i])
+        for i in validos[sorted(pareto_referencia(objetivos[validos]))]
+    }
+
+    obtidos = {(s["kp"], s["ti"], s["td"]) for s in resultado["fronteira"]}
+    assert obtidos == esperados
+    itae = [s["itae"] for s in resultado["fronteira"]]
+    assert itae == sorted(itae)
+
+
+def test_perturbacao_dentro_da_faixa():
+    k, tau, theta = perturbar_planta(*PLANTA, 5000, variacao=0.1, semente=1)
+
+    for nominal, valores in zip(PLANTA, (k, tau, theta)):
+        assert np.all(np.abs(valores / nominal - 1) <= 0.1)
+        assert abs(valores.mean() / nominal - 1) < 0.01
+
+
+def robustez_referencia(n_plantas, variacao, semente, n_pontos=400):
+    """Cada planta perturbada simulada e avaliada separadamente."""
+    k_p, tau_p, theta_p = perturbar_planta(*PLANTA, n_plantas, variacao, semente)
+    t = horizonte_simulacao(tau_p.max(), theta_p.max(), n_pontos)
+    overshoot, estaveis = [], []
+    for k, tau, theta in zip(k_p, tau_p, theta_p):
+        y = simular_malha_fechada_pid(k, tau, theta, *SINTONIA, t)[0]
+        estavel = np.abs(y).max() < tuning.LIMITE_DIVERGENCIA
+        overshoot.append(metricas_resposta(t, y)["overshoot"][0] if estavel else np.inf)
+        if estavel:
+            estaveis.append(y)
+    return np.array(overshoot), np.array(estaveis)
+
+
+def conferir_robustez(resultado, n_plantas, variacao, semente):
+    overshoot, estaveis = robustez_referencia(n_plantas, variacao, semente)
+    finitos = overshoot[np.isfinite(overshoot)]
+
+    assert resultado["fracao_instavel"] == pytest.approx(
+        np.mean(~np.isfinite(overshoot))
+    )
+    assert resultado["overshoot"]["finitos"] == finitos.size
+    assert resultado["overshoot"]["p50"] == pytest.approx(np.percentile(finitos, 50))
+    assert resultado["overshoot"]["max"] == pytest.approx(finitos.max())
+    envelope = resultado["envelope"]
+    np.testing.assert_allclose(envelope["y_min"], estaveis.min(axis=0), atol=1e-12)
+    np.testing.assert_allclose(envelope["y_max"], estaveis.max(axis=0), atol=1e-12)
+
+
+def test_robustez_igual_a_plantas_separadas():
+    resultado = analisar_robustez(*PLANTA, *SINTONIA, n_plantas=60, semente=7)
+
+    conferir_robustez(resultado, 60, 0.1, 7)
+    assert resultado["pior_caso"]["overshoot"] == resultado["overshoot"]["max"]
+
+
+def test_robustez_em_processos_igual_a_plantas_separadas(monkeypatch):
+    # Força a divisão entre processos com poucas plantas
+    monkeypatch.setattr(tuning, "LIMITE_PARALELO", 40)
+    monkeypatch.setattr(tuning.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(tuning, "_executor", None)
+    try:
+        resultado = analisar_robustez(
+            *PLANTA, *SINTONIA, n_plantas=90, variacao=0.3, semente=5
+        )
+    finally:
+        if tuning._executor is not None:
+            tuning._executor.shutdown()
+
+    conferir_robustez(resultado, 90, 0.3, 5)